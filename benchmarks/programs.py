@@ -0,0 +1,71 @@
+class MTProgramGenerator:
+    # Synthetic M4trix programs growing with `size`, each one stressing a different part of the pipeline.
+    # Every program is valid and ends, so all the stages can be timed on it.
+    workloads = ('statements', 'expression', 'nesting', 'loop', 'strings')
+
+    def __init__(self, expression_length: int = 8, string_length: int = 64) -> None:
+        # terms of the expressions of the statements workload, characters of the string literals
+        self.expression_length = expression_length
+        self.string_length = string_length
+
+    def generate(self, workload: str, size: int) -> str:
+        if workload not in self.workloads:
+            raise ValueError(f'Unknown workload: {workload}')
+        return getattr(self, workload)(size)
+
+    # `size` declarations of arithmetic expressions reading an earlier variable
+    def statements(self, size: int) -> str:
+        lines = ['int v0 = 1;']
+        for index in range(1, size):
+            # operators apply left to right, so a variable is only ever read by two statements and values stay small
+            terms = ' + '.join(f'{term % 10} * {term % 7 + 1}' for term in range(1, self.expression_length))
+            lines.append(f'int v{index} = v{index // 2} + {terms};' if index % 2 == 0 else f'int v{index} = v{index - 1} - {terms};')
+        lines.append(f'print(v{size - 1});')
+        return '\n'.join(lines) + '\n'
+
+    # one expression of `size` terms
+    def expression(self, size: int) -> str:
+        terms = ' + '.join(f'{index % 10} * x' if index % 3 == 0 else str(index % 10) for index in range(size))
+        return f'int x = 2;\nint y = {terms};\nprint(y);\n'
+
+    # `size` if blocks nested in each other
+    def nesting(self, size: int) -> str:
+        lines = ['int x = 0;']
+        # not indented, the program would grow with the square of the depth
+        for depth in range(size):
+            lines.append(f'if (x < {depth + 1}) {{')
+            lines.append('x = x + 1;')
+        lines.extend('}' * size)
+        lines.append('print(x);')
+        return '\n'.join(lines) + '\n'
+
+    # a loop running `size` times, with a branch and a nested while loop in its body
+    def loop(self, size: int) -> str:
+        return '\n'.join([
+            'int total = 0;',
+            'int step = 3;',
+            f'for (int i = 0; i < {size}; i++) {{',
+            # operators apply left to right, total + i * step would grow exponentially
+            '    total = total + i - step;',
+            '    if (total > 1000000) {',
+            '        total = total - 1000000;',
+            '    }',
+            '    int j = 0;',
+            '    while (j < 2) {',
+            '        j++;',
+            '    }',
+            '}',
+            'print(total);',
+        ]) + '\n'
+
+    # `size` string literals, concatenated and repeated
+    def strings(self, size: int) -> str:
+        lines = []
+        for index in range(size):
+            text = (f'text {index} ' * self.string_length)[:self.string_length]
+            lines.append(f"str s{index} = '{text}';")
+            if index > 0:
+                # s0 is never changed, so every string stays a few literals long
+                lines.append(f's{index} = s{index} + s0;' if index % 4 else f's{index} = s{index} * 2;')
+        lines.append('print(s0);')
+        return '\n'.join(lines) + '\n'
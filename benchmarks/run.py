@@ -0,0 +1,190 @@
+import os
+import sys
+import gc
+import io
+import json
+import math
+import time
+import shutil
+import tempfile
+import platform
+import argparse
+import subprocess
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.lexer.lexer import MTLexerAnalyzer
+from lib.lexer.regex_lexer import MTRegexLexerAnalyzer
+from lib.syntax.syntax import MTSyntaxAnalyzer
+from lib.semantic.semantic import MTSemanticAnalysis
+from lib.semantic.resolver import MTResolver
+from lib.interpreter.interpreter import MTInterpreter
+from lib.artifact import MTArtifactWriter
+from lib.message import MTDiagnosticError
+from benchmarks.programs import MTProgramGenerator
+
+# lexer engines selectable from the command line, as in main.py
+lexers = {
+    'default': MTLexerAnalyzer,
+    'regex': MTRegexLexerAnalyzer,
+}
+
+# stages timed separately, in pipeline order
+stages = ('tokenize', 'analyze', 'semantic', 'interpret', 'artifacts')
+
+# growth of the time with the size above which a stage is reported, 1 is linear and 2 quadratic
+super_linear = 1.3
+
+def time_stages(content: str, lexer_engine: str, directory: str) -> dict:
+    # seconds of every stage for one run, or the error stopping the run
+    times = {}
+    values = {}
+    def run(stage, call):
+        start = time.perf_counter()
+        values[stage] = call()
+        times[stage] = time.perf_counter() - start
+
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output):
+            lexer = lexers[lexer_engine](content, 'benchmark.mt')
+            run('tokenize', lexer.tokenize)
+            run('analyze', MTSyntaxAnalyzer(values['tokenize'], content).analyze)
+            run('semantic', MTSemanticAnalysis(values['analyze'], content, {}).analyze)
+
+            # the resolver belongs to the tree interpreter, it is timed with it
+            def interpret():
+                resolver = MTResolver(values['analyze'])
+                resolver.resolve()
+                return MTInterpreter(values['analyze'], content, resolver=resolver).interpret()
+            run('interpret', interpret)
+
+            artifacts = MTArtifactWriter(directory, ('tokens', 'ast'))
+            def write():
+                artifacts.write('tokens', values['tokenize'])
+                artifacts.write('ast', values['analyze'])
+            run('artifacts', write)
+    except MTDiagnosticError as error:
+        # the generated program is wrong
+        return {'times': times, 'error': str(error)}
+    except RecursionError:
+        return {'times': times, 'error': 'RecursionError'}
+    return {'times': times, 'error': None}
+
+def measure(content: str, lexer_engine: str, repeats: int, directory: str) -> dict:
+    # best time of every stage over the repeats, the others are the same run slowed down by something else
+    best = {}
+    error = None
+    for _ in range(repeats):
+        gc.collect()
+        result = time_stages(content, lexer_engine, directory)
+        for stage, elapsed in result['times'].items():
+            best[stage] = min(best.get(stage, elapsed), elapsed)
+        if result['error'] != None:
+            error = result['error']
+            break
+    return {'times': best, 'error': error}
+
+def exponent(small: tuple[int, float], large: tuple[int, float]):
+    # k of time ~ size^k between two sizes
+    if small[1] <= 0 or large[1] <= 0 or small[0] == large[0]:
+        return None
+    return math.log(large[1] / small[1]) / math.log(large[0] / small[0])
+
+def scaling(results: list[dict]) -> dict:
+    # exponent between consecutive sizes of every workload and stage
+    scales = {}
+    for workload in dict.fromkeys(result['workload'] for result in results):
+        runs = sorted((result for result in results if result['workload'] == workload), key=lambda result: result['size'])
+        scales[workload] = {}
+        for stage in stages:
+            points = [(result['size'], result['times'][stage]) for result in runs if stage in result['times']]
+            scales[workload][stage] = [exponent(small, large) for small, large in zip(points, points[1:])]
+    return scales
+
+def commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def report(results: list[dict], scales: dict, baseline: dict = None):
+    # one line per workload and size, the time of every stage in milliseconds and its change from the baseline
+    previous = {}
+    if baseline != None:
+        previous = {(result['workload'], result['size']): result['times'] for result in baseline['results']}
+
+    print(f"{'workload':<12}{'size':>8}" + ''.join(f'{stage:>14}' for stage in stages))
+    for result in results:
+        line = f"{result['workload']:<12}{result['size']:>8}"
+        old = previous.get((result['workload'], result['size']), {})
+        for stage in stages:
+            if stage not in result['times']:
+                line += f"{'-':>14}"
+                continue
+            cell = f"{result['times'][stage] * 1000:.2f}"
+            if old.get(stage):
+                cell += f" {(result['times'][stage] / old[stage] - 1) * 100:+.0f}%"
+            line += f'{cell:>14}'
+        if result['error'] != None:
+            line += f"  {result['error'].splitlines()[0]}"
+        print(line)
+
+    warnings = []
+    for workload, stage_scales in scales.items():
+        for stage, values in stage_scales.items():
+            values = [value for value in values if value != None]
+            # the largest sizes are the least noisy
+            if len(values) > 0 and values[-1] > super_linear:
+                warnings.append(f'{workload} {stage}: time grows as size^{values[-1]:.2f}')
+    if len(warnings) > 0:
+        print('\nSuper-linear scaling:')
+        for warning in warnings:
+            print(f'  {warning}')
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the stages of the compiler on generated programs.')
+    parser.add_argument('--workloads', nargs='+', choices=MTProgramGenerator.workloads, default=list(MTProgramGenerator.workloads), help='workloads to run')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 2000, 4000, 8000], help='sizes of every workload, doubling them gives the scaling')
+    parser.add_argument('--repeats', type=int, default=3, help='runs of every program, the best time is kept')
+    parser.add_argument('--lexer', choices=lexers.keys(), default='default', help='lexer engine')
+    parser.add_argument('--output', default='./bin/benchmark.json', help='JSON file the results are written to')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare != None:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+
+    generator = MTProgramGenerator()
+    directory = tempfile.mkdtemp(prefix='mt-benchmark-')
+    results = []
+    try:
+        for workload in args.workloads:
+            for size in sorted(args.sizes):
+                content = generator.generate(workload, size)
+                result = measure(content, args.lexer, args.repeats, directory)
+                results.append({'workload': workload, 'size': size, 'characters': len(content), **result})
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    scales = scaling(results)
+    report(results, scales, baseline)
+
+    data = {
+        'commit': commit(),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'lexer': args.lexer,
+        'repeats': args.repeats,
+        'results': results,
+        'scaling': scales,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as file:
+        json.dump(data, file, indent=4)
+
+if __name__ == '__main__':
+    main()
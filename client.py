@@ -0,0 +1,43 @@
+import os
+import sys
+import json
+import socket
+import argparse
+
+# Thin client of the daemon started with `python main.py --serve`: sends the script to it and prints what running
+# it printed, so `python client.py file.mt` can replace `python main.py file.mt` without paying for the startup
+# and the compilation. Only the standard library is imported here.
+
+def run(file_path, socket_path = './bin/daemon.sock', options = {}) -> dict:
+    request = {'path': file_path, 'cwd': os.getcwd(), 'options': options}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(request).encode() + b'\n')
+        with connection.makefile('rb') as response:
+            return json.loads(response.readline())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog=os.path.basename(__file__))
+    parser.add_argument('file_path', help='M4trix script to compile and run')
+    parser.add_argument('--socket', default='./bin/daemon.sock', help='Unix socket the daemon listens on (default: ./bin/daemon.sock)')
+    parser.add_argument('--lexer', choices=['default', 'regex'], default='default', help='lexer engine used to tokenize the script')
+    parser.add_argument('--compact-tokens', action='store_true', help='keep tokens in a compact column wise buffer instead of one object per token')
+    parser.add_argument('--engine', choices=['tree', 'vm', 'closure', 'python'], default='tree', help='execute the AST with the tree walking interpreter, compile it to bytecode for the virtual machine, to nested closures or to python source')
+    parser.add_argument('-O', dest='optimization', action='store_const', const=1, default=0, help='optimize the AST before running it: -O folds constants and removes dead branches')
+    parser.add_argument('-O2', dest='optimization', action='store_const', const=2, help='also hoist loop invariant expressions')
+    parser.add_argument('--json', action='store_true', help='print the whole response of the daemon as JSON: stdout, diagnostics and the symbol and value trees')
+    args = parser.parse_args()
+
+    options = {'lexer': args.lexer, 'compact_tokens': args.compact_tokens, 'engine': args.engine, 'optimization': args.optimization}
+    try:
+        response = run(args.file_path, args.socket, options)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"No daemon listening on '{args.socket}', start one with `python main.py --serve`.", file=sys.stderr)
+        sys.exit(2)
+
+    if args.json:
+        print(json.dumps(response, indent=4))
+    else:
+        sys.stdout.write(response['stdout'])
+        sys.stderr.write(response['stderr'])
+    sys.exit(response['exit_code'])
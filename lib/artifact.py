@@ -0,0 +1,148 @@
+import os
+import json
+from json.encoder import encode_basestring_ascii
+
+from lib.lexer.token_class import MTToken
+from lib.lexer.token_buffer import MTTokenBuffer, MTTokenView
+from lib.syntax.data import MTNode
+
+class MTArtifactWriter:
+    # Writes the JSON build artifacts of the stages asked for, straight from the tokens, nodes and dicts.
+    # The output is the same as dumping repr() of them with indent=4, without building that string, parsing it
+    # back and dumping it again. Containers are walked with an explicit stack, so deep trees don't recurse, and
+    # the text is written in large chunks. Stages not asked for are never written nor removed.
+    files = {
+        'tokens': 'tokens.json',
+        'ast': 'asts.json',
+        'semantic': 'semantic.json',
+        'licm': 'licm.json',
+        'interpreter': 'interpreter.json',
+    }
+    # number of pieces of text kept before they are written to the file
+    chunk_size = 4096
+
+    def __init__(self, directory: str = './bin', stages: tuple[str, ...] = (), indent: int = 4) -> None:
+        self.directory = directory
+        self.stages = set(stages)
+        # None writes everything on one line without spaces
+        self.indent = indent
+
+    def enabled(self, stage: str) -> bool:
+        return stage in self.stages
+
+    def path(self, stage: str) -> str:
+        return os.path.join(self.directory, self.files[stage])
+
+    # removes what an earlier run wrote for the stages of this one
+    def clear(self):
+        for stage in self.stages:
+            for path in (self.path(stage), f'{self.path(stage)}_error'):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def write(self, stage: str, value):
+        if not self.enabled(stage):
+            return
+        path = self.path(stage)
+        try:
+            with open(path, 'w') as file:
+                self.dump(value, file)
+        except IOError:
+            print(f"Error writing to file '{path}'.")
+
+    def dump(self, value, file):
+        chunks: list[str] = []
+        write = chunks.append
+        if self.indent == None:
+            item_separator, key_separator = ',', ':'
+        else:
+            item_separator, key_separator = ',', ': '
+
+        # open containers: [members, is_object, closing bracket, level, has members]
+        stack = []
+        container = self.open(value, write)
+        if container != None:
+            stack.append([container[0], container[1], container[2], 0, False])
+
+        while len(stack) > 0:
+            frame = stack[-1]
+            member = next(frame[0], frame)
+            level = frame[3]
+            if member is frame:
+                stack.pop()
+                if frame[4]:
+                    write(self.newline(level))
+                write(frame[2])
+            else:
+                if frame[4]:
+                    write(item_separator)
+                frame[4] = True
+                write(self.newline(level + 1))
+                if frame[1]:
+                    write(encode_basestring_ascii(member[0]))
+                    write(key_separator)
+                    member = member[1]
+                container = self.open(member, write)
+                if container != None:
+                    stack.append([container[0], container[1], container[2], level + 1, False])
+
+            if len(chunks) >= self.chunk_size:
+                file.write(''.join(chunks))
+                chunks.clear()
+
+        file.write(''.join(chunks))
+
+    def newline(self, level: int) -> str:
+        if self.indent == None:
+            return ''
+        return '\n' + ' ' * (self.indent * level)
+
+    # writes a scalar, or the opening bracket of a container and returns (members, is_object, closing bracket)
+    def open(self, value, write):
+        kind = type(value)
+        if kind is str:
+            write(encode_basestring_ascii(value))
+        elif value is None:
+            write('null')
+        elif value is True:
+            write('true')
+        elif value is False:
+            write('false')
+        elif kind is int:
+            write(int.__repr__(value))
+        elif kind is float:
+            write(json.dumps(value))
+        elif kind is MTToken or kind is MTTokenView:
+            write('{')
+            return self.token(value), True, '}'
+        elif isinstance(value, MTNode):
+            write('{')
+            return self.node(value), True, '}'
+        elif isinstance(value, dict):
+            write('{')
+            return iter(value.items()), True, '}'
+        elif isinstance(value, (list, tuple, MTTokenBuffer)):
+            write('[')
+            return iter(value), False, ']'
+        else:
+            raise TypeError(f'Object of type {kind.__name__} is not written to the build artifacts')
+        return None
+
+    # same members as MTToken.__repr__
+    def token(self, token: MTToken):
+        yield 'etype', 'MTToken'
+        yield 'type', str(token.type)
+        yield 'sub_type', str(token.sub_type)
+        yield 'value', token.value
+        yield 'start_pos', token.start_pos
+        yield 'end_pos', token.end_pos
+        yield 'line', token.line
+        yield 'column', token.column
+        yield 'file', token.file
+
+    # same members as MTNode.__repr__
+    def node(self, node: MTNode):
+        yield 'current', node.current
+        yield 'left', node.left
+        yield 'right', node.right
+        yield 'statements', node.statements
@@ -0,0 +1,96 @@
+import os
+import glob
+import pickle
+import hashlib
+
+class MTCompilationCache:
+    # Checked ASTs stored on disk by a hash of the script, so an unchanged script skips the lexer, the parser and
+    # the semantic analysis. Entries are pickles named after their key. Reading one touches it, and once the
+    # directory grows past `max_size` bytes the least recently used entries are removed.
+    # The key covers the compiler sources too, so changing the compiler never reads an entry it didn't write.
+    __version = None
+
+    def __init__(self, directory: str = './bin/cache', max_size: int = 64 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_size = max_size
+
+    @staticmethod
+    def version() -> str:
+        # hash of every source file of the compiler, computed once per run
+        if MTCompilationCache.__version == None:
+            digest = hashlib.sha256()
+            root = os.path.dirname(os.path.abspath(__file__))
+            for path in sorted(glob.glob(os.path.join(root, '**', '*.py'), recursive=True)):
+                digest.update(os.path.relpath(path, root).encode())
+                with open(path, 'rb') as file:
+                    digest.update(file.read())
+            MTCompilationCache.__version = digest.hexdigest()
+        return MTCompilationCache.__version
+
+    def key(self, program: str, *options) -> str:
+        # options are whatever changes what is stored for the same source, e.g. the file name in the tokens
+        digest = hashlib.sha256(self.version().encode())
+        for option in options:
+            digest.update(b'\0' + repr(option).encode())
+        digest.update(b'\0' + program.encode())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.pickle')
+
+    def load(self, key: str):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                entry = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, RecursionError, ValueError, TypeError):
+            # written by an interrupted run, read it again next time
+            self.remove(path)
+            return None
+
+        os.utime(path)
+        return entry
+
+    def store(self, key: str, entry):
+        try:
+            data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, RecursionError, TypeError):
+            # too deep or not picklable, the script is simply compiled every time
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'wb') as file:
+            file.write(data)
+        os.replace(temp, path)
+        self.evict()
+
+    # removes the least recently used entries until the cache fits in max_size
+    def evict(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '*.pickle')):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            self.remove(path)
+            size -= entry_size
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory, '*.pickle')) + glob.glob(os.path.join(self.directory, '*.tmp')):
+            self.remove(path)
+
+    def remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,539 @@
+from lib.syntax.data import *
+from lib.lexer.token_class import *
+from lib.message import *
+from lib.interpreter.output import MTBufferedOutput
+from lib.semantic.scope import MTScopeAnalysis
+
+class MTPythonGenerator:
+    # Translates the checked AST into the source of a Python module whose `main()` runs the program with every
+    # variable as a local of that function, so CPython's own bytecode does the work.
+    # MTInterpreter runs every block on copies of the symbol and value trees; which variables are declared and
+    # which have a value is known statically at every point, so the generated code only has to forget, when a
+    # block ends, the values the copies would have thrown away, and the final trees are built from that knowledge.
+    # A variable hidden by a for loop of a block is put back as it was when the block started.
+    arithmeticOperators = ('+', '-', '*', '/')
+    conditionalOperators = ('<', '>', '==', '<=', '>=')
+
+    # python operator precedences used to leave out parentheses
+    OR = 1
+    AND = 2
+    COMPARISON = 4
+    SUM = 6
+    PRODUCT = 7
+    ATOM = 10
+
+    # levels of an expression generated as one python expression, CPython gives up on 200 nested parentheses
+    maxDepth = 32
+
+    header = '''\
+# Generated from {file} by MTPythonGenerator, changes are lost on the next build.
+
+import sys
+
+def _text(exp):
+    if exp != None:
+        if type(exp) is bool:
+            exp = 'true' if exp else 'false'
+    else:
+        exp = 'null'
+    return f'{{exp}}\\n'
+
+def _pick(condition, left, right):
+    return left if condition else right
+
+def _and(left, right):
+    return left and right
+
+def _or(left, right):
+    return left or right
+
+# (line, column) of the tokens runtime errors are reported at
+_file = {file!r}
+_positions = {positions}
+
+def _fail(position, message):
+    line, column = _positions[position]
+    raise SystemExit(f'{{_file}}:{{line}}:{{column}}: Error: {{message}}')
+
+def _check(condition, error, position, message):
+    if type(condition) is not bool:
+        error(position, message)
+    return condition
+
+'''
+
+    footer = '''
+if __name__ == '__main__':
+    main()
+'''
+
+    def __init__(self, nodes: list[MTNode], program: str, file: str = '', symbolTree: dict = {}, valueTree: dict = {}, output = None) -> None:
+        self.nodes: list[MTNode] = nodes
+        self.program: str = program
+        self.file: str = file
+        # what print writes to when the program runs, anything with write(text) and flush() like MTInterpreter's
+        self.output = output if output != None else MTBufferedOutput()
+        self.initialSymbols: dict = dict(symbolTree)
+        self.initialValues: dict = dict(valueTree)
+        # tokens runtime errors are reported at, referenced by index from the generated code
+        self.tokens: list[MTToken] = []
+        self.lines: list[str] = []
+        self.indent = 1
+        self.temporaries = 0
+        # every variable name used and the local of main() it becomes
+        self.names: dict[str, str] = {}
+        # declared variables and variables having a value at the point being generated
+        self.symbols: dict[str, str] = dict(self.initialSymbols)
+        self.values: dict[str, None] = dict.fromkeys(self.initialValues)
+        # for every open block, the bindings hidden by loop variables of for loops inside it
+        self.hidden: list[list[tuple[str, str, bool]]] = []
+        # set while generating a for loop initializer, which MTInterpreter runs in an empty environment
+        self.isolated = False
+        self.source: str = None
+        # code object of the generated source
+        self.module = None
+
+    def generate(self) -> str:
+        if self.source != None:
+            return self.source
+
+        for node in self.nodes:
+            self.generateStatement(node)
+
+        symbolTree = ', '.join(f'{name!r}: {data_type!r}' for name, data_type in self.symbols.items())
+        valueTree = ', '.join(f'{name!r}: {self.local(name)}' for name in self.values)
+        self.emit(f"return {{'symbol_tree': {{{symbolTree}}}, 'value_tree': {{{valueTree}}}}}")
+
+        # run on its own the module prints to stdout
+        prologue = ['def main(_values = {}, _error = _fail, _output = None):', '    _write = (_output if _output != None else sys.stdout).write']
+        for name in self.names:
+            if name in self.initialValues:
+                prologue.append(f'    {self.local(name)} = _values.get({name!r})')
+            else:
+                prologue.append(f'    {self.local(name)} = None')
+
+        positions = repr([(token.line, token.column) for token in self.tokens])
+        self.source = self.header.format(file = self.file, positions = positions) + '\n'.join(prologue + self.lines) + '\n' + self.footer
+        return self.source
+
+    def interpret(self):
+        return self.run(self.initialValues, self.output)
+
+    def run(self, values: dict, output):
+        # runs the generated module once more with other initial values and output, it is only compiled once
+        if self.module == None:
+            self.module = compile(self.generate(), self.file or '<m4trix>', 'exec')
+        namespace = {'__name__': 'mt_program'}
+        exec(self.module, namespace)
+        try:
+            return namespace['main'](values, self.error, output)
+        finally:
+            output.flush()
+
+    def error(self, position: int, message: str):
+        token = self.tokens[position]
+        MTCompilerMessage.semanticError(self.program, token, token.start_pos, message)
+
+    # Emitting
+    def emit(self, line: str):
+        self.lines.append('    ' * self.indent + line)
+
+    def local(self, name: str) -> str:
+        # Numbered rather than spelled out: python normalizes identifiers (NFKC), so two M4trix names could become
+        # the same local, and not every M4trix name is a python identifier. The numbers never collide with python
+        # keywords, builtins or the helpers either.
+        local = self.names.get(name)
+        if local == None:
+            local = self.names[name] = f'v{len(self.names)}'
+        return local
+
+    def temporary(self, prefix: str) -> str:
+        self.temporaries += 1
+        return f'_{prefix}{self.temporaries}'
+
+    def position(self, token: MTToken) -> int:
+        self.tokens.append(token)
+        return len(self.tokens) - 1
+
+    def emitError(self, token: MTToken, message: str):
+        self.emit(f'_error({self.position(token)}, {message!r})')
+
+    # Statements
+    def generateStatement(self, node: MTNode):
+        token = node.current
+        if token.type == MTTokenType.IDENTIFIER:
+            self.generateIdentifier(node)
+        elif token.type == MTTokenType.KEYWORD:
+            self.generateKeyword(node)
+        elif token.type == MTTokenType.OPERATOR and (token.value == '++' or token.value == '--') and node.left != None and node.left.current.type == MTTokenType.IDENTIFIER:
+            # the old value is not needed, so the variable is updated in place
+            name = self.local(node.left.current.value)
+            self.emit(f'{name} = {name} {token.value[0]} 1')
+        elif token.type == MTTokenType.OPERATOR or token.type == MTTokenType.CONDITIONAL_OPERATOR or token.type == MTTokenType.LOGICAL_OPERATOR:
+            self.emit(self.generateExpression(node)[0])
+        else:
+            self.emitError(token, f'Unexpected Node: {token.value}')
+
+    def generateBlock(self, nodes: list[MTNode]):
+        symbols = self.symbols
+        values = self.values
+        self.symbols = dict(symbols)
+        self.values = dict(values)
+        hidden = []
+        self.hidden.append(hidden)
+        self.indent += 1
+
+        lines = len(self.lines)
+        # variables hidden by a for loop of the block get their value on entry back when it ends
+        kept = []
+        for name in MTScopeAnalysis.hidden(nodes, values):
+            kept.append((name, self.temporary('kept')))
+            self.emit(f'{kept[-1][1]} = {self.local(name)}')
+        for node in nodes:
+            self.generateStatement(node)
+
+        # bindings hidden by for loops come back, then values the block gave to variables without one are forgotten
+        for name, saved, had_value in reversed(hidden):
+            self.emit(f'{self.local(name)} = {saved if had_value else None}')
+        for name, saved in kept:
+            self.emit(f'{self.local(name)} = {saved}')
+        forgotten = [name for name in self.values if name not in values]
+        for name, saved, had_value in hidden:
+            if had_value and name not in values and name not in forgotten:
+                forgotten.append(name)
+        for name in forgotten:
+            self.emit(f'{self.local(name)} = None')
+        if len(self.lines) == lines:
+            self.emit('pass')
+
+        self.indent -= 1
+        self.hidden.pop()
+        self.symbols = symbols
+        self.values = values
+
+    def generateKeyword(self, node: MTNode):
+        value = node.current.value
+        if value == 'print':
+            self.emit(f'_write(_text({self.generateExpression(node.right)[0]}))')
+        elif value == 'pass':
+            pass
+        elif node.current.sub_type == MTTokenSubType.CONDITIONAL_KEYWORDS and value == 'if':
+            self.generateIfElse(node)
+        elif node.current.sub_type == MTTokenSubType.CONDITIONAL_KEYWORDS and value == 'switch':
+            self.generateSwitch(node)
+        elif node.current.sub_type == MTTokenSubType.LOOPS_KEYWORDS and value == 'for':
+            self.generateForLoop(node)
+        elif node.current.sub_type == MTTokenSubType.LOOPS_KEYWORDS and value == 'while':
+            self.generateWhileLoop(node)
+        elif node.current.sub_type == MTTokenSubType.LOOPS_KEYWORDS and value == 'do':
+            self.generateDoWhileLoop(node)
+        else:
+            self.emitError(node.current, f'Unexpected Node: {value}')
+
+    def generateIdentifier(self, node: MTNode):
+        name = node.current.value
+        if node.left != None and name not in self.symbols:
+            self.symbols[name] = node.left.current.value
+        elif node.left != None or name not in self.symbols:
+            self.emitError(node.current, f'Undefined variable: `{name}`')
+            return
+
+        if node.right != None:
+            self.emit(f'{self.local(name)} = {self.generateExpression(node.right)[0]}')
+            self.values[name] = None
+
+    # Conditional
+    def generateIfElse(self, node: MTNode):
+        keyword = 'if'
+        branch = node
+        while branch != None:
+            value = branch.current.value
+            if (value == 'if' or value == 'elif') and branch.left != None:
+                condition = self.generateExpression(branch.left)[0]
+                if self.isBoolean(branch.left):
+                    self.emit(f'{keyword} {condition}:')
+                    self.generateBlock(branch.statements)
+                    keyword = 'elif'
+                else:
+                    # anything but a bool stops the program
+                    result = self.temporary('condition')
+                    self.emit(f'{keyword} ({result} := {condition}) is True:')
+                    self.generateBlock(branch.statements)
+                    self.emit(f'elif {result} is not False:')
+                    self.indent += 1
+                    self.emitError(branch.current, 'Expression should be type of `bool`')
+                    self.indent -= 1
+                    keyword = 'elif'
+            elif value == 'else':
+                if keyword == 'if':
+                    self.emit('if True:')
+                else:
+                    self.emit('else:')
+                self.generateBlock(branch.statements)
+                break
+            else:
+                self.emit('if True:' if keyword == 'if' else 'else:')
+                self.indent += 1
+                self.emitError(branch.current, 'Error while evaluating expression')
+                self.indent -= 1
+                break
+            branch = branch.right
+
+    def generateSwitch(self, node: MTNode):
+        value = self.temporary('switch')
+        self.emit(f'{value} = {self.generateExpression(node.left)[0]}')
+        keyword = 'if'
+        for statement in node.statements:
+            if statement.current.value == 'case':
+                self.emit(f'{keyword} {self.wrap(self.generateExpression(statement.left), self.COMPARISON + 1)} == {value}:')
+                self.generateBlock([statement.right])
+                keyword = 'elif'
+            elif statement.current.value == 'default':
+                self.emit('if True:' if keyword == 'if' else 'else:')
+                self.generateBlock([statement.right])
+                break
+            else:
+                self.emit('if True:' if keyword == 'if' else 'else:')
+                self.indent += 1
+                self.emitError(node.current, 'Invalid case')
+                self.indent -= 1
+                break
+
+    # Loops
+    def generateForLoop(self, node: MTNode):
+        if node.left == None or len(node.left.statements) != 3 or node.left.statements[0].current.type != MTTokenType.IDENTIFIER or node.left.statements[0].left == None:
+            self.emitError(node.current, 'Error while evaluating statement')
+            return
+
+        init, condition, increment = node.left.statements
+        name = init.current.value
+        local = self.local(name)
+        if init.right != None:
+            self.isolated = True
+            initializer = self.generateExpression(init.right)[0]
+            self.isolated = False
+
+        # a loop variable hiding an outer one only gives it back when the enclosing block ends
+        if len(self.hidden) > 0:
+            saved = self.temporary('hidden')
+            had_value = name in self.values
+            if had_value:
+                self.emit(f'{saved} = {local}')
+            self.hidden[-1].append((name, saved, had_value))
+
+        if init.right != None:
+            self.emit(f'{local} = {initializer}')
+            self.values[name] = None
+        self.symbols[name] = init.left.current.value
+
+        self.emitLoop(condition)
+        self.generateBlock(node.statements)
+        self.indent += 1
+        if increment.current.type == MTTokenType.OPERATOR and (increment.current.value == '++' or increment.current.value == '--'):
+            self.generateStatement(increment)
+        else:
+            # evaluated as an expression, like MTInterpreter does, so `i = i + 1` only reads i
+            self.emit(self.generateExpression(increment)[0])
+        self.indent -= 1
+
+        del self.symbols[name]
+        if init.right != None:
+            self.emit(f'{local} = None')
+            del self.values[name]
+
+    def generateWhileLoop(self, node: MTNode):
+        if node.left == None:
+            self.emitError(node.current, 'Error while evaluating statement')
+            return
+
+        self.emitLoop(node.left)
+        self.generateBlock(node.statements)
+
+    def generateDoWhileLoop(self, node: MTNode):
+        self.emit('while True:')
+        self.generateBlock(node.statements)
+        self.indent += 1
+        condition = self.generateExpression(node.left.left)[0]
+        if self.isBoolean(node.left.left):
+            self.emit(f'if not {condition}:')
+        else:
+            self.emit(f'if ({condition}) is not True:')
+        self.indent += 1
+        self.emit('break')
+        self.indent -= 2
+
+    def emitLoop(self, condition: MTNode):
+        # loops go on while the condition is exactly `true`
+        if self.isBoolean(condition):
+            self.emit(f'while {self.generateExpression(condition)[0]}:')
+        else:
+            self.emit(f'while ({self.generateExpression(condition)[0]}) is True:')
+
+    # Expression
+    # returns the python expression and its precedence
+    def generateExpression(self, node: MTNode, depth: int = 0) -> tuple[str, int]:
+        if node == None:
+            # MTInterpreter fails on the missing node itself
+            return ('None.current', self.ATOM)
+        if depth >= self.maxDepth:
+            return self.generateDeepExpression(node)
+
+        token = node.current
+        if token.type == MTTokenType.IDENTIFIER:
+            if self.isolated:
+                return ('None', self.ATOM)
+            return (self.local(token.value), self.ATOM)
+        elif token.type == MTTokenType.VALUE:
+            return self.generateValue(token)
+        elif token.type == MTTokenType.OPERATOR:
+            if token.value == '++' or token.value == '--':
+                old = self.temporary('old')
+                left = self.generateExpression(node.left, depth + 1)[0]
+                return (f'({old} := {left}, {self.local(node.left.current.value)} := {old} {token.value[0]} 1)[0]', self.ATOM)
+
+            left = self.generateExpression(node.left, depth + 1)
+            right = self.generateExpression(node.right, depth + 1)
+            if token.value in self.arithmeticOperators:
+                precedence = self.SUM if token.value == '+' or token.value == '-' else self.PRODUCT
+                # every operator is left associative and they all have the same precedence in M4trix
+                return (f'{self.wrap(left, precedence)} {token.value} {self.wrap(right, self.ATOM)}', precedence)
+            return self.generateFailure(left, right, token, 'Arithmentic operation not supported')
+        elif token.type == MTTokenType.CONDITIONAL_OPERATOR:
+            if token.value == '?' and node.left != None:
+                condition = self.generateExpression(node.left, depth + 1)[0]
+                position = self.position(token)
+                if node.right == None:
+                    return (f"({condition}, _error({position}, 'Error while evaluating expression'))[1]", self.ATOM)
+                # the condition is checked before, and both sides are evaluated before one is picked
+                left = self.generateExpression(node.right.left, depth + 1)[0]
+                right = self.generateExpression(node.right.right, depth + 1)[0]
+                return (f"_pick(_check({condition}, _error, {position}, 'Error while evaluating expression'), {left}, {right})", self.ATOM)
+
+            left = self.generateExpression(node.left, depth + 1)
+            right = self.generateExpression(node.right, depth + 1)
+            if token.value in self.conditionalOperators:
+                return (f'{self.wrap(left, self.COMPARISON + 1)} {token.value} {self.wrap(right, self.COMPARISON + 1)}', self.COMPARISON)
+            return self.generateFailure(left, right, token, 'Conditional operation not supported')
+        elif token.type == MTTokenType.LOGICAL_OPERATOR:
+            left = self.generateExpression(node.left, depth + 1)
+            right = self.generateExpression(node.right, depth + 1)
+            if token.value == '&&' or token.value == '||':
+                operator = 'and' if token.value == '&&' else 'or'
+                if self.isSimple(node.right):
+                    # python skips the right side, which is fine when evaluating it can neither fail nor change anything
+                    precedence = self.AND if operator == 'and' else self.OR
+                    return (f'{self.wrap(left, precedence)} {operator} {self.wrap(right, precedence + 1)}', precedence)
+                return (f'_{operator}({left[0]}, {right[0]})', self.ATOM)
+            return self.generateFailure(left, right, token, 'Conditional operation not supported')
+
+        position = self.position(token)
+        return (f"_error({position}, 'Error while evaluating expression')", self.ATOM)
+
+    def generateDeepExpression(self, node: MTNode) -> tuple[str, int]:
+        # A tuple of assignments computing one operation each, operands first from left to right, to locals named
+        # after the position of the value on a stack, so the python expression doesn't nest however deep the
+        # expression is. It is listed walking the expression with a stack. What is left to do for a node: 0 list
+        # it, 1 apply its operator, 2 check the condition of a ternary, 3 select its branch. Names, values and
+        # updates are generated as usual, they don't nest.
+        items = []
+        top = 0
+        stack = [(node, 0)]
+        while len(stack) > 0:
+            node, step = stack.pop()
+            token = node.current if node != None else None
+            if step == 0:
+                if token == None or token.type not in (MTTokenType.OPERATOR, MTTokenType.CONDITIONAL_OPERATOR, MTTokenType.LOGICAL_OPERATOR) or token.value == '++' or token.value == '--':
+                    items.append(f'_s{top} := {self.generateExpression(node)[0]}')
+                    top += 1
+                elif token.type == MTTokenType.CONDITIONAL_OPERATOR and token.value == '?' and node.left != None:
+                    stack.append((node, 2))
+                    stack.append((node.left, 0))
+                else:
+                    stack.append((node, 1))
+                    stack.append((node.right, 0))
+                    stack.append((node.left, 0))
+            elif step == 1:
+                top -= 1
+                left, right = f'_s{top - 1}', f'_s{top}'
+                if token.type == MTTokenType.OPERATOR and token.value in self.arithmeticOperators:
+                    items.append(f'{left} := {left} {token.value} {right}')
+                elif token.type == MTTokenType.CONDITIONAL_OPERATOR and token.value in self.conditionalOperators:
+                    items.append(f'{left} := {left} {token.value} {right}')
+                elif token.type == MTTokenType.LOGICAL_OPERATOR and (token.value == '&&' or token.value == '||'):
+                    # both sides are evaluated already
+                    items.append(f"{left} := {left} {'and' if token.value == '&&' else 'or'} {right}")
+                else:
+                    message = 'Arithmentic operation not supported' if token.type == MTTokenType.OPERATOR else 'Conditional operation not supported'
+                    items.append(f'_error({self.position(token)}, {message!r})')
+            elif step == 2:
+                position = self.position(token)
+                if node.right == None:
+                    items.append(f"_error({position}, 'Error while evaluating expression')")
+                    continue
+                items.append(f"_check(_s{top - 1}, _error, {position}, 'Error while evaluating expression')")
+                # both sides are evaluated before one is picked
+                stack.append((node, 3))
+                stack.append((node.right.right, 0))
+                stack.append((node.right.left, 0))
+            else:
+                top -= 2
+                items.append(f'_s{top - 1} := _s{top} if _s{top - 1} else _s{top + 1}')
+        return (f"({', '.join(items)}, _s0)[-1]", self.ATOM)
+
+    def generateValue(self, token: MTToken) -> tuple[str, int]:
+        if token.sub_type == MTTokenSubType.NUMBER_VALUE:
+            convert = int
+        elif token.sub_type == MTTokenSubType.STRING_VALUE:
+            return (repr(token.value), self.ATOM)
+        elif token.sub_type == MTTokenSubType.BOOLEAN_VALUE:
+            return ('True' if token.value == 'true' else 'False', self.ATOM)
+        elif token.sub_type == MTTokenSubType.DOUBLE_VALUE:
+            convert = float
+        else:
+            position = self.position(token)
+            return (f"_error({position}, 'Value type is not supported')", self.ATOM)
+
+        try:
+            value = convert(token.value)
+        except ValueError:
+            # keep the failure at run time, where the tree walker would raise it
+            return (f'{convert.__name__}({token.value!r})', self.ATOM)
+        if value != value or value in (float('inf'), float('-inf')):
+            return (f'{convert.__name__}({token.value!r})', self.ATOM)
+        return (repr(value), self.ATOM)
+
+    def generateFailure(self, left: tuple[str, int], right: tuple[str, int], token: MTToken, message: str) -> tuple[str, int]:
+        # both sides are evaluated before the error is reported
+        return (f'({left[0]}, {right[0]}, _error({self.position(token)}, {message!r}))[2]', self.ATOM)
+
+    def wrap(self, expression: tuple[str, int], precedence: int) -> str:
+        if expression[1] < precedence:
+            return f'({expression[0]})'
+        return expression[0]
+
+    # comparisons either give a bool or fail while evaluating, so their result needs no check
+    def isBoolean(self, node: MTNode) -> bool:
+        token = node.current
+        if token.type == MTTokenType.CONDITIONAL_OPERATOR:
+            return token.value in self.conditionalOperators
+        return token.type == MTTokenType.VALUE and token.sub_type == MTTokenSubType.BOOLEAN_VALUE
+
+    # expressions that can be skipped without changing anything
+    def isSimple(self, node: MTNode) -> bool:
+        if node == None:
+            return False
+        token = node.current
+        if token.type == MTTokenType.IDENTIFIER:
+            return True
+        if token.type != MTTokenType.VALUE:
+            return False
+        try:
+            if token.sub_type == MTTokenSubType.NUMBER_VALUE:
+                int(token.value)
+            elif token.sub_type == MTTokenSubType.DOUBLE_VALUE:
+                float(token.value)
+            elif token.sub_type != MTTokenSubType.STRING_VALUE and token.sub_type != MTTokenSubType.BOOLEAN_VALUE:
+                return False
+        except ValueError:
+            return False
+        return True
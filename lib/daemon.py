@@ -0,0 +1,127 @@
+import io
+import os
+import json
+import signal
+import threading
+import multiprocessing
+import traceback
+import socketserver
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from lib import program
+from lib.message import MTCompilerMessage, MTDiagnosticError
+from lib.program import MTProgramCache
+
+class MTDaemonWorker:
+    # Runs the requests of the daemon in a worker process. Scripts are compiled once per worker by
+    # lib.program.compile into an MTProgram, kept in a least recently used cache of the worker keyed by a hash of
+    # the source and the options changing it, and every request only runs it.
+    # Everything printed is captured, compiler errors are printed into it as main.py prints them.
+    programs = MTProgramCache(64)
+
+    @staticmethod
+    def initialize(capacity: int):
+        MTDaemonWorker.programs.capacity = capacity
+
+    @staticmethod
+    def handle(request: dict) -> dict:
+        options = request.get('options', {})
+        output = io.StringIO()
+        response = {'stdout': '', 'stderr': '', 'diagnostics': [], 'exit_code': 0, 'result': None}
+        try:
+            with redirect_stdout(output):
+                response['result'] = MTDaemonWorker.run(request, options)
+        except MTDiagnosticError as error:
+            output.write(MTCompilerMessage.format(error.diagnostics))
+            response['exit_code'] = 1
+        except SystemExit as error:
+            response['exit_code'] = error.code if isinstance(error.code, int) else 1
+        except Exception:
+            response['stderr'] = traceback.format_exc()
+            response['exit_code'] = 1
+
+        response['stdout'] = output.getvalue()
+        response['diagnostics'] = MTCompilerMessage.printed.findall(response['stdout'])
+        return response
+
+    @staticmethod
+    def run(request: dict, options: dict):
+        file_path = request.get('path', '')
+        content = request.get('source')
+        if content == None:
+            try:
+                # the path is reported as the client was given it
+                with open(os.path.join(request.get('cwd', ''), file_path), 'r') as file:
+                    content = file.read()
+            except FileNotFoundError:
+                print(f"File '{file_path}' not found.")
+                return None
+            except IOError:
+                print(f"Error reading from file '{file_path}'.")
+                return None
+
+        compiled = program.compile(content, file_path, optimization=options.get('optimization', 0), lexer=options.get('lexer', 'default'), cache=MTDaemonWorker.programs, engine=options.get('engine', 'tree'), compact_tokens=options.get('compact_tokens', False))
+        return compiled.run()
+
+class MTDaemonHandler(socketserver.StreamRequestHandler):
+    # one JSON request per line, answered by one JSON response per line
+    def handle(self):
+        for line in self.rfile:
+            if line.strip() == b'':
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                response = {'stdout': '', 'stderr': 'Invalid request\n', 'diagnostics': [], 'exit_code': 2, 'result': None}
+            else:
+                response = self.server.submit(request)
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+            self.wfile.flush()
+
+class MTDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # Compiles and runs scripts for client.py on a pool of worker processes, listening on a Unix socket.
+    # Connections are read by threads, which only wait for the workers.
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = './bin/daemon.sock', workers: int = None, capacity: int = 64) -> None:
+        self.socket_path = socket_path
+        self.workers = workers if workers != None else os.cpu_count()
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.pool = self.create_pool()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, MTDaemonHandler)
+
+    def create_pool(self) -> ProcessPoolExecutor:
+        # workers are started from the connection threads, forking a process running threads isn't safe
+        context = multiprocessing.get_context('forkserver') if 'forkserver' in multiprocessing.get_all_start_methods() else None
+        return ProcessPoolExecutor(self.workers, mp_context=context, initializer=MTDaemonWorker.initialize, initargs=(self.capacity,))
+
+    def submit(self, request: dict) -> dict:
+        pool = self.pool
+        try:
+            return pool.submit(MTDaemonWorker.handle, request).result()
+        except BrokenProcessPool:
+            # a worker died (killed, out of memory), the request is lost but the next ones get a new pool
+            with self.lock:
+                if self.pool is pool:
+                    self.pool = self.create_pool()
+            return {'stdout': '', 'stderr': 'Worker process died\n', 'diagnostics': [], 'exit_code': 1, 'result': None}
+
+    def serve(self):
+        signal.signal(signal.SIGTERM, self.terminate)
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server_close()
+            self.pool.shutdown(cancel_futures=True)
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def terminate(self, signum, frame):
+        raise KeyboardInterrupt
@@ -0,0 +1,205 @@
+from bisect import bisect_left
+
+from lib.lexer.lexer import MTLexerAnalyzer
+from lib.lexer.line_index import MTLineIndex
+from lib.lexer.token_class import *
+from lib.syntax.syntax import MTSyntaxAnalyzer
+from lib.syntax.data import *
+from lib.semantic.semantic import MTSemanticAnalysis
+from lib.message import MTDiagnosticError
+
+class MTIncrementalProgram:
+    # Tokens, top level statements and symbol tree of a program kept up to date while it is edited.
+    # An edit is lexed and parsed again from the end of the last token before it, statement by statement, until a
+    # statement starts after the edit at the shifted position of an old one: from there on the lexer and the
+    # parser would give the same tokens and statements as before, so the old ones are kept. The statement before
+    # the edit is parsed again too, as whether it ends depends on the token after it (an if followed by else).
+    # Statements are stored column wise like MTTokenBuffer, so shifting the ones after an edit is a few list
+    # comprehensions; their tokens are only moved when they are looked at again.
+    # Only the new statements are checked again, and the later ones using a top level declaration the edit changed.
+    # An edit that doesn't parse or check raises MTDiagnosticError and leaves the program as it was before it.
+    def __init__(self, program: str, file: str = '', lexer: type = MTLexerAnalyzer) -> None:
+        self.file = file
+        self.lexer = lexer
+        # owned by the program and edited in place, every token of it holds this index
+        self.line_index = MTLineIndex('')
+        # one entry per top level statement
+        self.nodes: list[MTNode] = []
+        self.statementTokens: list[list[MTToken]] = []
+        # where the first token starts and end_pos of the last token, always up to date
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+        # characters the tokens of the statement still have to be moved by, None when they are up to date
+        self.shifts: list[int] = []
+        # number of top level declarations before the statement, identifiers it uses
+        self.scopes: list[int] = []
+        self.names: list[frozenset[str]] = []
+        # (name, data type) of the top level declarations in program order
+        self.declarations: list[tuple[str, str]] = []
+
+        # the whole program is an edit of an empty one
+        self.edit(0, 0, program)
+
+    @property
+    def program(self) -> str:
+        return self.line_index.program
+
+    @property
+    def statements(self) -> list[MTNode]:
+        self.flush(0, len(self.nodes))
+        return list(self.nodes)
+
+    @property
+    def tokens(self) -> list[MTToken]:
+        self.flush(0, len(self.nodes))
+        return [token for tokens in self.statementTokens for token in tokens]
+
+    @property
+    def symbolTree(self) -> dict[str, str]:
+        return dict(self.declarations)
+
+    # replaces `removed` characters at offset by inserted and returns the statements parsed again
+    def edit(self, offset: int, removed: int, inserted: str) -> list[MTNode]:
+        if offset < 0 or removed < 0 or offset + removed > len(self.program):
+            raise IndexError('Edit out of range')
+
+        delta = len(inserted) - removed
+        moved_lines = '\n' in inserted or self.program.count('\n', offset, offset + removed) > 0
+        # a failed edit leaves the program as it was before it
+        snapshot = self.snapshot()
+        shifted = False
+        try:
+            self.line_index.edit(offset, removed, inserted)
+
+            # the first statement ending at or after offset, and the one before it
+            first = max(bisect_left(self.ends, offset) - 1, 0)
+            restart = self.ends[first - 1] if first > 0 else 0
+
+            nodes, tokens, starts, ends, stop = self.parse(first, restart, offset + len(inserted), delta)
+
+            base = self.scopes[first] if first < len(self.scopes) else len(self.declarations)
+            end = self.scopes[stop] if stop < len(self.scopes) else len(self.declarations)
+
+            self.nodes[first:stop] = nodes
+            self.statementTokens[first:stop] = tokens
+            self.starts[first:stop] = starts
+            self.ends[first:stop] = ends
+            self.shifts[first:stop] = [None] * len(nodes)
+            self.scopes[first:stop] = [0] * len(nodes)
+            self.names[first:stop] = [frozenset(token.value for token in statement if token.type == MTTokenType.IDENTIFIER) for statement in tokens]
+
+            after = first + len(nodes)
+            if delta != 0:
+                self.starts[after:] = [start + delta for start in self.starts[after:]]
+                self.ends[after:] = [end + delta for end in self.ends[after:]]
+            if delta != 0 or moved_lines:
+                self.shifts[after:] = [delta if shift == None else shift + delta for shift in self.shifts[after:]]
+                shifted = True
+
+            self.check(first, base, end, nodes)
+        except BaseException:
+            self.restore(snapshot, offset, -delta if shifted else None)
+            raise
+        return nodes
+
+    # Rollback
+    def snapshot(self) -> tuple:
+        return (
+            self.line_index.program, list(self.line_index.line_starts), list(self.nodes), list(self.statementTokens),
+            list(self.starts), list(self.ends), list(self.shifts), list(self.scopes), list(self.names), list(self.declarations),
+        )
+
+    def restore(self, snapshot: tuple, offset: int, shift: int):
+        # shift moves back the tokens of a statement after offset that the check flushed, None if the edit didn't
+        # shift them
+        program, line_starts, nodes, statementTokens, starts, ends, shifts, scopes, names, declarations = snapshot
+        flushed = {id(tokens) for tokens, pending in zip(self.statementTokens, self.shifts) if pending == None}
+        for index, tokens in enumerate(statementTokens):
+            if starts[index] >= offset and id(tokens) in flushed:
+                shifts[index] = shift
+
+        self.line_index.program = program
+        self.line_index.line_starts[:] = line_starts
+        self.nodes, self.statementTokens, self.starts, self.ends = nodes, statementTokens, starts, ends
+        self.shifts, self.scopes, self.names, self.declarations = shifts, scopes, names, declarations
+
+    # Lexing and Parsing
+    def parse(self, first: int, restart: int, stable: int, delta: int):
+        # lexes and parses from restart until a statement starts at or after stable where an old one started before
+        # the edit, returns the new statements and the index of that old one
+        self.line_index.share()
+        lexer = self.lexer(self.program, self.file)
+        lexer.line_index = self.line_index
+        lexer.position = restart
+
+        tokens: list[MTToken] = []
+        def read():
+            for token in lexer.tokenizeStream():
+                tokens.append(token)
+                yield token
+
+        syntax = MTSyntaxAnalyzer(read(), self.program)
+        nodes, statementTokens, starts, ends = [], [], [], []
+        stop = len(self.nodes)
+        position = 0
+        for node in syntax.analyzeStream():
+            statement = tokens[position:syntax.position]
+            position = syntax.position
+            nodes.append(node)
+            statementTokens.append(statement)
+            starts.append(self.begin(statement[0]))
+            ends.append(statement[-1].end_pos)
+
+            if len(self.starts) > 0 and syntax.tokens.has(position):
+                start = self.begin(tokens[position])
+                if start >= stable:
+                    index = bisect_left(self.starts, start - delta, first)
+                    if index < len(self.starts) and self.starts[index] == start - delta:
+                        stop = index
+                        break
+
+        # errors of statements before the old ones are only raised by the parser when it reaches the end
+        if len(syntax.diagnostics) > 0:
+            raise MTDiagnosticError(syntax.diagnostics)
+        return nodes, statementTokens, starts, ends, stop
+
+    @staticmethod
+    def begin(token: MTToken) -> int:
+        # start_pos of a string is after its opening quote, a quote inserted before a statement starts a string there
+        return token.start_pos - (1 if token.sub_type == MTTokenSubType.STRING_VALUE else 0)
+
+    # moves the tokens of the statements from first to last to where they are now
+    def flush(self, first: int, last: int):
+        for index in range(first, min(last, len(self.nodes))):
+            shift = self.shifts[index]
+            if shift != None:
+                for token in self.statementTokens[index]:
+                    token.shift(shift)
+                self.shifts[index] = None
+
+    # Semantic Analysis
+    def check(self, first: int, base: int, end: int, nodes: list[MTNode]):
+        # nodes replaced the statements holding declarations[base:end]
+        MTSemanticAnalysis(nodes, self.program, dict(self.declarations[:base])).analyze()
+
+        declarations = []
+        for index, node in enumerate(nodes):
+            self.scopes[first + index] = base + len(declarations)
+            if type(node) is MTDeclare:
+                declarations.append((node.current.value, node.left.current.value))
+
+        if declarations == self.declarations[base:end]:
+            return
+
+        changed = {name for name, _ in set(declarations) ^ set(self.declarations[base:end])}
+        self.declarations[base:end] = declarations
+        after = first + len(nodes)
+        moved = len(declarations) - (end - base)
+        if moved != 0:
+            self.scopes[after:] = [scope + moved for scope in self.scopes[after:]]
+
+        # later statements using a changed name see other symbols now
+        for index in range(after, len(self.nodes)):
+            if not self.names[index].isdisjoint(changed):
+                self.flush(index, index + 1)
+                MTSemanticAnalysis([self.nodes[index]], self.program, dict(self.declarations[:self.scopes[index]])).analyze()
@@ -0,0 +1,578 @@
+import operator
+from typing import Callable
+
+from lib.syntax.data import *
+from lib.lexer.token_class import *
+from lib.semantic.scope import MTScopeAnalysis
+from lib.message import *
+from lib.interpreter.output import MTBufferedOutput
+from lib.interpreter.interpreter import MTRecursionDepth
+
+class MTClosureInterpreter:
+    # Converts every MTNode once into a Python closure calling the closures built for its children,
+    # so the dispatch on token types and values is done once instead of every time a node runs.
+    # Blocks run on the same symbol tree and value tree and forget, when they end, what MTScopeAnalysis
+    # says MTInterpreter would have thrown away with its copies.
+    # Operations nested deeper than MTRecursionDepth run one after the other on a stack of values instead.
+    operations = {
+        '+': operator.add,
+        '-': operator.sub,
+        '*': operator.mul,
+        '/': operator.truediv,
+        '<': operator.lt,
+        '>': operator.gt,
+        '==': operator.eq,
+        '<=': operator.le,
+        '>=': operator.ge,
+        '&&': lambda left, right: left and right,
+        '||': lambda left, right: left or right,
+    }
+
+    def __init__(self, nodes: list[MTNode], program: str, symbolTree: dict = {}, valueTree: dict = {}, output = None) -> None:
+        self.nodes: list[MTNode] = nodes
+        self.program: str = program
+        # what print writes to, anything with write(text) and flush() like MTInterpreter's
+        self.output = output if output != None else MTBufferedOutput()
+        self.__symbolTree = {}
+        self.__valueTree = {}
+        self.__symbolTree.update(symbolTree)
+        self.__valueTree.update(valueTree)
+        self.scopes = MTScopeAnalysis(nodes, set(self.__valueTree))
+        # variables declared at the point being compiled
+        self.symbols: set[str] = set(self.__symbolTree)
+        # for every open block, the bindings hidden by loop variables of for loops inside it
+        self.hidden: list[list] = []
+        # for every open block, how many for loops inside it may hide a binding
+        self.loops: list[int] = []
+        # set while compiling a for loop initializer, which MTInterpreter runs in an empty environment
+        self.isolated = False
+
+    def interpret(self):
+        try:
+            self.compile()()
+        finally:
+            self.output.flush()
+        return {
+            'symbol_tree': self.__symbolTree,
+            'value_tree': self.__valueTree,
+        }
+
+    def compile(self) -> Callable[[], None]:
+        self.scopes.analyze()
+        return self.compileStatements(self.nodes)
+
+    # Statements
+    def compileStatements(self, nodes: list[MTNode]) -> Callable[[], None]:
+        statements = tuple(self.compileStatement(node) for node in nodes)
+        if len(statements) == 1:
+            return statements[0]
+
+        def run():
+            for statement in statements:
+                statement()
+        return run
+
+    def compileStatement(self, node: MTNode) -> Callable[[], None]:
+        token = node.current
+        if token.type == MTTokenType.IDENTIFIER:
+            return self.compileIdentifier(node)
+        elif token.type == MTTokenType.KEYWORD:
+            return self.compileKeyword(node)
+        elif token.type == MTTokenType.OPERATOR and (token.value == '++' or token.value == '--') and node.left != None and node.left.current.type == MTTokenType.IDENTIFIER:
+            # the old value is not needed, so the variable is updated in place
+            values = self.__valueTree
+            name = node.left.current.value
+            step = 1 if token.value == '++' else -1
+            def update():
+                values[name] = values.get(name) + step
+            return update
+        elif token.type == MTTokenType.OPERATOR or token.type == MTTokenType.CONDITIONAL_OPERATOR or token.type == MTTokenType.LOGICAL_OPERATOR:
+            return self.compileExpression(node)
+        return self.error(token, f'Unexpected Node: {token.value}')
+
+    def compileBlock(self, owner: MTNode, nodes: list[MTNode]) -> Callable[[], None]:
+        symbols = self.symbols
+        self.symbols = set(symbols)
+        hidden = []
+        self.hidden.append(hidden)
+        self.loops.append(0)
+        statements = self.compileStatements(nodes)
+        loops = self.loops.pop()
+        self.hidden.pop()
+        self.symbols = symbols
+
+        scope = self.scopes.block(owner)
+        if scope.is_empty() and loops == 0 and len(scope.restored) == 0:
+            return statements
+
+        symbolTree = self.__symbolTree
+        valueTree = self.__valueTree
+        dropped_symbols = scope.symbols
+        dropped_values = scope.values
+        restored = scope.restored
+        def block():
+            kept = [valueTree.get(name) for name in restored]
+            statements()
+            while len(hidden) > 0:
+                name, had_symbol, symbol, had_value, value = hidden.pop()
+                if had_symbol:
+                    symbolTree[name] = symbol
+                else:
+                    symbolTree.pop(name, None)
+                if had_value:
+                    valueTree[name] = value
+                else:
+                    valueTree.pop(name, None)
+            for name, value in zip(restored, kept):
+                valueTree[name] = value
+            for name in dropped_symbols:
+                symbolTree.pop(name, None)
+            for name in dropped_values:
+                valueTree.pop(name, None)
+        return block
+
+    def compileKeyword(self, node: MTNode) -> Callable[[], None]:
+        value = node.current.value
+        if value == 'print':
+            return self.compilePrint(node)
+        elif value == 'pass':
+            return lambda: None
+        elif node.current.sub_type == MTTokenSubType.CONDITIONAL_KEYWORDS:
+            if value == 'if':
+                return self.compileIfElse(node)
+            elif value == 'switch':
+                return self.compileSwitch(node)
+        elif node.current.sub_type == MTTokenSubType.LOOPS_KEYWORDS:
+            if value == 'for':
+                return self.compileForLoop(node)
+            elif value == 'while':
+                return self.compileWhileLoop(node)
+            elif value == 'do':
+                return self.compileDoWhileLoop(node)
+        return self.error(node.current, f'Unexpected Node: {value}')
+
+    def compilePrint(self, node: MTNode) -> Callable[[], None]:
+        expression = self.compileExpression(node.right)
+        write = self.output.write
+        def interpretPrint():
+            exp = expression()
+            if exp != None:
+                if type(exp) is bool:
+                    exp = 'true' if exp else 'false'
+            else:
+                exp = 'null'
+            write(f'{exp}\n')
+        return interpretPrint
+
+    def compileIdentifier(self, node: MTNode) -> Callable[[], None]:
+        name = node.current.value
+        symbolTree = self.__symbolTree
+        valueTree = self.__valueTree
+        if node.left != None and name not in self.symbols:
+            self.symbols.add(name)
+            data_type = node.left.current.value
+            if node.right == None:
+                def declare():
+                    symbolTree[name] = data_type
+                return declare
+
+            expression = self.compileExpression(node.right)
+            def declareAssign():
+                symbolTree[name] = data_type
+                valueTree[name] = expression()
+            return declareAssign
+        elif node.left == None and name in self.symbols:
+            if node.right == None:
+                return lambda: None
+
+            expression = self.compileExpression(node.right)
+            def assign():
+                valueTree[name] = expression()
+            return assign
+        return self.error(node.current, f'Undefined variable: `{name}`')
+
+    # Conditional
+    def compileIfElse(self, node: MTNode) -> Callable[[], None]:
+        # (condition, token, block) for every branch, condition is None for `else`
+        branches = []
+        branch = node
+        while branch != None:
+            value = branch.current.value
+            if (value == 'if' or value == 'elif') and branch.left != None:
+                branches.append((self.compileExpression(branch.left), branch.current, self.compileBlock(branch, branch.statements)))
+            elif value == 'else':
+                branches.append((None, branch.current, self.compileBlock(branch, branch.statements)))
+                break
+            else:
+                branches.append((self.error(branch.current, 'Error while evaluating expression'), branch.current, None))
+                break
+            branch = branch.right
+
+        program = self.program
+        def interpretConditionIfElse():
+            for condition, token, block in branches:
+                if condition == None:
+                    block()
+                    return
+                exp = condition()
+                if exp is True:
+                    block()
+                    return
+                elif exp is not False:
+                    MTCompilerMessage.semanticError(program, token, token.start_pos, f'Expression should be type of `bool`')
+        return interpretConditionIfElse
+
+    def compileSwitch(self, node: MTNode) -> Callable[[], None]:
+        expression = self.compileExpression(node.left)
+        # (case value, block) pairs, the case value is None for `default`
+        cases = []
+        for statement in node.statements:
+            if statement.current.value == 'case':
+                cases.append((self.compileExpression(statement.left), self.compileBlock(statement, [statement.right])))
+            elif statement.current.value == 'default':
+                cases.append((None, self.compileBlock(statement, [statement.right])))
+                break
+            else:
+                cases.append((None, self.error(node.current, 'Invalid case')))
+                break
+
+        def interpretConditionSwitch():
+            exp = expression()
+            for case, block in cases:
+                if case == None or case() == exp:
+                    block()
+                    return
+        return interpretConditionSwitch
+
+    # Loops
+    def compileForLoop(self, node: MTNode) -> Callable[[], None]:
+        if node.left == None or len(node.left.statements) != 3 or node.left.statements[0].current.type != MTTokenType.IDENTIFIER or node.left.statements[0].left == None:
+            return self.error(node.current, 'Error while evaluating statement')
+
+        init, condition, increment = node.left.statements
+        name = init.current.value
+        data_type = init.left.current.value
+        initializer = None
+        if init.right != None:
+            self.isolated = True
+            initializer = self.compileExpression(init.right)
+            self.isolated = False
+
+        self.symbols.add(name)
+        condition = self.compileExpression(condition)
+        body = self.compileBlock(node, node.statements)
+        if increment.current.type == MTTokenType.OPERATOR and (increment.current.value == '++' or increment.current.value == '--'):
+            increment = self.compileStatement(increment)
+        else:
+            # evaluated as an expression, like MTInterpreter does, so `i = i + 1` only reads i
+            increment = self.compileExpression(increment)
+        self.symbols.discard(name)
+
+        # a loop variable hiding an outer one only gives it back when the enclosing block ends
+        hidden = None
+        if len(self.hidden) > 0:
+            hidden = self.hidden[-1]
+            self.loops[-1] += 1
+        symbolTree = self.__symbolTree
+        valueTree = self.__valueTree
+        def interpretForLoop():
+            exp = initializer() if initializer != None else None
+            if hidden != None:
+                hidden.append((name, name in symbolTree, symbolTree.get(name), name in valueTree, valueTree.get(name)))
+            symbolTree[name] = data_type
+            if initializer != None:
+                valueTree[name] = exp
+
+            while condition() is True:
+                body()
+                increment()
+
+            # an outer binding it hid keeps its place in the trees, with no value until the block puts it back
+            outer = hidden[-1] if hidden != None else None
+            if outer == None or not outer[1]:
+                del symbolTree[name]
+            if initializer != None:
+                if outer != None and outer[3]:
+                    valueTree[name] = None
+                else:
+                    del valueTree[name]
+        return interpretForLoop
+
+    def compileWhileLoop(self, node: MTNode) -> Callable[[], None]:
+        if node.left == None:
+            return self.error(node.current, 'Error while evaluating statement')
+
+        condition = self.compileExpression(node.left)
+        body = self.compileBlock(node, node.statements)
+        def interpretWhileLoop():
+            while condition() is True:
+                body()
+        return interpretWhileLoop
+
+    def compileDoWhileLoop(self, node: MTNode) -> Callable[[], None]:
+        body = self.compileBlock(node, node.statements)
+        condition = self.compileExpression(node.left.left)
+        def interpretDoWhileLoop():
+            body()
+            while condition() is True:
+                body()
+        return interpretDoWhileLoop
+
+    # Expression
+    def compileExpression(self, node: MTNode, depth: int = 0) -> Callable[[], object]:
+        if node == None:
+            return self.error(None, 'Error while evaluating expression')
+        if depth >= MTRecursionDepth:
+            return self.compileDeepExpression(node)
+
+        token = node.current
+        if token.type == MTTokenType.IDENTIFIER:
+            if self.isolated:
+                return lambda: None
+            name = token.value
+            get = self.__valueTree.get
+            return lambda: get(name)
+        elif token.type == MTTokenType.VALUE:
+            return self.compileValue(token)
+        elif token.type == MTTokenType.OPERATOR:
+            if token.value == '++' or token.value == '--':
+                return self.compileUpdate(node, depth)
+
+            left = self.compileExpression(node.left, depth + 1)
+            if token.value in ('+', '-', '*', '/') and self.isConstant(node.right):
+                # the right side is a literal most of the time (`n + 1`, `i * 2`)
+                return self.compileConstantOperation(token.value, left, self.compileValue(node.right.current)())
+
+            right = self.compileExpression(node.right, depth + 1)
+            if token.value == '+':
+                return lambda: left() + right()
+            elif token.value == '-':
+                return lambda: left() - right()
+            elif token.value == '*':
+                return lambda: left() * right()
+            elif token.value == '/':
+                return lambda: left() / right()
+            return self.evaluateThenError(left, right, token, 'Arithmentic operation not supported')
+        elif token.type == MTTokenType.CONDITIONAL_OPERATOR:
+            if token.value == '?' and node.left != None:
+                return self.compileTernary(node, depth)
+
+            left = self.compileExpression(node.left, depth + 1)
+            if token.value in ('<', '>', '==', '<=', '>=') and self.isConstant(node.right):
+                # loop conditions mostly compare with a literal (`i < 10`)
+                return self.compileConstantOperation(token.value, left, self.compileValue(node.right.current)())
+
+            right = self.compileExpression(node.right, depth + 1)
+            if token.value == '<':
+                return lambda: left() < right()
+            elif token.value == '>':
+                return lambda: left() > right()
+            elif token.value == '==':
+                return lambda: left() == right()
+            elif token.value == '<=':
+                return lambda: left() <= right()
+            elif token.value == '>=':
+                return lambda: left() >= right()
+            return self.evaluateThenError(left, right, token, 'Conditional operation not supported')
+        elif token.type == MTTokenType.LOGICAL_OPERATOR:
+            left = self.compileExpression(node.left, depth + 1)
+            right = self.compileExpression(node.right, depth + 1)
+            # both sides are always evaluated
+            if token.value == '&&':
+                def interpretAnd():
+                    leftExp = left()
+                    rightExp = right()
+                    return leftExp and rightExp
+                return interpretAnd
+            elif token.value == '||':
+                def interpretOr():
+                    leftExp = left()
+                    rightExp = right()
+                    return leftExp or rightExp
+                return interpretOr
+            return self.evaluateThenError(left, right, token, 'Conditional operation not supported')
+        return self.error(token, 'Error while evaluating expression')
+
+    def compileUpdate(self, node: MTNode, depth: int = 0) -> Callable[[], object]:
+        expression = self.compileExpression(node.left, depth + 1)
+        valueTree = self.__valueTree
+        name = node.left.current.value
+        step = 1 if node.current.value == '++' else -1
+        def update():
+            exp = expression()
+            valueTree[name] = exp + step
+            return exp
+        return update
+
+    def compileTernary(self, node: MTNode, depth: int = 0) -> Callable[[], object]:
+        condition = self.compileExpression(node.left, depth + 1)
+        program = self.program
+        token = node.current
+        if node.right == None:
+            def fail():
+                condition()
+                MTCompilerMessage.semanticError(program, token, token.start_pos, f'Error while evaluating expression')
+            return fail
+
+        left = self.compileExpression(node.right.left, depth + 1)
+        right = self.compileExpression(node.right.right, depth + 1)
+        def interpretTernary():
+            exp = condition()
+            if type(exp) is not bool:
+                MTCompilerMessage.semanticError(program, token, token.start_pos, f'Error while evaluating expression')
+            # both sides are evaluated before one is picked
+            leftExp = left()
+            rightExp = right()
+            return leftExp if exp else rightExp
+        return interpretTernary
+
+    def compileDeepExpression(self, node: MTNode) -> Callable[[], object]:
+        # The operations are listed operands first, from left to right, walking the expression with a stack, and
+        # each step of the list works on a stack of values, so neither compiling nor running the expression
+        # recurses. What is left to do for a node: 0 list it, 1 apply its operator, 2 check the condition of a
+        # ternary, 3 select its branch. Names, values and updates are compiled as usual, they don't nest.
+        steps = []
+        stack = [(node, 0)]
+        while len(stack) > 0:
+            node, step = stack.pop()
+            token = node.current if node != None else None
+            if step == 0:
+                if token == None or token.type not in (MTTokenType.OPERATOR, MTTokenType.CONDITIONAL_OPERATOR, MTTokenType.LOGICAL_OPERATOR) or token.value == '++' or token.value == '--':
+                    steps.append(self.pushStep(self.compileExpression(node)))
+                elif token.type == MTTokenType.CONDITIONAL_OPERATOR and token.value == '?' and node.left != None:
+                    stack.append((node, 2))
+                    stack.append((node.left, 0))
+                else:
+                    stack.append((node, 1))
+                    stack.append((node.right, 0))
+                    stack.append((node.left, 0))
+            elif step == 1:
+                steps.append(self.operationStep(token))
+            elif step == 2:
+                if node.right == None:
+                    steps.append(self.failStep(token, 'Error while evaluating expression'))
+                    continue
+                steps.append(self.checkStep(token))
+                # both sides are evaluated before one is picked
+                stack.append((node, 3))
+                stack.append((node.right.right, 0))
+                stack.append((node.right.left, 0))
+            else:
+                steps.append(self.selectStep)
+
+        steps = tuple(steps)
+        def interpretDeepExpression():
+            values = []
+            for step in steps:
+                step(values)
+            return values[0]
+        return interpretDeepExpression
+
+    def pushStep(self, expression: Callable[[], object]) -> Callable[[list], None]:
+        return lambda values: values.append(expression())
+
+    def operationStep(self, token: MTToken) -> Callable[[list], None]:
+        if token.type == MTTokenType.OPERATOR and token.value in ('+', '-', '*', '/'):
+            operation = self.operations[token.value]
+        elif token.type == MTTokenType.CONDITIONAL_OPERATOR and token.value in ('<', '>', '==', '<=', '>='):
+            operation = self.operations[token.value]
+        elif token.type == MTTokenType.LOGICAL_OPERATOR and token.value in ('&&', '||'):
+            operation = self.operations[token.value]
+        elif token.type == MTTokenType.OPERATOR:
+            return self.failStep(token, 'Arithmentic operation not supported')
+        else:
+            return self.failStep(token, 'Conditional operation not supported')
+
+        def apply(values):
+            right = values.pop()
+            values[-1] = operation(values[-1], right)
+        return apply
+
+    def checkStep(self, token: MTToken) -> Callable[[list], None]:
+        program = self.program
+        def check(values):
+            if type(values[-1]) is not bool:
+                MTCompilerMessage.semanticError(program, token, token.start_pos, f'Error while evaluating expression')
+        return check
+
+    @staticmethod
+    def selectStep(values: list):
+        right = values.pop()
+        left = values.pop()
+        values[-1] = left if values[-1] else right
+
+    def failStep(self, token: MTToken, message: str) -> Callable[[list], None]:
+        fail = self.error(token, message)
+        return lambda values: fail()
+
+    def compileConstantOperation(self, operator: str, left: Callable[[], object], constant: object) -> Callable[[], object]:
+        if operator == '+':
+            return lambda: left() + constant
+        elif operator == '-':
+            return lambda: left() - constant
+        elif operator == '*':
+            return lambda: left() * constant
+        elif operator == '/':
+            return lambda: left() / constant
+        elif operator == '<':
+            return lambda: left() < constant
+        elif operator == '>':
+            return lambda: left() > constant
+        elif operator == '==':
+            return lambda: left() == constant
+        elif operator == '<=':
+            return lambda: left() <= constant
+        return lambda: left() >= constant
+
+    def compileValue(self, token: MTToken) -> Callable[[], object]:
+        if token.sub_type == MTTokenSubType.NUMBER_VALUE:
+            convert = int
+        elif token.sub_type == MTTokenSubType.STRING_VALUE:
+            convert = str
+        elif token.sub_type == MTTokenSubType.BOOLEAN_VALUE:
+            value = token.value == 'true'
+            return lambda: value
+        elif token.sub_type == MTTokenSubType.DOUBLE_VALUE:
+            convert = float
+        else:
+            return self.error(token, 'Value type is not supported')
+
+        try:
+            value = convert(token.value)
+        except ValueError:
+            # keep the failure at run time, where the tree walker would raise it
+            text = token.value
+            return lambda: convert(text)
+        return lambda: value
+
+    # literals converted without an error can be folded into the operation using them
+    def isConstant(self, node: MTNode) -> bool:
+        if node == None or node.current.type != MTTokenType.VALUE:
+            return False
+        token = node.current
+        if token.sub_type == MTTokenSubType.BOOLEAN_VALUE or token.sub_type == MTTokenSubType.STRING_VALUE:
+            return True
+        try:
+            if token.sub_type == MTTokenSubType.NUMBER_VALUE:
+                int(token.value)
+                return True
+            elif token.sub_type == MTTokenSubType.DOUBLE_VALUE:
+                float(token.value)
+                return True
+        except ValueError:
+            pass
+        return False
+
+    def evaluateThenError(self, left: Callable[[], object], right: Callable[[], object], token: MTToken, message: str) -> Callable[[], None]:
+        program = self.program
+        def fail():
+            left()
+            right()
+            MTCompilerMessage.semanticError(program, token, token.start_pos, message)
+        return fail
+
+    def error(self, token: MTToken, message: str) -> Callable[[], None]:
+        program = self.program
+        def fail():
+            MTCompilerMessage.semanticError(program, token, token.start_pos, message)
+        return fail
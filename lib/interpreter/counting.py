@@ -0,0 +1,56 @@
+from lib.syntax.data import *
+from lib.interpreter.interpreter import MTInterpreter
+
+class MTCountingInterpreter(MTInterpreter):
+    # MTInterpreter counting the statements and expressions it evaluates and the iterations of loops, for --stats.
+    # A separate class so the interpreter run without --stats doesn't pay for the counters.
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.statementCount = 0
+        self.expressionCount = 0
+        self.iterationCount = 0
+        # bodies of the loops started so far, a block run for one of them is an iteration
+        self.loopBodies: set[int] = set()
+
+    def interpretStatement(self, node: MTNode):
+        self.statementCount += 1
+        kind = type(node)
+        if kind is MTFor or kind is MTWhile or kind is MTDoWhile:
+            self.loopBodies.add(id(node.statements))
+        super().interpretStatement(node)
+
+    def interpretBlock(self, nodes: list[MTNode], size: int, restored: tuple = ()):
+        if id(nodes) in self.loopBodies:
+            self.iterationCount += 1
+        super().interpretBlock(nodes, size, restored)
+
+    def interpretExpression(self, node: MTNode, depth: int = 0):
+        self.expressionCount += 1
+        return super().interpretExpression(node, depth)
+
+    def interpretOperators(self, node: MTNode):
+        # the nodes under a deep one are evaluated without interpretExpression, they are counted as if they were
+        self.expressionCount += self.operands(node)
+        return super().interpretOperators(node)
+
+    @staticmethod
+    def operands(node: MTNode) -> int:
+        # nodes evaluated to evaluate node, without node itself
+        count = 0
+        stack = [node]
+        while len(stack) > 0:
+            node = stack.pop()
+            kind = type(node)
+            if (kind is MTBinaryOp or kind is MTTernary) and node.invariant != None:
+                continue
+            if kind is MTTernary:
+                children = (node.left,) if node.right == None else (node.left, node.right.left, node.right.right)
+            elif kind is MTBinaryOp or kind is MTIncrement:
+                children = (node.left, node.right)
+            else:
+                continue
+            for child in children:
+                if child != None:
+                    count += 1
+                    stack.append(child)
+        return count
@@ -0,0 +1,26 @@
+class MTEnvironment:
+    # Chain of frames, one per block being run, on top of the global frame.
+    # A frame is a plain list of values indexed by the slots MTResolver gives to variables, so reading or writing
+    # a variable is two list lookups whatever the number of variables around it.
+    # Frames are kept for reuse, so running a block again allocates nothing. Their old values are never cleared:
+    # the resolver only hands out the slot of a value once the running block has written it.
+    def __init__(self, size: int = 0) -> None:
+        self.frames: list[list] = [[None] * size]
+        self.depth = 0
+
+    def push(self, size: int):
+        self.depth += 1
+        if self.depth == len(self.frames):
+            self.frames.append([None] * size)
+        elif len(self.frames[self.depth]) < size:
+            self.frames[self.depth].extend([None] * (size - len(self.frames[self.depth])))
+
+    def pop(self):
+        self.depth -= 1
+
+    # Values
+    def load(self, slot: tuple[int, int]):
+        return self.frames[slot[0]][slot[1]]
+
+    def store(self, slot: tuple[int, int], value):
+        self.frames[slot[0]][slot[1]] = value
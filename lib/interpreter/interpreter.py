@@ -1,53 +1,110 @@
+import operator
+
 from lib.syntax.data import *
 from lib.lexer.token_class import *
 from lib.message import *
+from lib.semantic.resolver import MTResolver
+from lib.optimizer.licm import MTInvariant
+from lib.interpreter.environment import MTEnvironment
+from lib.interpreter.output import MTBufferedOutput
+
+# marks a loop invariant expression not evaluated yet
+MTUnset = object()
+
+# levels of an expression evaluated by recursion, deeper ones are evaluated on explicit stacks
+MTRecursionDepth = 64
 
 class MTInterpreter:
-    def __init__(self, nodes: list[MTNode], program: str, symbolTree: dict = {}, valueTree: dict = {}, isLoopStatement = False) -> None:
+    operations = {
+        MTOperator.ADD: operator.add,
+        MTOperator.SUB: operator.sub,
+        MTOperator.MUL: operator.mul,
+        MTOperator.DIV: operator.truediv,
+        MTOperator.LT: operator.lt,
+        MTOperator.GT: operator.gt,
+        MTOperator.EQ: operator.eq,
+        MTOperator.LE: operator.le,
+        MTOperator.GE: operator.ge,
+        MTOperator.AND: lambda left, right: left and right,
+        MTOperator.OR: lambda left, right: left or right,
+    }
+
+    def __init__(self, nodes: list[MTNode], program: str, symbolTree: dict = {}, valueTree: dict = {}, isLoopStatement = False, resolver: MTResolver = None, output = None) -> None:
         self.nodes: list[MTNode] = nodes
         self.program: str = program
         self.isLoopStatement: bool = isLoopStatement
         self.position = 0
-        self.__symbolTree = {}
-        self.__valueTree = {}
-        self.__symbolTree.update(symbolTree)
-        self.__valueTree.update(valueTree)
-    
-    def interpret(self):
-        while self.position < len(self.nodes):
-            if self.match(self.peek(), MTTokenType.IDENTIFIER):
-                self.interpretIdentifier(self.peek())
-                self.advance()
-            elif self.match(self.peek(), MTTokenType.KEYWORD):
-                self.interpretKeyword(self.peek())
-                self.advance()
-            elif self.match(self.peek(), MTTokenType.OPERATOR) or self.match(self.peek(), MTTokenType.CONDITIONAL_OPERATOR) or self.match(self.peek(), MTTokenType.LOGICAL_OPERATOR):
-                self.interpretExpression(self.peek())
-                self.advance()
-            else:
-                MTCompilerMessage.semanticError(self.program, self.peek().current, self.peek().current.start_pos, f'Unexpected Node: {self.nodes[self.position].current.value}')
+        self.valueTree: dict = valueTree
+        self.resolver: MTResolver = resolver if resolver != None else MTResolver(nodes, symbolTree, valueTree)
+        self.environment = None
+        # values of the loop invariant expressions evaluated since their loop started
+        self.invariants: dict[int, object] = {}
+        # what print writes to, anything with write(text) and flush() like MTCaptureOutput
+        self.output = output if output != None else MTBufferedOutput()
 
-        if self.peek() != None:
-            MTCompilerMessage.semanticError(self.program, self.peek().current, self.peek().current.start_pos, f'Unexpected Node: {self.nodes[self.position].current.value}')
+    def interpret(self):
+        # variables are resolved to slots before anything runs
+        self.resolver.resolve()
+        self.environment = MTEnvironment(self.resolver.frameSize)
+        for name, value in self.valueTree.items():
+            self.environment.store(self.resolver.valueSlots[name], value)
 
+        try:
+            self.interpretStatements()
+        finally:
+            self.output.flush()
         return {
-            'symbol_tree': self.__symbolTree,
-            'value_tree': self.__valueTree,
+            'symbol_tree': dict(self.resolver.symbolTree),
+            'value_tree': {name: self.environment.load(slot) for name, slot in self.resolver.valueSlots.items()},
         }
-    
-    # Functions
-    def interpretKeyword(self, node: MTNode):
-        if self.match(node, MTTokenType.KEYWORD, expected_value='print'):
+
+    # Runs nodes in a new frame of the environment
+    def interpretBlock(self, nodes: list[MTNode], size: int, restored: tuple = ()):
+        # restored are the slots of outer variables whose value on entry comes back when the block ends
+        kept = [self.environment.load(slot) for slot in restored] if len(restored) > 0 else None
+        parent = (self.nodes, self.position)
+        self.nodes = nodes
+        self.position = 0
+        self.environment.push(size)
+        self.interpretStatements()
+        self.environment.pop()
+        self.nodes, self.position = parent
+        if kept != None:
+            for slot, value in zip(restored, kept):
+                self.environment.store(slot, value)
+
+    def interpretStatements(self):
+        while self.position < len(self.nodes):
+            self.interpretStatement(self.nodes[self.position])
+            self.position += 1
+
+    def interpretStatement(self, node: MTNode):
+        kind = type(node)
+        if kind is MTDeclare or kind is MTAssign:
+            self.interpretIdentifier(node)
+        elif kind is MTPrint:
             self.interpretPrint(node)
+        elif kind is MTIf:
+            self.interpretConditionIfElse(node)
+        elif kind is MTSwitch:
+            self.interpretConditionSwitch(node)
+        elif kind is MTFor:
+            self.resetInvariants(node)
+            self.interpretForLoop(node)
+        elif kind is MTWhile:
+            self.resetInvariants(node)
+            self.interpretWhileLoop(node)
+        elif kind is MTDoWhile:
+            self.resetInvariants(node)
+            self.interpretDoWhileLoop(node)
+        elif kind is MTBinaryOp or kind is MTTernary or kind is MTIncrement:
+            self.interpretExpression(node)
         elif self.match(node, MTTokenType.KEYWORD, expected_value='pass'):
             pass
-        elif self.match(node, MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS):
-            self.interpretCondition(node)
-        elif self.match(node, MTTokenType.KEYWORD, MTTokenSubType.LOOPS_KEYWORDS):
-            self.interpretLoop(node)
         else:
-            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Unexpected Node: {self.nodes[self.position].current.value}')
-
+            self.semanticError(node.current, node.current.start_pos, f'Unexpected Node: {node.current.value}')
+    
+    # Functions
     def interpretPrint(self, node: MTNode):
         exp = self.interpretExpression(node.right)
         if exp != None:
@@ -55,216 +112,231 @@ class MTInterpreter:
                 exp = 'true' if exp else 'false'
         else:
             exp = 'null'
-        print(exp)
+        self.output.write(f'{exp}\n')
 
     def interpretIdentifier(self, node: MTNode):
-        if node.left != None and node.current.value not in self.__symbolTree:
-            self.__symbolTree[node.current.value] = node.left.current.value
-            if node.right != None:
-                exp = self.interpretExpression(node.right)
-                self.__valueTree[node.current.value] = exp
-        elif node.left == None and node.current.value in self.__symbolTree:
-            if node.right != None:
-                exp = self.interpretExpression(node.right)
-                self.__valueTree[node.current.value] = exp
-        else:
-            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Undefined variable: `{node.current.value}`')
+        # the resolver leaves no slot to declarations of existing variables and assignments of undeclared ones
+        if node.slot == None:
+            self.semanticError(node.current, node.current.start_pos, f'Undefined variable: `{node.current.value}`')
+        elif node.right != None:
+            exp = self.interpretExpression(node.right)
+            self.environment.store(node.slot, exp)
     
     # Conditional
-    def interpretCondition(self, node: MTNode):
-        if self.match(node, MTTokenType.KEYWORD, expected_value='if'):
-            self.interpretConditionIfElse(node)
-        elif self.match(node, MTTokenType.KEYWORD, expected_value='switch'):
-            self.interpretConditionSwitch(node)
-        else:
-            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Unexpected Node: {self.nodes[self.position].current.value}')
-    
     def interpretConditionIfElse(self, node: MTNode):
         exp = True
         if (node.current.value == 'if' or node.current.value == 'elif') and node.left != None:
             exp = self.interpretExpression(node.left)
         elif node.current.value != 'else':
-            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating expression')
+            self.semanticError(node.current, node.current.start_pos, f'Error while evaluating expression')
         
         if type(exp) is bool:
             if exp:
-                data = MTInterpreter(node.statements, self.program, self.__symbolTree, self.__valueTree).interpret()
-                for v in data['value_tree']:
-                    if v in self.__valueTree:
-                        self.__valueTree[v] = data['value_tree'][v]
+                self.interpretBlock(node.statements, node.frame_size, node.restored)
             elif node.right != None:
                 self.interpretConditionIfElse(node.right)
         else:
-            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Expression should be type of `bool`')
+            self.semanticError(node.current, node.current.start_pos, f'Expression should be type of `bool`')
     
     def interpretConditionSwitch(self, node: MTNode):
         exp = self.interpretExpression(node.left)
         
         for statement in node.statements:
-            if self.match(statement, MTTokenType.KEYWORD, expected_value='case'):
+            if type(statement) is MTCase and statement.current.value == 'case':
                 leftExp = self.interpretExpression(statement.left)
                 if leftExp == exp:
-                    data = MTInterpreter([statement.right], self.program, self.__symbolTree, self.__valueTree).interpret()
-                    for v in data['value_tree']:
-                        if v in self.__valueTree:
-                            self.__valueTree[v] = data['value_tree'][v]
+                    self.interpretBlock([statement.right], statement.frame_size, statement.restored)
                     break
-            elif self.match(statement, MTTokenType.KEYWORD, expected_value='default'):
-                data = MTInterpreter([statement.right], self.program, self.__symbolTree, self.__valueTree).interpret()
-                for v in data['value_tree']:
-                    if v in self.__valueTree:
-                        self.__valueTree[v] = data['value_tree'][v]
+            elif type(statement) is MTCase:
+                self.interpretBlock([statement.right], statement.frame_size, statement.restored)
                 break
             else:
-                MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Invalid case')
+                self.semanticError(node.current, node.current.start_pos, f'Invalid case')
 
     # Loops
-    def interpretLoop(self, node: MTNode):
-        if self.match(node, MTTokenType.KEYWORD, expected_value='for'):
-            self.interpretForLoop(node)
-        elif self.match(node, MTTokenType.KEYWORD, expected_value='while'):
-            self.interpretWhileLoop(node)
-        elif self.match(node, MTTokenType.KEYWORD, expected_value='do'):
-            self.interpretDoWhileLoop(node)
-        else:
-            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Unexpected Node: {self.nodes[self.position].current.value}')
-    
+    def resetInvariants(self, node: MTNode):
+        for index in node.invariants:
+            self.invariants.pop(index, None)
+
     def interpretForLoop(self, node: MTNode):
         if node.left != None:
             logic = node.left
             if len(logic.statements) == 3:
-                tree = MTInterpreter([logic.statements[0]], self.program).interpret()
-
-                self.__symbolTree.update(tree['symbol_tree'])
-                self.__valueTree.update(tree['value_tree'])
+                # the initializer only sees an empty environment, the resolver gave it no slots to read
+                init = logic.statements[0]
+                if type(init) is MTDeclare:
+                    self.interpretIdentifier(init)
+                else:
+                    self.interpretExpression(init)
 
                 exp = self.interpretExpression(logic.statements[1])
                 while type(exp) is bool and exp:
-                    data = MTInterpreter(node.statements, self.program, self.__symbolTree, self.__valueTree).interpret()
-                    for v in data['value_tree']:
-                        if v in self.__valueTree:
-                            self.__valueTree[v] = data['value_tree'][v]
+                    self.interpretBlock(node.statements, node.frame_size, node.restored)
                     
                     self.interpretExpression(logic.statements[2])
                     exp = self.interpretExpression(logic.statements[1])
-                
-                for i in tree['symbol_tree']:
-                    del self.__symbolTree[i]
-                for i in tree['value_tree']:
-                    del self.__valueTree[i]
             else:
-                MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating statement')
+                self.semanticError(node.current, node.current.start_pos, f'Error while evaluating statement')
         else:
-            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating statement')
+            self.semanticError(node.current, node.current.start_pos, f'Error while evaluating statement')
         pass
 
     def interpretWhileLoop(self, node: MTNode):
         if node.left != None:
             exp = self.interpretExpression(node.left)
             while type(exp) is bool and exp:
-                data = MTInterpreter(node.statements, self.program, self.__symbolTree, self.__valueTree).interpret()
-                for v in data['value_tree']:
-                    if v in self.__valueTree:
-                        self.__valueTree[v] = data['value_tree'][v]
+                self.interpretBlock(node.statements, node.frame_size, node.restored)
                 exp = self.interpretExpression(node.left)
         else:
-            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating statement')
+            self.semanticError(node.current, node.current.start_pos, f'Error while evaluating statement')
     
     def interpretDoWhileLoop(self, node: MTNode):
         exp = True
         while type(exp) is bool and exp:
-            data = MTInterpreter(node.statements, self.program, self.__symbolTree, self.__valueTree).interpret()
-            for v in data['value_tree']:
-                if v in self.__valueTree:
-                    self.__valueTree[v] = data['value_tree'][v]
+            self.interpretBlock(node.statements, node.frame_size, node.restored)
             exp = self.interpretExpression(node.left.left)
 
     # Expression
-    def interpretExpression(self, node: MTNode):
-        if self.match(node, MTTokenType.IDENTIFIER):
-            if node.current.value in self.__valueTree:
-                return self.__valueTree[node.current.value]
-        elif self.match(node, MTTokenType.VALUE):
-            if node.current.sub_type == MTTokenSubType.NUMBER_VALUE:
-                return int(node.current.value)
-            elif node.current.sub_type == MTTokenSubType.STRING_VALUE:
-                return str(node.current.value)
-            elif node.current.sub_type == MTTokenSubType.BOOLEAN_VALUE:
-                return True if node.current.value == 'true' else False
-            elif node.current.sub_type == MTTokenSubType.DOUBLE_VALUE:
-                return float(node.current.value)
+    def interpretExpression(self, node: MTNode, depth: int = 0):
+        # Recursion is the fastest walk over the small expressions of most statements. Below MTRecursionDepth
+        # the rest of the expression is evaluated by interpretOperators, so a deep one never exhausts the stack.
+        kind = type(node)
+        if kind is MTName:
+            return self.environment.load(node.slot) if node.slot != None else None
+        elif kind is MTLiteral:
+            return node.value if node.value != None else self.interpretValue(node)
+        elif depth >= MTRecursionDepth:
+            return self.interpretOperators(node)
+        elif kind is MTBinaryOp:
+            if node.invariant != None:
+                return self.interpretInvariant(node.invariant)
+
+            leftExp = self.interpretExpression(node.left, depth + 1)
+            rightExp = self.interpretExpression(node.right, depth + 1)
+
+            operation = self.operations.get(node.operator)
+            if operation != None:
+                return operation(leftExp, rightExp)
+            elif node.current.type == MTTokenType.OPERATOR:
+                self.semanticError(node.current, node.current.start_pos, f'Arithmentic operation not supported')
             else:
-                MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Value type is not supported')
-        elif self.match(node, MTTokenType.OPERATOR):
-            if node.current.value == '++' or node.current.value == '--':
-                exp = self.interpretExpression(node.left)
-                if node.current.value == '++':
-                    self.__valueTree[node.left.current.value] = exp + 1
-                    return exp
-                elif node.current.value == '--':
-                    self.__valueTree[node.left.current.value] = exp - 1
-                    return exp
+                self.semanticError(node.current, node.current.start_pos, f'Conditional operation not supported')
+        elif kind is MTTernary:
+            if node.invariant != None:
+                return self.interpretInvariant(node.invariant)
 
-            leftExp = self.interpretExpression(node.left)
-            rightExp = self.interpretExpression(node.right)
-            
-            if node.current.value == '+':
-                return leftExp + rightExp
-            elif node.current.value == '-':
-                return leftExp - rightExp
-            elif node.current.value == '*':
-                return leftExp * rightExp
-            elif node.current.value == '/':
-                return leftExp / rightExp
+            exp = self.interpretExpression(node.left, depth + 1)
+            if type(exp) != bool:
+                self.semanticError(node.current, node.current.start_pos, f'Error while evaluating expression')
+            elif node.right != None:
+                subNode = node.right
+                leftExp = self.interpretExpression(subNode.left, depth + 1)
+                rightExp = self.interpretExpression(subNode.right, depth + 1)
+                return leftExp if exp else rightExp
             else:
-                MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Arithmentic operation not supported')
-        elif self.match(node, MTTokenType.CONDITIONAL_OPERATOR):
-            if node.current.value == '?' and node.left != None:
-                exp = self.interpretExpression(node.left)
-                
-                if type(exp) != bool:
-                    MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating expression')
+                self.semanticError(node.current, node.current.start_pos, f'Error while evaluating expression')
+        elif kind is MTIncrement:
+            exp = self.interpretExpression(node.left, depth + 1)
+            if node.step == 1:
+                self.environment.store(node.slot, exp + 1)
+            else:
+                self.environment.store(node.slot, exp - 1)
+            return exp
+        else:
+            self.semanticError(node.current, node.current.start_pos, f'Error while evaluating expression')
+
+    def interpretOperators(self, node: MTNode):
+        # An operator waits on a stack for the values of its operands, which are evaluated from left to right
+        # onto another stack, so the depth of the expression never becomes recursion. What is left to do for a
+        # node: 0 evaluate it, 1 apply its operator, 2 test the condition of a ternary, 3 select its branch,
+        # 4 store the incremented variable.
+        load = self.environment.load
+        operations = self.operations
+        values = []
+        push = values.append
+        pop = values.pop
+        stack = [(node, 0)]
+        while len(stack) > 0:
+            node, step = stack.pop()
+            kind = type(node)
+            if step == 0:
+                if kind is MTName:
+                    push(load(node.slot) if node.slot != None else None)
+                elif kind is MTLiteral:
+                    push(node.value if node.value != None else self.interpretValue(node))
+                elif (kind is MTBinaryOp or kind is MTTernary) and node.invariant != None:
+                    push(self.interpretInvariant(node.invariant))
+                elif kind is MTBinaryOp:
+                    stack.append((node, 1))
+                    stack.append((node.right, 0))
+                    stack.append((node.left, 0))
+                elif kind is MTTernary:
+                    stack.append((node, 2))
+                    stack.append((node.left, 0))
+                elif kind is MTIncrement:
+                    stack.append((node, 4))
+                    stack.append((node.left, 0))
+                else:
+                    self.semanticError(node.current, node.current.start_pos, f'Error while evaluating expression')
+            elif step == 1:
+                rightExp = pop()
+                operation = operations.get(node.operator)
+                if operation != None:
+                    values[-1] = operation(values[-1], rightExp)
+                elif node.current.type == MTTokenType.OPERATOR:
+                    self.semanticError(node.current, node.current.start_pos, f'Arithmentic operation not supported')
+                else:
+                    self.semanticError(node.current, node.current.start_pos, f'Conditional operation not supported')
+            elif step == 2:
+                if type(values[-1]) != bool:
+                    self.semanticError(node.current, node.current.start_pos, f'Error while evaluating expression')
                 elif node.right != None:
-                    subNode = node.right
-                    leftExp = self.interpretExpression(subNode.left)
-                    rightExp = self.interpretExpression(subNode.right)
-                    return leftExp if exp else rightExp
+                    # both branches are evaluated, then one of them is kept
+                    stack.append((node, 3))
+                    stack.append((node.right.right, 0))
+                    stack.append((node.right.left, 0))
                 else:
-                    MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating expression')
-            
-            leftExp = self.interpretExpression(node.left)
-            rightExp = self.interpretExpression(node.right)
-
-            if node.current.value == '<':
-                return leftExp < rightExp
-            elif node.current.value == '>':
-                return leftExp > rightExp
-            elif node.current.value == '==':
-                return leftExp == rightExp
-            elif node.current.value == '<=':
-                return leftExp <= rightExp
-            elif node.current.value == '>=':
-                return leftExp >= rightExp
+                    self.semanticError(node.current, node.current.start_pos, f'Error while evaluating expression')
+            elif step == 3:
+                rightExp = pop()
+                leftExp = pop()
+                values[-1] = leftExp if values[-1] else rightExp
             else:
-                MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Conditional operation not supported')
-        elif self.match(node, MTTokenType.LOGICAL_OPERATOR):
-            leftExp = self.interpretExpression(node.left)
-            rightExp = self.interpretExpression(node.right)
+                if node.step == 1:
+                    self.environment.store(node.slot, values[-1] + 1)
+                else:
+                    self.environment.store(node.slot, values[-1] - 1)
+        return values[0]
 
-            if node.current.value == '&&':
-                return leftExp and rightExp
-            elif node.current.value == '||':
-                return leftExp or rightExp
-            else:
-                MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Conditional operation not supported')
+    # literals the parser couldn't read, reported here as the tree walker always did
+    def interpretValue(self, node: MTLiteral):
+        if node.current.sub_type == MTTokenSubType.NUMBER_VALUE:
+            return int(node.current.value)
+        elif node.current.sub_type == MTTokenSubType.STRING_VALUE:
+            return str(node.current.value)
+        elif node.current.sub_type == MTTokenSubType.BOOLEAN_VALUE:
+            return True if node.current.value == 'true' else False
+        elif node.current.sub_type == MTTokenSubType.DOUBLE_VALUE:
+            return float(node.current.value)
         else:
-            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating expression')
+            self.semanticError(node.current, node.current.start_pos, f'Value type is not supported')
     
+    def interpretInvariant(self, invariant: MTInvariant):
+        value = self.invariants.get(invariant.index, MTUnset)
+        if value is MTUnset:
+            value = self.invariants[invariant.index] = self.interpretExpression(invariant.expression)
+        return value
+
     # Core Functions
+    def semanticError(self, token: MTToken, position: int, error: str):
+        # what the script printed comes before the error
+        self.output.flush()
+        MTCompilerMessage.semanticError(self.program, token, position, error)
+
     def consume(self, node: MTNode, expected_type: MTTokenType, expected_sub_type: MTTokenSubType = MTTokenSubType.NONE, expected_value: str = None):
         if self.match(node, expected_type, expected_sub_type, expected_value):
             return node
-        MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'TypeError: Unexpected Node : {node.current.value}')
+        self.semanticError(node.current, node.current.start_pos, f'TypeError: Unexpected Node : {node.current.value}')
 
     def match(self, node: MTNode, expected_type: MTTokenType, expected_sub_type: MTTokenSubType = MTTokenSubType.NONE, expected_value: str = None):
         if self.is_at_end():
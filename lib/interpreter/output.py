@@ -0,0 +1,43 @@
+import sys
+
+class MTBufferedOutput:
+    # Where the interpreter writes what a script prints: the lines are joined and written to the stream once
+    # `flush_size` characters are waiting, so a loop printing millions of lines makes a few large writes instead
+    # of one per print. Without a stream it writes to sys.stdout as it is when flushed, which redirect_stdout can
+    # replace. The interpreter flushes it when the script ends or fails, before the error is printed.
+    def __init__(self, stream = None, flush_size: int = 64 * 1024) -> None:
+        self.stream = stream
+        # 0 writes every line right away
+        self.flush_size = flush_size
+        self.buffer: list[str] = []
+        self.size = 0
+
+    def write(self, text: str):
+        self.buffer.append(text)
+        self.size += len(text)
+        if self.size >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        if len(self.buffer) > 0:
+            stream = self.stream if self.stream != None else sys.stdout
+            stream.write(''.join(self.buffer))
+            self.buffer.clear()
+            self.size = 0
+
+class MTCaptureOutput:
+    # Keeps what a script prints in memory, for programs embedding the interpreter
+    def __init__(self) -> None:
+        self.buffer: list[str] = []
+
+    def write(self, text: str):
+        self.buffer.append(text)
+
+    def flush(self):
+        pass
+
+    def getvalue(self) -> str:
+        return ''.join(self.buffer)
+
+    def lines(self) -> list[str]:
+        return self.getvalue().splitlines()
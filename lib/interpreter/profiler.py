@@ -0,0 +1,86 @@
+import os
+from time import perf_counter
+
+from lib.syntax.data import *
+from lib.interpreter.counting import MTCountingInterpreter
+
+class MTLineProfiler(MTCountingInterpreter):
+    # MTInterpreter timing every statement it runs and adding it up per source line, for --profile-lines.
+    # A line gets the number of statements run on it, their total time, including the blocks they run, and their
+    # self time, without the statements run inside them. Loop and if conditions are part of the self time of their
+    # statement. A statement inside another one on the same line is only added to the total time once.
+    # A separate class so the interpreter run without --profile-lines doesn't pay for the timers.
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # line -> [count, total time, self time]
+        self.lines: dict[int, list] = {}
+        # statements of every line being run
+        self.active: dict[int, int] = {}
+        # time of the statements run inside the current one
+        self.childTime = 0.0
+
+    def interpretStatement(self, node: MTNode):
+        line = node.current.line
+        outer = self.childTime
+        self.childTime = 0.0
+        self.active[line] = self.active.get(line, 0) + 1
+        start = perf_counter()
+        try:
+            super().interpretStatement(node)
+        finally:
+            elapsed = perf_counter() - start
+            self.active[line] -= 1
+            entry = self.lines.get(line)
+            if entry == None:
+                entry = self.lines[line] = [0, 0.0, 0.0]
+            entry[0] += 1
+            if self.active[line] == 0:
+                entry[1] += elapsed
+            entry[2] += elapsed - self.childTime
+            self.childTime = outer + elapsed
+
+    # Reports
+    def report(self) -> list[dict]:
+        # executed lines, the most self time first
+        source = self.program.split('\n')
+        rows = [{
+            'line': line,
+            'count': count,
+            'total_time': total,
+            'self_time': own,
+            'source': source[line - 1].strip() if 0 < line <= len(source) else '',
+        } for line, (count, total, own) in self.lines.items()]
+        rows.sort(key=lambda row: (-row['self_time'], row['line']))
+        return rows
+
+    def formatReport(self) -> str:
+        rows = self.report()
+        elapsed = sum(row['self_time'] for row in rows)
+        lines = [f"{'Line':>6} {'Count':>10} {'Total (ms)':>12} {'Self (ms)':>12} {'Self %':>7}  Source"]
+        for row in rows:
+            share = row['self_time'] / elapsed * 100 if elapsed > 0 else 0.0
+            lines.append(f"{row['line']:>6} {row['count']:>10} {row['total_time'] * 1000:>12.3f} {row['self_time'] * 1000:>12.3f} {share:>6.1f}%  {row['source']}")
+        return '\n'.join(lines) + '\n'
+
+    def formatSource(self) -> str:
+        # every line of the program with the count and self time of what ran on it
+        lines = [f"{'Count':>10} {'Self (ms)':>12} | Source"]
+        source = self.program.split('\n')
+        if source[-1] == '':
+            source.pop()
+        for line, text in enumerate(source, 1):
+            entry = self.lines.get(line)
+            if entry != None:
+                lines.append(f'{entry[0]:>10} {entry[2] * 1000:>12.3f} | {text}')
+            else:
+                lines.append(f"{'':>10} {'':>12} | {text}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, directory: str):
+        for name, content in (('profile.txt', self.formatReport()), ('profile_source.txt', self.formatSource())):
+            path = os.path.join(directory, name)
+            try:
+                with open(path, 'w') as file:
+                    file.write(content)
+            except IOError:
+                print(f"Error writing to file '{path}'.")
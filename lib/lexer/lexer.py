@@ -1,4 +1,7 @@
 from lib.lexer.token_class import *
+from lib.lexer.line_index import MTLineIndex
+from lib.lexer.token_buffer import MTTokenBuffer
+from lib.lexer.parallel import MTParallelLexer
 from lib.dict import *
 from lib.message import *
 
@@ -8,55 +11,81 @@ class MTLexerAnalyzer:
         self.file = file
         self.position = 0
         self.tokens = []
-        pass
+        self.line_index = MTLineIndex.for_program(program)
 
     def tokenize(self):
         while self.position < len(self.program):
-            char: str = self.program[self.position]
-            
-            # check if current char is space and continue to read another characters
-            if char.isspace():
-                self.position += 1
-                continue
+            self.tokenizeNext()
 
-            # check if identifier or keyword
-            elif char.isalpha():
-                self.tokenizeKeywordIdentifier()
+        return self.tokens
+    
+    # yields the tokens as soon as they are read instead of keeping the whole list
+    def tokenizeStream(self):
+        while self.position < len(self.program):
+            self.tokenizeNext()
+            if len(self.tokens) > 0:
+                yield from self.tokens
+                self.tokens.clear()
+    
+    # reads every token into a compact column wise buffer
+    def tokenizeBuffer(self) -> MTTokenBuffer:
+        buffer = MTTokenBuffer(self.file, self.line_index)
+        buffer.extend(self.tokenizeStream())
+        return buffer
+    
+    # reads every token on a pool of processes, into a compact buffer when compact is set
+    def tokenizeParallel(self, workers: int = None, compact: bool = False):
+        return MTParallelLexer(self, workers).tokenize(compact)
+    
+    # reads the tokens up to end, where no token may continue
+    def tokenizeUntil(self, end: int):
+        while self.position < end:
+            self.tokenizeNext()
+    
+    # reads the lexeme starting at the current position
+    def tokenizeNext(self):
+        char: str = self.program[self.position]
+        
+        # check if current char is space and continue to read another characters
+        if char.isspace():
+            self.position += 1
 
-            # check for comments
-            elif char == '#' or (char == '/' and len(self.program) > self.position and self.program[self.position + 1] == '/'):
-                self.tokenizeComment()
-            
-            # check if number
-            elif char.isdigit() or (char == '-' and self.is_next_digit()):
-                self.tokenizeDigit()
-            
-            # check if string
-            elif char == "'" or char == '"':
-                self.position += 1
-                self.tokenizeString(char)
-            
-            # check if statement end
-            elif char == ';':
-                self.tokenizeStatementEnd()
-            
-            # check if separator
-            elif char in MTDict.separators:
-                self.tokenizeSeparator()
-            
-            # check if dot
-            elif char == '.':
-                self.tokenizeDot()
-            
-            # check if operator
-            elif char in MTDict.operators:
-                self.tokenizeOperator()
+        # check if identifier or keyword
+        elif char.isalpha():
+            self.tokenizeKeywordIdentifier()
 
-            # throws error when not in the configured settings
-            else:
-                MTCompilerMessage.lexerError(self.file, self.program, char, self.position)
+        # check for comments
+        elif char == '#' or (char == '/' and len(self.program) > self.position + 1 and self.program[self.position + 1] == '/'):
+            self.tokenizeComment()
+        
+        # check if number
+        elif char.isdigit() or (char == '-' and self.is_next_digit()):
+            self.tokenizeDigit()
+        
+        # check if string
+        elif char == "'" or char == '"':
+            self.position += 1
+            self.tokenizeString(char)
+        
+        # check if statement end
+        elif char == ';':
+            self.tokenizeStatementEnd()
+        
+        # check if separator
+        elif char in MTDict.separators:
+            self.tokenizeSeparator()
+        
+        # check if dot
+        elif char == '.':
+            self.tokenizeDot()
+        
+        # check if operator
+        elif char in MTDict.operators:
+            self.tokenizeOperator()
 
-        return self.tokens
+        # throws error when not in the configured settings
+        else:
+            MTCompilerMessage.lexerError(self.file, self.program, char, self.position)
     
     def tokenizeComment(self) -> bool:
         if (self.program[self.position] == '/' and len(self.program) - 1 > self.position and self.program[self.position + 1] == '/') or (self.program[self.position] == '#'):
@@ -89,7 +118,7 @@ class MTLexerAnalyzer:
         else:
             value_type = MTTokenType.IDENTIFIER
 
-        self.tokens.append(MTToken(value_type, value, start_pos, self.position, sub_type, file = self.file, line = self.program.count('\n', 0, self.position) + 1, column = start_pos - self.program.rfind('\n', 0, self.position)))
+        self.tokens.append(MTToken(value_type, value, start_pos, self.position, sub_type, file = self.file, line_index = self.line_index))
 
     def tokenizeOperator(self):
         start_pos = self.position
@@ -105,7 +134,7 @@ class MTLexerAnalyzer:
             etype = MTTokenType.OPERATOR
         else:
             etype = MTTokenType.OPERATOR
-        self.tokens.append(MTToken(etype, value, start_pos, self.position, file = self.file, line = self.program.count('\n', 0, self.position) + 1, column = start_pos - self.program.rfind('\n', 0, self.position)))
+        self.tokens.append(MTToken(etype, value, start_pos, self.position, file = self.file, line_index = self.line_index))
 
     def tokenizeDigit(self):
         start_pos = self.position
@@ -121,7 +150,7 @@ class MTLexerAnalyzer:
         sub_type = MTTokenSubType.NUMBER_VALUE
         if isDotUsed:
             sub_type = MTTokenSubType.DOUBLE_VALUE
-        self.tokens.append(MTToken(MTTokenType.VALUE, value, start_pos, self.position, sub_type = sub_type, file = self.file, line = self.program.count('\n', 0, self.position) + 1, column = start_pos - self.program.rfind('\n', 0, self.position)))
+        self.tokens.append(MTToken(MTTokenType.VALUE, value, start_pos, self.position, sub_type = sub_type, file = self.file, line_index = self.line_index))
     
     def tokenizeString(self, start_str):
         start_pos = self.position
@@ -133,7 +162,7 @@ class MTLexerAnalyzer:
         
         value = self.program[start_pos:self.position]
         self.position += 1
-        self.tokens.append(MTToken(MTTokenType.VALUE, value, start_pos, self.position, sub_type = MTTokenSubType.STRING_VALUE, file = self.file, line = self.program.count('\n', 0, self.position) + 1, column = start_pos - self.program.rfind('\n', 0, self.position)))
+        self.tokens.append(MTToken(MTTokenType.VALUE, value, start_pos, self.position, sub_type = MTTokenSubType.STRING_VALUE, file = self.file, line_index = self.line_index))
 
     def tokenizeSeparator(self):
         start_pos = self.position
@@ -142,7 +171,7 @@ class MTLexerAnalyzer:
         #     self.position += 1
         
         value = self.program[start_pos:self.position]
-        self.tokens.append(MTToken(MTTokenType.SEPARATOR, value, start_pos, self.position, file = self.file, line = self.program.count('\n', 0, self.position) + 1, column = start_pos - self.program.rfind('\n', 0, self.position)))
+        self.tokens.append(MTToken(MTTokenType.SEPARATOR, value, start_pos, self.position, file = self.file, line_index = self.line_index))
     
     def tokenizeStatementEnd(self):
         start_pos = self.position
@@ -150,7 +179,7 @@ class MTLexerAnalyzer:
             self.position += 1
         
         value = self.program[start_pos:self.position]
-        self.tokens.append(MTToken(MTTokenType.SEPARATOR, value, start_pos, self.position, file = self.file, line = self.program.count('\n', 0, self.position) + 1, column = start_pos - self.program.rfind('\n', 0, self.position)))
+        self.tokens.append(MTToken(MTTokenType.SEPARATOR, value, start_pos, self.position, file = self.file, line_index = self.line_index))
     
     def tokenizeDot(self):
         start_pos = self.position
@@ -158,7 +187,7 @@ class MTLexerAnalyzer:
             self.position += 1
         
         value = self.program[start_pos:self.position]
-        self.tokens.append(MTToken(MTTokenType.DOT, value, start_pos, self.position, file = self.file, line = self.program.count('\n', 0, self.position) + 1, column = start_pos - self.program.rfind('\n', 0, self.position)))
+        self.tokens.append(MTToken(MTTokenType.DOT, value, start_pos, self.position, file = self.file, line_index = self.line_index))
     
     def is_next_digit(self):
         return (self.position + 1 < len(self.program)) and self.program[self.position + 1].isdigit()
\ No newline at end of file
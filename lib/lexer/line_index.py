@@ -0,0 +1,50 @@
+import re
+from bisect import bisect_right
+
+class MTLineIndex:
+    # most recently indexed program, shared between the lexer and the compiler messages
+    __last = None
+
+    def __init__(self, program: str) -> None:
+        self.program = program
+        # offsets at which every line of the program starts
+        self.line_starts: list[int] = [0]
+        self.line_starts.extend(match.end() for match in re.finditer('\n', program))
+
+    @staticmethod
+    def for_program(program: str) -> 'MTLineIndex':
+        # building the index is a full pass over the program, so reuse it while the same source is in use
+        if MTLineIndex.__last == None or MTLineIndex.__last.program is not program:
+            MTLineIndex.__last = MTLineIndex(program)
+        return MTLineIndex.__last
+
+    def share(self):
+        # makes this index the one for_program() hands out for its program
+        MTLineIndex.__last = self
+
+    def edit(self, offset: int, removed: int, inserted: str):
+        # replaces `removed` characters at offset by inserted, in place so every token holding the index follows
+        # the edit; only the line starts after offset are rebuilt
+        first = bisect_right(self.line_starts, offset)
+        last = bisect_right(self.line_starts, offset + removed)
+        delta = len(inserted) - removed
+        starts = [offset + match.end() for match in re.finditer('\n', inserted)]
+        starts.extend(start + delta for start in self.line_starts[last:])
+        self.line_starts[first:] = starts
+        self.program = self.program[:offset] + inserted + self.program[offset + removed:]
+
+    def get_line_number(self, position: int) -> int:
+        return bisect_right(self.line_starts, position)
+
+    def get_column_number(self, position: int) -> int:
+        return position - self.line_starts[self.get_line_number(position) - 1] + 1
+
+    def get_line(self, line_number: int) -> str:
+        if line_number < 1 or line_number > len(self.line_starts):
+            raise IndexError("Line number out of range")
+        start = self.line_starts[line_number - 1]
+        end = self.line_starts[line_number] - 1 if line_number < len(self.line_starts) else len(self.program)
+        return self.program[start:end]
+
+    def line_count(self) -> int:
+        return len(self.line_starts)
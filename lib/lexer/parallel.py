@@ -0,0 +1,120 @@
+import gc
+import os
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from lib.lexer.token_class import *
+from lib.lexer.token_buffer import MTTokenBuffer
+from lib.message import MTDiagnosticError
+
+class MTParallelLexer:
+    # Lexes a large program on a pool of processes, one range of it per worker.
+    # No token of the language spans a newline: names, numbers and operators stop at it, strings end at it and
+    # comments end before it, so the lexer is between two tokens right after every newline, whatever came before.
+    # The only exception is `#` right before a newline, where the comment skips two characters and takes the next
+    # line. Ranges start after any other newline.
+    # Workers are forked with the whole program and lex their range in place, so positions and lines come out as
+    # they are in the program and only have to be put one after the other. They send back columns, not tokens.
+    # A lexer error of a range is reported once the ranges before it are read, as the sequential lexer would.
+    # Programs smaller than `minimum` characters per worker are lexed sequentially.
+    minimum = 256 * 1024
+
+    # lexer of the worker process, set by start()
+    worker = None
+
+    def __init__(self, lexer, workers: int = None) -> None:
+        self.lexer = lexer
+        self.workers = workers if workers != None else os.cpu_count()
+
+    def split(self) -> list[int]:
+        # start of every range and the end of the program
+        program = self.lexer.program
+        count = min(self.workers, len(program) // self.minimum)
+        points = [self.lexer.position]
+        for index in range(1, count):
+            position = self.safe(max(points[-1], len(program) * index // count))
+            if position >= len(program):
+                break
+            if position > points[-1]:
+                points.append(position)
+        points.append(len(program))
+        return points
+
+    def safe(self, position: int) -> int:
+        # first position at or after position that follows a newline the lexer can stop at
+        program = self.lexer.program
+        while True:
+            newline = program.find('\n', position)
+            if newline == -1:
+                return len(program)
+            if newline == 0 or program[newline - 1] != '#':
+                return newline + 1
+            position = newline + 1
+
+    def tokenize(self, compact: bool = False):
+        points = self.split()
+        if len(points) <= 2:
+            return self.lexer.tokenizeBuffer() if compact else self.lexer.tokenize()
+
+        ranges = list(zip(points, points[1:]))
+        context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(len(ranges), mp_context=context, initializer=MTParallelLexer.start, initargs=(type(self.lexer), self.lexer.program, self.lexer.file)) as pool:
+            chunks = pool.map(MTParallelLexer.tokenizeRange, ranges, [compact] * len(ranges))
+
+            if compact:
+                tokens = MTTokenBuffer(self.lexer.file, self.lexer.line_index)
+            else:
+                tokens = self.lexer.tokens
+            # tokens never reference each other, so the cyclic garbage collector only slows down building the list
+            collecting = gc.isenabled()
+            gc.disable()
+            try:
+                for chunk in chunks:
+                    self.join(tokens, chunk)
+            finally:
+                if collecting:
+                    gc.enable()
+
+        self.lexer.position = points[-1]
+        return tokens
+
+    def join(self, tokens, chunk):
+        types, sub_types, start_positions, end_positions, lines, values, error = chunk
+        if isinstance(tokens, MTTokenBuffer):
+            tokens.extendColumns(types, sub_types, start_positions, end_positions, lines, values)
+        else:
+            token_types, token_sub_types = MTTokenBuffer.token_types, MTTokenBuffer.token_sub_types
+            file, line_index = self.lexer.file, self.lexer.line_index
+            tokens.extend([MTToken(token_types[etype], value, start_pos, end_pos, token_sub_types[sub_type], 0, 0, file, line_index) for etype, value, start_pos, end_pos, sub_type in zip(types, values, start_positions, end_positions, sub_types)])
+
+        if error != None:
+            # the error the worker's lexer raised
+            raise error
+
+    # Worker Process
+    @staticmethod
+    def start(lexer: type, program: str, file: str):
+        MTParallelLexer.worker = lexer(program, file)
+
+    @staticmethod
+    def tokenizeRange(bounds: tuple[int, int], compact: bool):
+        start, end = bounds
+        lexer = MTParallelLexer.worker
+        lexer.position = start
+        lexer.tokens = []
+        error = None
+        try:
+            lexer.tokenizeUntil(end)
+        except MTDiagnosticError as raised:
+            error = raised
+
+        tokens = lexer.tokens
+        types = array('B', [token.type.value for token in tokens])
+        sub_types = array('B', [token.sub_type.value for token in tokens])
+        start_positions = array('q', [token.start_pos for token in tokens])
+        end_positions = array('q', [token.end_pos for token in tokens])
+        # the line index of the worker indexes the same program
+        lines = array('I', [token.line for token in tokens]) if compact else array('I')
+        values = [token.value for token in tokens]
+        return types, sub_types, start_positions, end_positions, lines, values, error
@@ -0,0 +1,150 @@
+import gc
+import re
+
+from lib.lexer.lexer import MTLexerAnalyzer
+from lib.lexer.token_class import *
+from lib.dict import *
+
+class MTRegexLexerAnalyzer(MTLexerAnalyzer):
+    # One alternation for every lexeme of the language, tried in the same order as MTLexerAnalyzer.tokenizeNext.
+    # Identifiers, numbers and operators only match ASCII; anything else goes through the `other` group and is
+    # handed to the character based lexer so both engines always produce the same tokens.
+    pattern = re.compile(r'''\s*+(?:
+        (?P<identifier>[A-Za-z][A-Za-z0-9]*)
+        |(?P<comment>//[^\n]*|\#(?s:.)?[^\n]*)
+        |(?P<number>-?[0-9]+(?:\.[0-9]*)?)
+        |(?P<string>(?P<quote>['"])(?:(?!(?P=quote))[^\n]|(?<=\\)(?P=quote))*+(?P<close>(?P=quote)|\n)?)
+        |(?P<statement_end>;+)
+        |(?P<separator>[,(){}])
+        |(?P<dot>\.+)
+        |(?P<operator>[+\-*/=?:<>&|]+)
+        |(?P<other>\S)
+    )''', re.VERBOSE)
+
+    # lexeme -> (type, sub_type) for every word that is not a plain identifier
+    lexemes: dict[str, tuple[MTTokenType, MTTokenSubType]] = {}
+    for value in MTDict.keywords:
+        if value in MTDict.dataTypeKeywords:
+            lexemes[value] = (MTTokenType.KEYWORD, MTTokenSubType.DATA_TYPE_KEYWORDS)
+        elif value in MTDict.conditionalKeywords:
+            lexemes[value] = (MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS)
+        elif value in MTDict.loopKeywords:
+            lexemes[value] = (MTTokenType.KEYWORD, MTTokenSubType.LOOPS_KEYWORDS)
+        elif value in MTDict.otherKeywords:
+            lexemes[value] = (MTTokenType.KEYWORD, MTTokenSubType.OTHER_KEYWORDS)
+        else:
+            lexemes[value] = (MTTokenType.KEYWORD, MTTokenSubType.NONE)
+    for value in MTDict.booleans:
+        lexemes[value] = (MTTokenType.VALUE, MTTokenSubType.BOOLEAN_VALUE)
+    del value
+
+    # group numbers of the pattern
+    IDENTIFIER = pattern.groupindex['identifier']
+    COMMENT = pattern.groupindex['comment']
+    NUMBER = pattern.groupindex['number']
+    STRING = pattern.groupindex['string']
+    STATEMENT_END = pattern.groupindex['statement_end']
+    SEPARATOR = pattern.groupindex['separator']
+    DOT = pattern.groupindex['dot']
+    OPERATOR = pattern.groupindex['operator']
+    OTHER = pattern.groupindex['other']
+
+    def __init__(self, program, file):
+        super().__init__(program, file)
+        # operator runs seen so far -> token type
+        self.operators: dict[str, MTTokenType] = {}
+
+    def tokenize(self):
+        # tokens never reference each other, so the cyclic garbage collector only slows down building the list
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            self.tokens.extend(self.tokenizeStream())
+        finally:
+            if collecting:
+                gc.enable()
+
+        return self.tokens
+
+    # yields the tokens as soon as they are read instead of keeping the whole list
+    def tokenizeStream(self):
+        while self.position < len(self.program):
+            yield from self.tokenizeRun()
+
+    def tokenizeUntil(self, end: int):
+        while self.position < end:
+            self.tokens.extend(self.tokenizeRun(end))
+
+    # matches lexemes from the current position until end or a lexeme the regex can't decide on
+    def tokenizeRun(self, end: int = None):
+        program = self.program
+        length = len(program)
+        if end == None:
+            end = length
+        # a non ASCII character right after a lexeme may still belong to it, only then the character lexer has to decide
+        check_ascii = not program.isascii()
+        file = self.file
+        line_index = self.line_index
+        lexemes = self.lexemes
+        operator_type = self.operatorType
+        identifier = (MTTokenType.IDENTIFIER, MTTokenSubType.NONE)
+        none = MTTokenSubType.NONE
+        value_type = MTTokenType.VALUE
+        separator = MTTokenType.SEPARATOR
+        string_value = MTTokenSubType.STRING_VALUE
+        number_value = MTTokenSubType.NUMBER_VALUE
+        double_value = MTTokenSubType.DOUBLE_VALUE
+        IDENTIFIER, OPERATOR, SEPARATOR, STATEMENT_END, NUMBER, STRING, COMMENT, DOT, OTHER = self.IDENTIFIER, self.OPERATOR, self.SEPARATOR, self.STATEMENT_END, self.NUMBER, self.STRING, self.COMMENT, self.DOT, self.OTHER
+
+        for found in self.pattern.finditer(program, self.position, end):
+            group = found.lastindex
+            start_pos, end_pos = found.span(group)
+
+            if check_ascii and group != STRING and group != COMMENT and end_pos < length and program[end_pos] >= '\x80':
+                group = OTHER
+
+            if group == IDENTIFIER:
+                value = program[start_pos:end_pos]
+                etype, sub_type = lexemes.get(value, identifier)
+                yield MTToken(etype, value, start_pos, end_pos, sub_type, 0, 0, file, line_index)
+            elif group == OPERATOR:
+                value = program[start_pos:end_pos]
+                yield MTToken(operator_type(value), value, start_pos, end_pos, none, 0, 0, file, line_index)
+            elif group == SEPARATOR or group == STATEMENT_END:
+                yield MTToken(separator, program[start_pos:end_pos], start_pos, end_pos, none, 0, 0, file, line_index)
+            elif group == NUMBER:
+                value = program[start_pos:end_pos]
+                yield MTToken(value_type, value, start_pos, end_pos, double_value if '.' in value else number_value, 0, 0, file, line_index)
+            elif group == STRING:
+                # the value excludes the quotes, end_pos points past the closing quote (or past the end of an unterminated string)
+                if found.start('close') == -1:
+                    value = program[start_pos + 1:end_pos]
+                    end_pos += 1
+                else:
+                    value = program[start_pos + 1:end_pos - 1]
+                yield MTToken(value_type, value, start_pos + 1, end_pos, string_value, 0, 0, file, line_index)
+            elif group == DOT:
+                yield MTToken(MTTokenType.DOT, program[start_pos:end_pos], start_pos, end_pos, none, 0, 0, file, line_index)
+            elif group == OTHER:
+                # the character lexer appends to self.tokens, which may be the list being built by tokenize()
+                self.position = start_pos
+                tokens, self.tokens = self.tokens, []
+                self.tokenizeNext()
+                read, self.tokens = self.tokens, tokens
+                yield from read
+                return
+
+        # only whitespace is left
+        self.position = end
+
+    def operatorType(self, value: str) -> MTTokenType:
+        etype = self.operators.get(value)
+        if etype == None:
+            if value in MTDict.conditionalOperators:
+                etype = MTTokenType.CONDITIONAL_OPERATOR
+            elif value in MTDict.logicalOperators:
+                etype = MTTokenType.LOGICAL_OPERATOR
+            else:
+                etype = MTTokenType.OPERATOR
+            self.operators[value] = etype
+        return etype
@@ -0,0 +1,124 @@
+from array import array
+from typing import Iterable
+import json
+
+from lib.lexer.token_class import *
+from lib.lexer.line_index import MTLineIndex
+
+class MTTokenBuffer:
+    # Tokens stored column wise: one array per numeric field and a list of interned lexemes.
+    # Indexing returns a lightweight MTTokenView instead of keeping one MTToken object per token.
+    token_types: list[MTTokenType] = [None] + list(MTTokenType)
+    token_sub_types: list[MTTokenSubType] = [None] + list(MTTokenSubType)
+
+    def __init__(self, file: str = '', line_index: MTLineIndex = None) -> None:
+        self.file = file
+        self.line_index = line_index
+        self.types = array('B')
+        self.sub_types = array('B')
+        self.start_positions = array('q')
+        self.end_positions = array('q')
+        self.lines = array('I')
+        self.values: list[str] = []
+        self.__interned: dict[str, str] = {}
+
+    def add(self, type: MTTokenType, value: str, start_pos: int, end_pos: int, sub_type: MTTokenSubType = MTTokenSubType.NONE, line: int = 0):
+        self.types.append(type.value)
+        self.sub_types.append(sub_type.value)
+        self.start_positions.append(start_pos)
+        self.end_positions.append(end_pos)
+        if line == 0 and self.line_index != None:
+            line = self.line_index.get_line_number(start_pos)
+        self.lines.append(line)
+        self.values.append(self.__interned.setdefault(value, value))
+
+    def append(self, token: MTToken):
+        self.add(token.type, token.value, token.start_pos, token.end_pos, token.sub_type, token.line)
+
+    def extend(self, tokens: Iterable[MTToken]):
+        for token in tokens:
+            self.add(token.type, token.value, token.start_pos, token.end_pos, token.sub_type, token.line)
+
+    # appends tokens already stored column wise, e.g. by MTParallelLexer
+    def extendColumns(self, types: array, sub_types: array, start_positions: array, end_positions: array, lines: array, values: list[str]):
+        self.types.extend(types)
+        self.sub_types.extend(sub_types)
+        self.start_positions.extend(start_positions)
+        self.end_positions.extend(end_positions)
+        self.lines.extend(lines)
+        interned = self.__interned
+        self.values.extend([interned.setdefault(value, value) for value in values])
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, position: int) -> 'MTTokenView':
+        if position < 0:
+            position += len(self.types)
+        if position < 0 or position >= len(self.types):
+            raise IndexError('Token position out of range')
+        return MTTokenView(self, position)
+
+    def __iter__(self):
+        for position in range(len(self.types)):
+            yield MTTokenView(self, position)
+
+    # same interface as MTTokenStream so the parser can read from either
+    def has(self, position: int) -> bool:
+        return 0 <= position < len(self.types)
+
+    def release(self, position: int):
+        pass
+
+    def check(self, position: int, expected_type: MTTokenType, expected_sub_type: MTTokenSubType = MTTokenSubType.NONE, expected_value: str = None) -> bool:
+        if position < 0 or position >= len(self.types):
+            return False
+        return self.types[position] == expected_type.value and (expected_sub_type == MTTokenSubType.NONE or self.sub_types[position] == expected_sub_type.value) and (expected_value == None or self.values[position] == expected_value)
+
+    def __repr__(self) -> str:
+        return "[" + ", ".join(repr(token) for token in self) + "]"
+
+class MTTokenView:
+    # read only MTToken look-alike pointing into an MTTokenBuffer
+    __slots__ = ('buffer', 'index')
+
+    def __init__(self, buffer: MTTokenBuffer, index: int) -> None:
+        self.buffer = buffer
+        self.index = index
+
+    @property
+    def type(self) -> MTTokenType:
+        return self.buffer.token_types[self.buffer.types[self.index]]
+
+    @property
+    def sub_type(self) -> MTTokenSubType:
+        return self.buffer.token_sub_types[self.buffer.sub_types[self.index]]
+
+    @property
+    def value(self) -> str:
+        return self.buffer.values[self.index]
+
+    @property
+    def start_pos(self) -> int:
+        return self.buffer.start_positions[self.index]
+
+    @property
+    def end_pos(self) -> int:
+        return self.buffer.end_positions[self.index]
+
+    @property
+    def line(self) -> int:
+        return self.buffer.lines[self.index]
+
+    @property
+    def column(self) -> int:
+        if self.buffer.line_index == None:
+            return 0
+        return self.buffer.line_index.get_column_number(self.start_pos)
+
+    @property
+    def file(self) -> str:
+        return self.buffer.file
+
+    def __repr__(self) -> str:
+        return "{" + f'"etype": "MTToken", "type": "{self.type}", "sub_type": "{self.sub_type}", "value": "{self.value}", "start_pos": {self.start_pos}, "end_pos": {self.end_pos}, "line": {self.line}, "column": {self.column}, "file": {json.dumps(self.file)}' + "}"
@@ -1,6 +1,8 @@
 from enum import Enum, auto
 import json
 
+from lib.lexer.line_index import MTLineIndex
+
 class MTTokenType(Enum):
     KEYWORD = auto()
     IDENTIFIER = auto()
@@ -30,15 +32,47 @@ class MTTokenSubType(Enum):
     BOOLEAN_VALUE = auto()
 
 class MTToken:
-    def __init__(self, type: MTTokenType, value: str, start_pos: int, end_pos: int, sub_type: MTTokenSubType = MTTokenSubType.NONE, line: int = 0, column: int = 0, file: str = ''):
+    __slots__ = ('type', 'sub_type', 'value', 'start_pos', 'end_pos', 'file', 'line_index', '__line', '__column')
+
+    def __init__(self, type: MTTokenType, value: str, start_pos: int, end_pos: int, sub_type: MTTokenSubType = MTTokenSubType.NONE, line: int = 0, column: int = 0, file: str = '', line_index: MTLineIndex = None):
         self.type = type
         self.sub_type = sub_type
         self.value = value
         self.start_pos = start_pos
         self.end_pos = end_pos
-        self.line = line
-        self.column = column
         self.file = file
+        self.line_index = line_index
+        self.__line = line
+        self.__column = column
+
+    # line and column are resolved from start_pos on first access when the token carries a line index
+    @property
+    def line(self) -> int:
+        if self.__line == 0 and self.line_index != None:
+            self.__line = self.line_index.get_line_number(self.start_pos)
+        return self.__line
+
+    @line.setter
+    def line(self, line: int):
+        self.__line = line
+
+    @property
+    def column(self) -> int:
+        if self.__column == 0 and self.line_index != None:
+            self.__column = self.line_index.get_column_number(self.start_pos)
+        return self.__column
+
+    @column.setter
+    def column(self, column: int):
+        self.__column = column
+
+    # moves the token by delta characters, its line and column are resolved again on next access
+    def shift(self, delta: int):
+        self.start_pos += delta
+        self.end_pos += delta
+        if self.line_index != None:
+            self.__line = 0
+            self.__column = 0
 
     def __repr__(self) -> str:
         return "{" + f'"etype": "MTToken", "type": "{self.type}", "sub_type": "{self.sub_type}", "value": "{self.value}", "start_pos": {self.start_pos}, "end_pos": {self.end_pos}, "line": {self.line}, "column": {self.column}, "file": {json.dumps(self.file)}' + "}"
\ No newline at end of file
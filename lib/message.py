@@ -1,13 +1,66 @@
+import re
+
 from lib.lexer.token_class import *
+from lib.lexer.line_index import MTLineIndex
+
+class MTDiagnostic:
+    # One error found in a script: its kind (lexer, syntax, semantic or error), the message, where it is and the
+    # text printed for it with the line of the script and a caret under the column.
+    __slots__ = ('kind', 'message', 'file', 'line', 'column', 'position', 'text')
+
+    def __init__(self, kind: str, message: str, file: str = None, line: int = None, column: int = None, position: int = None, text: str = None) -> None:
+        self.kind = kind
+        self.message = message
+        self.file = file
+        self.line = line
+        self.column = column
+        self.position = position
+        self.text = text if text != None else message
+
+    def __repr__(self) -> str:
+        return str({'kind': self.kind, 'message': self.message, 'file': self.file, 'line': self.line, 'column': self.column, 'position': self.position})
+
+    def __str__(self) -> str:
+        return self.text
+
+class MTDiagnosticError(Exception):
+    # Raised by the compiler messages instead of exiting. The syntax and semantic analysis catch it for every
+    # statement, keep its diagnostics and go on with the next statement, then raise it once with all of them.
+    # main.py prints them and exits like the compiler always did.
+    def __init__(self, diagnostics: list[MTDiagnostic]) -> None:
+        super().__init__(diagnostics)
+        self.diagnostics = diagnostics
+
+    def __str__(self) -> str:
+        return '\n'.join(diagnostic.text for diagnostic in self.diagnostics)
 
 class MTCompilerMessage:
+    # text of the messages error() and warning() print, for those reading captured output
+    printed = re.compile('\n\033\\[3[13]m(?:Warning: )?(.*?)\033\\[0m\n', re.DOTALL)
+
     def __init__(self) -> None:
         pass
 
     @staticmethod
     def error(msg: str):
-        print(f'\n\033[31m{msg}\033[0m\n')
+        raise MTDiagnosticError([MTDiagnostic('error', msg)])
+
+    # prints the diagnostics in red and exits, what every error did before they could be recovered from
+    @staticmethod
+    def fail(diagnostics: list[MTDiagnostic]):
+        print(MTCompilerMessage.format(diagnostics), end='')
         exit(1)
+
+    # Expressions are checked, optimized and run on explicit stacks once they nest deeper than a few levels, but
+    # blocks nest by recursion
+    @staticmethod
+    def nestingError(file: str, engine: str) -> MTDiagnostic:
+        message = f'The script nests blocks or expressions too deeply for the `{engine}` engine'
+        return MTDiagnostic('error', message, file, text=f'{file}: Error: {message}.')
+
+    @staticmethod
+    def format(diagnostics: list[MTDiagnostic]) -> str:
+        return ''.join(f'\n\033[31m{diagnostic.text}\033[0m\n\n' for diagnostic in diagnostics)
     
     @staticmethod
     def warning(msg: str):
@@ -19,52 +72,35 @@ class MTCompilerMessage:
     
     @staticmethod
     def lexerError(file: str, program: str, char: str, position: int):
+        raise MTDiagnosticError([MTCompilerMessage.diagnostic('lexer', file, program, position, f'Unexpected character found: \'{char}\'')])
+
+    @staticmethod
+    def diagnostic(kind: str, file: str, program: str, position: int, error: str, expected: str = '') -> MTDiagnostic:
         line_number = MTCompilerMessage.get_line_number(program, position)
         column_number = MTCompilerMessage.get_column_number(program, position)
 
-        msg = f'{file}:{line_number}:{column_number}: Error: Unexpected character found: \'{char}\'.\n'
+        msg = f'{file}:{line_number}:{column_number}: Error: {error}.\n'
         msg += f'    {MTCompilerMessage.print_string_at_line(program, line_number)}\n'
         msg += f'    {''.join(str(' ') for x in range(1, column_number))}^'
-        MTCompilerMessage.error(msg)
+        msg += f'{'\nExpected: ' + expected if expected != '' else ''}'
+        return MTDiagnostic(kind, error, file, line_number, column_number, position, msg)
     
     @staticmethod
     def get_line_number(text, position):
-        # Count the number of newline characters up to the position
-        line_number = text.count('\n', 0, position) + 1
-        return line_number
+        return MTLineIndex.for_program(text).get_line_number(position)
     
     @staticmethod
     def get_column_number(text, position):
-        line_start = text.rfind('\n', 0, position)
-        column_number = position - line_start
-        return column_number
+        return MTLineIndex.for_program(text).get_column_number(position)
     
     @staticmethod
     def print_string_at_line(text, line_number):
-        lines = text.split('\n')
-        # Ensure the line_number is within the range of existing lines or the next line to append
-        if line_number < 1 or line_number > len(lines) + 1:
-            raise IndexError("Line number out of range")
-        return lines[line_number - 1]
+        return MTLineIndex.for_program(text).get_line(line_number)
     
     @staticmethod
     def syntaxError(program: str, token: MTToken, position: int, expected: str = ''):
-        line_number = MTCompilerMessage.get_line_number(program, position)
-        column_number = MTCompilerMessage.get_column_number(program, position)
-
-        msg = f'{token.file}:{line_number}:{column_number}: Error: Unexpected token found \'{token.value}\'.\n'
-        msg += f'    {MTCompilerMessage.print_string_at_line(program, line_number)}\n'
-        msg += f'    {''.join(str(' ') for x in range(1, column_number))}^'
-        msg += f'{'\nExpected: ' + expected if expected != '' else ''}'
-        MTCompilerMessage.error(msg)
+        raise MTDiagnosticError([MTCompilerMessage.diagnostic('syntax', token.file, program, position, f'Unexpected token found \'{token.value}\'', expected)])
     
     @staticmethod
     def semanticError(program: str, token: MTToken, position: int, error: str, expected: str = ''):
-        line_number = MTCompilerMessage.get_line_number(program, position)
-        column_number = MTCompilerMessage.get_column_number(program, position)
-
-        msg = f'{token.file}:{line_number}:{column_number}: Error: {error}.\n'
-        msg += f'    {MTCompilerMessage.print_string_at_line(program, line_number)}\n'
-        msg += f'    {''.join(str(' ') for x in range(1, column_number))}^'
-        msg += f'{'\nExpected: ' + expected if expected != '' else ''}'
-        MTCompilerMessage.error(msg)
\ No newline at end of file
+        raise MTDiagnosticError([MTCompilerMessage.diagnostic('semantic', token.file, program, position, error, expected)])
\ No newline at end of file
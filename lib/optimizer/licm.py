@@ -0,0 +1,223 @@
+from lib.syntax.data import *
+from lib.lexer.token_class import *
+
+class MTInvariant:
+    # loop invariant expression: MTInterpreter keeps its value in slot `index` once `expression` has been evaluated
+    __slots__ = ('index', 'expression')
+
+    def __init__(self, index: int, expression: MTNode) -> None:
+        self.index = index
+        self.expression = expression
+
+class MTLoopInvariantMotion:
+    # Finds the expressions of for, while and do-while loops that only read variables never declared nor assigned
+    # anywhere in the loop (condition, increment, body and nested blocks), so they give the same value on every
+    # iteration. Each one gets an MTInvariant in its `invariant` and the loop the indexes in its `invariants`.
+    # The value is computed the first time the loop runs into the expression and reused until the loop starts
+    # again, rather than before the loop: an expression that fails (None + 1, 1 / 0) still fails only when and
+    # if it is reached. Expressions are hoisted to the outermost loop they are invariant in.
+    # The engines that don't look at `invariant` run the expression itself as before.
+    def __init__(self, nodes: list[MTNode], program: str) -> None:
+        self.nodes: list[MTNode] = nodes
+        self.program: str = program
+        self.count = 0
+        # hoisted expressions of every loop, written to licm.json
+        self.report: list[dict] = []
+
+    def optimize(self) -> list[MTNode]:
+        self.optimizeStatements(self.nodes)
+        return self.nodes
+
+    # Statements
+    def optimizeStatements(self, nodes: list[MTNode]):
+        for node in nodes:
+            self.optimizeStatement(node)
+
+    def optimizeStatement(self, node: MTNode):
+        if node.current.type != MTTokenType.KEYWORD:
+            return
+
+        value = node.current.value
+        if value == 'for' or value == 'while' or value == 'do':
+            self.hoist(node)
+            self.optimizeStatements(node.statements)
+        elif value == 'if':
+            branch = node
+            while branch != None:
+                self.optimizeStatements(branch.statements)
+                branch = branch.right
+        elif value == 'switch':
+            for statement in node.statements:
+                if statement.right != None:
+                    self.optimizeStatement(statement.right)
+
+    def hoist(self, loop: MTNode):
+        assigned = set()
+        self.collectAssigned(loop, assigned)
+
+        expressions = []
+        if loop.current.value == 'for':
+            # the initializer runs once already
+            if loop.left != None:
+                expressions.extend(loop.left.statements[1:])
+        elif loop.current.value == 'while':
+            expressions.append(loop.left)
+        elif loop.left != None:
+            expressions.append(loop.left.left)
+        self.collectExpressions(loop.statements, expressions)
+
+        hoisted = []
+        for expression in expressions:
+            self.hoistExpression(expression, assigned, hoisted)
+
+        if len(hoisted) > 0:
+            loop.invariants = tuple(node.invariant.index for node in hoisted)
+            self.report.append({
+                'loop': loop.current.value,
+                'line': loop.current.line,
+                'column': loop.current.column,
+                'expressions': [{'expression': self.source(node), 'line': self.first(node).line, 'column': self.first(node).column} for node in hoisted],
+            })
+
+    def hoistExpression(self, node: MTNode, assigned: set[str], hoisted: list[MTNode]):
+        # the outermost hoistable expressions, from left to right on a stack as expressions can be deeper than the
+        # recursion limit
+        facts = self.analyzeExpression(node, assigned)
+        stack = [node]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node == None or node.invariant != None:
+                continue
+
+            invariant, reads = facts[id(node)]
+            if invariant and self.isHoistable(node, reads):
+                # the copy runs the expression itself, its operands stay shared with the tree
+                expression = type(node)(node.current)
+                expression.left = node.left
+                expression.right = node.right
+                node.invariant = MTInvariant(self.count, expression)
+                self.count += 1
+                hoisted.append(node)
+                continue
+
+            stack.append(node.right)
+            stack.append(node.left)
+
+    # Analysis
+    def collectAssigned(self, node: MTNode, assigned: set[str]):
+        stack = [node]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node == None:
+                continue
+
+            token = node.current
+            # declarations and assignments are the identifiers with a data type or a value
+            if token.type == MTTokenType.IDENTIFIER and (node.left != None or node.right != None):
+                assigned.add(token.value)
+            elif token.type == MTTokenType.OPERATOR and (token.value == '++' or token.value == '--') and node.left != None:
+                assigned.add(node.left.current.value)
+
+            stack.append(node.left)
+            stack.append(node.right)
+            stack.extend(node.statements)
+
+    # expressions run by statements, nested loops included
+    def collectExpressions(self, nodes: list[MTNode], expressions: list[MTNode]):
+        for node in nodes:
+            token = node.current
+            if token.type == MTTokenType.IDENTIFIER:
+                expressions.append(node.right)
+            elif token.type != MTTokenType.KEYWORD:
+                expressions.append(node)
+            elif token.value == 'print':
+                expressions.append(node.right)
+            elif token.value == 'if':
+                branch = node
+                while branch != None:
+                    expressions.append(branch.left)
+                    self.collectExpressions(branch.statements, expressions)
+                    branch = branch.right
+            elif token.value == 'switch':
+                expressions.append(node.left)
+                for statement in node.statements:
+                    expressions.append(statement.left)
+                    if statement.right != None:
+                        self.collectExpressions([statement.right], expressions)
+            elif token.value == 'for':
+                if node.left != None:
+                    expressions.extend(node.left.statements[1:])
+                self.collectExpressions(node.statements, expressions)
+            elif token.value == 'while':
+                expressions.append(node.left)
+                self.collectExpressions(node.statements, expressions)
+            elif token.value == 'do':
+                self.collectExpressions(node.statements, expressions)
+                if node.left != None:
+                    expressions.append(node.left.left)
+
+    def isHoistable(self, node: MTNode, reads: bool) -> bool:
+        # only computations reading a variable are worth it, constants are folded by MTOptimizer
+        token = node.current
+        if token.type == MTTokenType.OPERATOR:
+            return token.value != '++' and token.value != '--' and reads
+        elif token.type == MTTokenType.CONDITIONAL_OPERATOR:
+            # a ternary evaluates the sides of its `:` itself
+            return token.value != ':' and reads
+        elif token.type == MTTokenType.LOGICAL_OPERATOR:
+            return reads
+        return False
+
+    def analyzeExpression(self, node: MTNode, assigned: set[str]) -> dict[int, tuple[bool, bool]]:
+        # id(node) -> (invariant, reads a variable) for node and everything under it, found once from the operands
+        # up rather than again for every expression the hoisting looks at
+        facts = {}
+        stack = [(node, False)]
+        while len(stack) > 0:
+            node, operandsDone = stack.pop()
+            if node == None:
+                continue
+            if not operandsDone:
+                stack.append((node, True))
+                stack.append((node.right, False))
+                stack.append((node.left, False))
+                continue
+
+            left = facts[id(node.left)] if node.left != None else (True, False)
+            right = facts[id(node.right)] if node.right != None else (True, False)
+            token = node.current
+            if token.type == MTTokenType.IDENTIFIER:
+                invariant = token.value not in assigned
+            elif token.type == MTTokenType.VALUE:
+                invariant = True
+            elif token.type == MTTokenType.OPERATOR and (token.value == '++' or token.value == '--'):
+                invariant = False
+            elif token.type == MTTokenType.OPERATOR or token.type == MTTokenType.CONDITIONAL_OPERATOR or token.type == MTTokenType.LOGICAL_OPERATOR:
+                invariant = left[0] and right[0]
+            else:
+                invariant = False
+            facts[id(node)] = (invariant, token.type == MTTokenType.IDENTIFIER or left[1] or right[1])
+        return facts
+
+    # Report
+    def first(self, node: MTNode) -> MTToken:
+        while node.left != None:
+            node = node.left
+        return node.current
+
+    def source(self, node: MTNode) -> str:
+        positions = []
+        self.collectPositions(node, positions)
+        return self.program[min(positions):max(positions)].strip()
+
+    def collectPositions(self, node: MTNode, positions: list[int]):
+        stack = [node]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node == None:
+                continue
+            # string tokens start after their opening quote
+            positions.append(node.current.start_pos - (1 if node.current.sub_type == MTTokenSubType.STRING_VALUE else 0))
+            positions.append(node.current.end_pos)
+            stack.append(node.left)
+            stack.append(node.right)
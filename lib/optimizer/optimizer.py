@@ -0,0 +1,226 @@
+from lib.syntax.data import *
+from lib.lexer.token_class import *
+
+class MTOptimizer:
+    # Rewrites the AST between semantic analysis and execution, keeping the output of every engine the same.
+    # Constant arithmetic, comparison, logical and ternary subtrees are folded into a single VALUE node, and
+    # `if`/`elif`/`else` branches and `while` loops whose condition folds to a constant are removed.
+    # Anything that would fail at run time (1 / 0, "a" - 1, a non bool condition) is left as it is, so the
+    # error is still reported when, and only if, the program gets there.
+    arithmeticOperators = {
+        '+': lambda left, right: left + right,
+        '-': lambda left, right: left - right,
+        '*': lambda left, right: left * right,
+        '/': lambda left, right: left / right,
+    }
+    conditionalOperators = {
+        '<': lambda left, right: left < right,
+        '>': lambda left, right: left > right,
+        '==': lambda left, right: left == right,
+        '<=': lambda left, right: left <= right,
+        '>=': lambda left, right: left >= right,
+    }
+    logicalOperators = {
+        '&&': lambda left, right: left and right,
+        '||': lambda left, right: left or right,
+    }
+    # longest string folded, so a never run `"a" * 100000000` doesn't cost anything at compile time
+    maxStringLength = 4096
+
+    def __init__(self, nodes: list[MTNode], program: str) -> None:
+        self.nodes: list[MTNode] = nodes
+        self.program: str = program
+
+    def optimize(self) -> list[MTNode]:
+        self.nodes = self.optimizeStatements(self.nodes)
+        return self.nodes
+
+    # Statements
+    def optimizeStatements(self, nodes: list[MTNode]) -> list[MTNode]:
+        statements = []
+        for node in nodes:
+            node = self.optimizeStatement(node)
+            if node != None:
+                statements.append(node)
+        return statements
+
+    # returns the node replacing the statement, None when it can be removed
+    def optimizeStatement(self, node: MTNode) -> MTNode:
+        token = node.current
+        if token.type == MTTokenType.IDENTIFIER:
+            node.right = self.fold(node.right)
+        elif token.type == MTTokenType.KEYWORD:
+            return self.optimizeKeyword(node)
+        elif token.type == MTTokenType.OPERATOR or token.type == MTTokenType.CONDITIONAL_OPERATOR or token.type == MTTokenType.LOGICAL_OPERATOR:
+            return self.fold(node)
+        return node
+
+    def optimizeKeyword(self, node: MTNode) -> MTNode:
+        value = node.current.value
+        if value == 'print':
+            node.right = self.fold(node.right)
+        elif value == 'if':
+            return self.optimizeConditionIfElse(node)
+        elif value == 'switch':
+            node.left = self.fold(node.left)
+            for statement in node.statements:
+                if statement.right != None:
+                    # a case always runs one statement, removing it leaves a `pass`
+                    statement.right = self.optimizeStatement(statement.right) or self.createPass(statement.right.current)
+        elif value == 'for':
+            if node.left != None:
+                node.left.statements = [self.optimizeStatement(statement) if statement.current.type == MTTokenType.IDENTIFIER else self.fold(statement) for statement in node.left.statements]
+            node.statements = self.optimizeStatements(node.statements)
+        elif value == 'while':
+            node.left = self.fold(node.left)
+            # a loop runs only while its condition is exactly true
+            if self.isConstant(node.left) and self.constant(node.left) is not True:
+                return None
+            node.statements = self.optimizeStatements(node.statements)
+        elif value == 'do':
+            node.statements = self.optimizeStatements(node.statements)
+            if node.left != None:
+                node.left.left = self.fold(node.left.left)
+        return node
+
+    def optimizeConditionIfElse(self, node: MTNode) -> MTNode:
+        branches = []
+        branch = node
+        while branch != None:
+            if branch.current.value == 'else':
+                exp = True
+            else:
+                branch.left = self.fold(branch.left)
+                exp = self.constant(branch.left) if self.isConstant(branch.left) else None
+            branch.statements = self.optimizeStatements(branch.statements)
+
+            if exp is True:
+                # branches after one that always runs are never reached
+                branches.append(branch)
+                break
+            elif exp is not False:
+                branches.append(branch)
+            branch = branch.right
+
+        if len(branches) == 0:
+            return None
+
+        for index, branch in enumerate(branches):
+            branch.right = branches[index + 1] if index + 1 < len(branches) else None
+
+        head = branches[0]
+        if head.current.value == 'else':
+            head.current = self.createToken(head.current, MTTokenType.KEYWORD, 'if', MTTokenSubType.CONDITIONAL_KEYWORDS)
+            head.left = self.createValue(head.current, True)
+        elif head.current.value == 'elif':
+            head.current = self.createToken(head.current, MTTokenType.KEYWORD, 'if', MTTokenSubType.CONDITIONAL_KEYWORDS)
+        return head
+
+    # Expression
+    def fold(self, node: MTNode) -> MTNode:
+        # Operands are folded before their operator, from left to right onto a stack of folded nodes, and the
+        # operators wait for them on another stack, so deep expressions don't recurse.
+        folded = []
+        stack = [(node, False)]
+        while len(stack) > 0:
+            node, operandsFolded = stack.pop()
+            if operandsFolded:
+                node.right = folded.pop()
+                node.left = folded.pop()
+                folded.append(self.foldOperator(node))
+            elif node == None or (node.current.type == MTTokenType.OPERATOR and (node.current.value == '++' or node.current.value == '--')):
+                folded.append(node)
+            else:
+                stack.append((node, True))
+                stack.append((node.right, False))
+                stack.append((node.left, False))
+        return folded[0]
+
+    def foldOperator(self, node: MTNode) -> MTNode:
+        # node with its operands folded
+        token = node.current
+        if token.type == MTTokenType.CONDITIONAL_OPERATOR and token.value == '?':
+            return self.foldTernary(node)
+        elif token.type == MTTokenType.OPERATOR:
+            operation = self.arithmeticOperators.get(token.value)
+        elif token.type == MTTokenType.CONDITIONAL_OPERATOR:
+            operation = self.conditionalOperators.get(token.value)
+        elif token.type == MTTokenType.LOGICAL_OPERATOR:
+            operation = self.logicalOperators.get(token.value)
+        else:
+            return node
+
+        if operation == None or not self.isConstant(node.left) or not self.isConstant(node.right):
+            return node
+
+        left = self.constant(node.left)
+        right = self.constant(node.right)
+        if token.value == '*' and self.isLongString(left, right):
+            return node
+        try:
+            value = operation(left, right)
+        except Exception:
+            # raised again at run time
+            return node
+        return self.createValue(token, value) or node
+
+    def foldTernary(self, node: MTNode) -> MTNode:
+        # both branches are evaluated, so all three parts have to be constant
+        branches = node.right
+        if node.left == None or branches == None or not self.isConstant(node.left) or not self.isConstant(branches.left) or not self.isConstant(branches.right):
+            return node
+
+        exp = self.constant(node.left)
+        if type(exp) != bool:
+            return node
+        return branches.left if exp else branches.right
+
+    # Constants
+    def isConstant(self, node: MTNode) -> bool:
+        if node == None or node.current.type != MTTokenType.VALUE:
+            return False
+        try:
+            self.constant(node)
+        except ValueError:
+            return False
+        return node.current.sub_type in (MTTokenSubType.NUMBER_VALUE, MTTokenSubType.DOUBLE_VALUE, MTTokenSubType.STRING_VALUE, MTTokenSubType.BOOLEAN_VALUE)
+
+    def constant(self, node: MTNode):
+        token = node.current
+        if token.sub_type == MTTokenSubType.NUMBER_VALUE:
+            return int(token.value)
+        elif token.sub_type == MTTokenSubType.DOUBLE_VALUE:
+            return float(token.value)
+        elif token.sub_type == MTTokenSubType.BOOLEAN_VALUE:
+            return token.value == 'true'
+        return str(token.value)
+
+    def isLongString(self, left, right) -> bool:
+        if type(left) is str and type(right) is int:
+            return len(left) * right > self.maxStringLength
+        elif type(left) is int and type(right) is str:
+            return left * len(right) > self.maxStringLength
+        return False
+
+    # VALUE node holding value, None when it has no literal form the engines read back the same
+    def createValue(self, token: MTToken, value) -> MTNode:
+        if type(value) is bool:
+            return MTLiteral(self.createToken(token, MTTokenType.VALUE, 'true' if value else 'false', MTTokenSubType.BOOLEAN_VALUE))
+        elif type(value) is int:
+            try:
+                return MTLiteral(self.createToken(token, MTTokenType.VALUE, str(value), MTTokenSubType.NUMBER_VALUE))
+            except ValueError:
+                # more digits than str() converts
+                return None
+        elif type(value) is float:
+            return MTLiteral(self.createToken(token, MTTokenType.VALUE, repr(value), MTTokenSubType.DOUBLE_VALUE))
+        elif type(value) is str and len(value) <= self.maxStringLength:
+            return MTLiteral(self.createToken(token, MTTokenType.VALUE, value, MTTokenSubType.STRING_VALUE))
+        return None
+
+    def createPass(self, token: MTToken) -> MTNode:
+        return MTNode(self.createToken(token, MTTokenType.KEYWORD, 'pass', MTTokenSubType.OTHER_KEYWORDS))
+
+    def createToken(self, token: MTToken, type: MTTokenType, value: str, sub_type: MTTokenSubType) -> MTToken:
+        # the new token points at the source of the one it replaces
+        return MTToken(type, value, token.start_pos, token.end_pos, sub_type, line=token.line, column=token.column, file=token.file)
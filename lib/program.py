@@ -0,0 +1,166 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from lib.lexer.lexer import MTLexerAnalyzer
+from lib.lexer.regex_lexer import MTRegexLexerAnalyzer
+from lib.syntax.syntax import MTSyntaxAnalyzer
+from lib.semantic.semantic import MTSemanticAnalysis
+from lib.semantic.resolver import MTResolver
+from lib.optimizer.optimizer import MTOptimizer
+from lib.optimizer.licm import MTLoopInvariantMotion
+from lib.interpreter.interpreter import MTInterpreter
+from lib.interpreter.closure import MTClosureInterpreter
+from lib.interpreter.output import MTBufferedOutput
+from lib.codegen.python import MTPythonGenerator
+from lib.vm.compiler import MTBytecodeCompiler
+from lib.vm.vm import MTVirtualMachine
+from lib.message import MTCompilerMessage, MTDiagnosticError
+
+# lexer engines a program can be compiled with
+lexers = {
+    'default': MTLexerAnalyzer,
+    'regex': MTRegexLexerAnalyzer,
+}
+
+# engines a program can be run by, the choices of --engine in main.py
+engines = ('tree', 'vm', 'closure', 'python')
+
+# Python types of the values of every data type, for the initial values of a run
+data_types = {
+    'int': int,
+    'double': float,
+    'str': str,
+    'bool': bool,
+}
+
+class MTProgramCache:
+    # Least recently used programs kept in memory by a hash of their source and of the options compiling them.
+    # Shared by the threads of a process, so reading and storing are locked.
+    def __init__(self, capacity: int = 64) -> None:
+        self.capacity = capacity
+        self.programs: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(source: str, *options) -> str:
+        digest = hashlib.sha256()
+        for option in options:
+            digest.update(repr(option).encode() + b'\0')
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        with self.lock:
+            program = self.programs.get(key)
+            if program != None:
+                self.programs.move_to_end(key)
+            return program
+
+    def put(self, key: str, program):
+        with self.lock:
+            self.programs[key] = program
+            self.programs.move_to_end(key)
+            while len(self.programs) > self.capacity:
+                self.programs.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.programs.clear()
+
+    def __len__(self) -> int:
+        return len(self.programs)
+
+class MTProgram:
+    # A script lexed, parsed, checked, optimized and compiled for one engine once, run any number of times.
+    # Nothing is written to files. What is compiled is kept with the program: the resolved slots for the tree
+    # walking interpreter, the bytecode for the vm and the generated module for python. The closures of the
+    # closure engine hold the symbol and value trees of one run, so only its checked nodes are kept and every run
+    # builds them again. A run keeps its variables in its own environment and never changes what is compiled, so
+    # runs can happen one after the other or on several threads at once.
+    # Variables declared by the caller with `symbols` ({name: data type}) are known to the script without being
+    # declared in it, and every run gives them a value with `initial_values`.
+    def __init__(self, source: str, file: str, nodes: list, symbols: dict[str, str], engine: str = 'tree', compiled = None) -> None:
+        self.source = source
+        self.file = file
+        self.nodes = nodes
+        self.symbols = symbols
+        self.engine = engine
+        # MTResolver, MTBytecode, MTPythonGenerator or None for the closure engine
+        self.compiled = compiled
+
+    def run(self, output = None, initial_values: dict = None) -> dict:
+        # output is what print writes to, anything with write(text) and flush() like MTCaptureOutput or
+        # io.StringIO, stdout when None. Returns the symbol and value trees of the global variables.
+        values = dict(initial_values) if initial_values != None else {}
+        for name, value in values.items():
+            if name not in self.symbols:
+                raise ValueError(f'Initial value of undeclared variable: {name}')
+            if type(value) is not data_types[self.symbols[name]]:
+                raise TypeError(f'Initial value of `{name}` should be of type `{self.symbols[name]}`')
+        for name in self.symbols:
+            if name not in values:
+                raise ValueError(f'Missing initial value: {name}')
+
+        try:
+            if self.engine == 'vm':
+                return MTVirtualMachine(self.compiled, self.source, self.symbols, values, output=output).interpret()
+            elif self.engine == 'closure':
+                return MTClosureInterpreter(self.nodes, self.source, self.symbols, values, output=output).interpret()
+            elif self.engine == 'python':
+                return self.compiled.run(values, output if output != None else MTBufferedOutput())
+            return MTInterpreter(self.nodes, self.source, valueTree=values, resolver=self.compiled, output=output).interpret()
+        except RecursionError:
+            raise MTDiagnosticError([MTCompilerMessage.nestingError(self.file, self.engine)])
+
+def compile(source: str, file: str = '<string>', symbols: dict[str, str] = None, optimization: int = 0, lexer: str = 'default', cache: MTProgramCache = None, engine: str = 'tree', compact_tokens: bool = False) -> MTProgram:
+    # Compiles source to a program run by engine, or returns the one compiled before from the same source and
+    # options. Errors raise MTDiagnosticError with all of them. The default cache is the one of the module, False
+    # disables it. compact_tokens keeps the tokens in an MTTokenBuffer while parsing.
+    if engine not in engines:
+        raise ValueError(f'Unknown engine: {engine}')
+    symbols = dict(symbols) if symbols != None else {}
+    for name, data_type in symbols.items():
+        if data_type not in data_types:
+            raise ValueError(f'Unknown data type of `{name}`: {data_type}')
+
+    if cache == None:
+        cache = programs
+    key = MTProgramCache.key(source, file, sorted(symbols.items()), optimization, lexer, engine, compact_tokens) if cache != False else None
+    program = cache.get(key) if cache != False else None
+    if program != None:
+        return program
+
+    # nesting too deep for the engine is reported as an error of the script, as by main.py
+    try:
+        analyzer = lexers[lexer](source, file)
+        tokens = analyzer.tokenizeBuffer() if compact_tokens else analyzer.tokenize()
+        nodes = MTSyntaxAnalyzer(tokens, source).analyze()
+        MTSemanticAnalysis(nodes, source, symbols).analyze()
+
+        if optimization >= 1:
+            nodes = MTOptimizer(nodes, source).optimize()
+        if optimization >= 2:
+            nodes = MTLoopInvariantMotion(nodes, source).optimize()
+
+        # every declared symbol has a value in every run
+        if engine == 'vm':
+            compiled = MTBytecodeCompiler(nodes, source, set(symbols), set(symbols)).compile()
+        elif engine == 'closure':
+            compiled = None
+        elif engine == 'python':
+            compiled = MTPythonGenerator(nodes, source, file, symbols, dict.fromkeys(symbols))
+            compiled.generate()
+        else:
+            compiled = MTResolver(nodes, symbols, dict.fromkeys(symbols))
+            compiled.resolve()
+    except RecursionError:
+        raise MTDiagnosticError([MTCompilerMessage.nestingError(file, engine)])
+
+    program = MTProgram(source, file, nodes, symbols, engine, compiled)
+    if cache != False:
+        cache.put(key, program)
+    return program
+
+# programs compiled by compile() in this process
+programs = MTProgramCache()
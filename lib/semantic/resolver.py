@@ -0,0 +1,185 @@
+from lib.syntax.data import *
+from lib.lexer.token_class import *
+from lib.semantic.scope import MTScopeAnalysis
+
+class MTResolverScope:
+    # what is known about one block while resolving it
+    def __init__(self, depth: int, parent: 'MTResolverScope' = None) -> None:
+        self.depth = depth
+        # names having a slot in the frame of this block
+        self.slots: dict[str, int] = {}
+        # declared variables and the (depth, slot) of every variable having a value
+        self.symbols: dict[str, str] = dict(parent.symbols) if parent != None else {}
+        self.values: dict[str, tuple[int, int]] = dict(parent.values) if parent != None else {}
+
+class MTResolver:
+    # Gives every variable a (depth, slot) index, depth being the block nesting level of the frame holding it,
+    # and stores it in the `slot` of the identifier nodes so MTInterpreter can use lists instead of dicts.
+    # Like MTSemanticAnalysis, every block starts from the symbols of the block around it, and which variables
+    # have a value at any point is known statically too: only statements of a block itself give values to it.
+    # An identifier read gets the slot of its value, or None when it has none. An identifier statement gets the
+    # slot it writes to, or None when it declares an existing variable or assigns an undeclared one.
+    # Nodes owning a block get the `frame_size` of that block, and in `restored` the slots of the outer variables
+    # hidden by a for loop of the block, which MTInterpreter puts back as they were when the block ends.
+    def __init__(self, nodes: list[MTNode], symbolTree: dict = {}, valueTree: dict = {}) -> None:
+        self.nodes: list[MTNode] = nodes
+        self.scope = MTResolverScope(0)
+        self.scope.symbols.update(symbolTree)
+        for name in valueTree:
+            self.store(self.scope, name)
+        # slots of every block, in the order they appear
+        self.slotMap: list[dict] = [{'block': 'global', 'line': 0, 'depth': 0, 'slots': self.scope.slots}]
+        # set while resolving a for loop initializer, which runs in an empty environment
+        self.isolated = False
+        self.resolved = False
+
+    def resolve(self) -> list[dict]:
+        if not self.resolved:
+            self.resolveStatements(self.nodes, self.scope)
+            self.resolved = True
+        return self.slotMap
+
+    # symbols and value slots of the global frame once the program has run
+    @property
+    def symbolTree(self) -> dict[str, str]:
+        return self.scope.symbols
+
+    @property
+    def valueSlots(self) -> dict[str, tuple[int, int]]:
+        return self.scope.values
+
+    @property
+    def frameSize(self) -> int:
+        return len(self.scope.slots)
+
+    # Slots
+    def slot(self, scope: MTResolverScope, name: str) -> tuple[int, int]:
+        # the value is written where it already is, otherwise in the frame of the block
+        if name in scope.values:
+            return scope.values[name]
+        return (scope.depth, scope.slots.setdefault(name, len(scope.slots)))
+
+    def store(self, scope: MTResolverScope, name: str) -> tuple[int, int]:
+        slot = self.slot(scope, name)
+        scope.values[name] = slot
+        return slot
+
+    # Statements
+    def resolveStatements(self, nodes: list[MTNode], scope: MTResolverScope):
+        for node in nodes:
+            self.resolveStatement(node, scope)
+
+    def resolveStatement(self, node: MTNode, scope: MTResolverScope):
+        token = node.current
+        if token.type == MTTokenType.IDENTIFIER:
+            self.resolveIdentifier(node, scope)
+        elif token.type == MTTokenType.KEYWORD:
+            self.resolveKeyword(node, scope)
+        elif token.type == MTTokenType.OPERATOR or token.type == MTTokenType.CONDITIONAL_OPERATOR or token.type == MTTokenType.LOGICAL_OPERATOR:
+            self.resolveExpression(node, scope)
+
+    def resolveBlock(self, owner: MTNode, nodes: list[MTNode], scope: MTResolverScope):
+        block = MTResolverScope(scope.depth + 1, scope)
+        self.slotMap.append({'block': owner.current.value, 'line': owner.current.line, 'depth': block.depth, 'slots': block.slots})
+        # outer variables a for loop of the block hides get back the value they had when the block started
+        owner.restored = tuple(block.values[name] for name in MTScopeAnalysis.hidden(nodes, block.values))
+        self.resolveStatements(nodes, block)
+        owner.frame_size = len(block.slots)
+
+    def resolveKeyword(self, node: MTNode, scope: MTResolverScope):
+        value = node.current.value
+        if value == 'print':
+            self.resolveExpression(node.right, scope)
+        elif value == 'if':
+            branch = node
+            while branch != None:
+                if branch.current.value != 'else':
+                    self.resolveExpression(branch.left, scope)
+                self.resolveBlock(branch, branch.statements, scope)
+                branch = branch.right
+        elif value == 'switch':
+            self.resolveExpression(node.left, scope)
+            for statement in node.statements:
+                if statement.current.value == 'case':
+                    self.resolveExpression(statement.left, scope)
+                if statement.right != None:
+                    self.resolveBlock(statement, [statement.right], scope)
+        elif value == 'for':
+            self.resolveForLoop(node, scope)
+        elif value == 'while':
+            self.resolveExpression(node.left, scope)
+            self.resolveBlock(node, node.statements, scope)
+        elif value == 'do':
+            self.resolveBlock(node, node.statements, scope)
+            if node.left != None:
+                self.resolveExpression(node.left.left, scope)
+
+    def resolveIdentifier(self, node: MTNode, scope: MTResolverScope):
+        name = node.current.value
+        if node.left != None and name not in scope.symbols:
+            scope.symbols[name] = node.left.current.value
+        elif node.left != None or name not in scope.symbols:
+            node.slot = None
+            return
+
+        if node.right != None:
+            self.resolveExpression(node.right, scope)
+            node.slot = self.store(scope, name)
+        else:
+            node.slot = self.slot(scope, name)
+
+    def resolveForLoop(self, node: MTNode, scope: MTResolverScope):
+        if node.left == None or len(node.left.statements) != 3:
+            return
+
+        init, condition, increment = node.left.statements
+        # the initializer sees none of the variables around it
+        self.isolated = True
+        self.resolveExpression(init.right if init.current.type == MTTokenType.IDENTIFIER else init, scope)
+        self.isolated = False
+
+        name = init.current.value
+        bound = init.current.type == MTTokenType.IDENTIFIER and init.left != None
+        if bound:
+            # the loop variable lives in the frame of the block running the loop, hiding any outer one
+            init.slot = (scope.depth, scope.slots.setdefault(name, len(scope.slots)))
+            scope.symbols[name] = init.left.current.value
+            if init.right != None:
+                scope.values[name] = init.slot
+        elif init.current.type == MTTokenType.IDENTIFIER:
+            # assigning in an empty environment, the variable is never declared
+            init.slot = None
+
+        self.resolveExpression(condition, scope)
+        self.resolveBlock(node, node.statements, scope)
+        self.resolveExpression(increment, scope)
+
+        # and is deleted once the loop is done
+        if bound:
+            del scope.symbols[name]
+            if init.right != None:
+                del scope.values[name]
+
+    # Expression
+    def resolveExpression(self, node: MTNode, scope: MTResolverScope):
+        # nodes left to resolve, from left to right, on an explicit stack so deep expressions don't recurse; an
+        # increment comes back once its operand is resolved to get the slot it stores to
+        stack = [(node, False)]
+        while len(stack) > 0:
+            node, operandResolved = stack.pop()
+            if node == None:
+                continue
+
+            token = node.current
+            if operandResolved:
+                # in a for loop initializer the value read is None, so the increment never gets to store it
+                if node.left != None and not self.isolated:
+                    node.slot = self.store(scope, node.left.current.value)
+            elif token.type == MTTokenType.IDENTIFIER:
+                node.slot = None if self.isolated else scope.values.get(token.value)
+            elif token.type == MTTokenType.OPERATOR and (token.value == '++' or token.value == '--'):
+                stack.append((node, True))
+                stack.append((node.left, False))
+            else:
+                stack.append((node.right, False))
+                stack.append((node.left, False))
@@ -0,0 +1,113 @@
+from lib.syntax.data import *
+from lib.lexer.token_class import *
+
+class MTBlockScope:
+    # names a block has to forget when it is left, and the ones whose value it puts back as it was on entry
+    def __init__(self, symbols: tuple[str, ...], values: tuple[str, ...], restored: tuple[str, ...] = ()) -> None:
+        self.symbols = symbols
+        self.values = values
+        self.restored = restored
+
+    def is_empty(self) -> bool:
+        return len(self.symbols) == 0 and len(self.values) == 0
+
+class MTScopeAnalysis:
+    # MTInterpreter runs every block (if/elif/else bodies, switch cases and each loop iteration) on copies of the
+    # symbol and value trees and only copies back the values of variables that already had one when the block was
+    # entered. Engines that keep a single flat environment get the same behaviour by forgetting, when a block is
+    # left, the variables it declared and the values it gave to variables that had none before. A variable hidden
+    # by a for loop of the block lost what the block wrote to it with the copy, so it gets its value on entry back.
+    # Which variables have a value at any point is known statically: only statements of a block itself can add
+    # values to it, nested blocks never do.
+    def __init__(self, nodes: list[MTNode], values: set[str] = set()) -> None:
+        self.nodes = nodes
+        self.values: set[str] = set(values)
+        # id(node) of the node owning a block -> MTBlockScope
+        self.blocks: dict[int, MTBlockScope] = {}
+
+    def analyze(self) -> dict[int, MTBlockScope]:
+        self.analyzeStatements(self.nodes, self.values)
+        return self.blocks
+
+    def block(self, node: MTNode) -> MTBlockScope:
+        return self.blocks[id(node)]
+
+    @staticmethod
+    def hidden(nodes: list[MTNode], values) -> list[str]:
+        # Variables having a value that a for loop of the block hides with its own. MTInterpreter's copy of the
+        # value tree lost them with the loop variable, so what the block wrote to them never got out of it.
+        names = []
+        for node in nodes:
+            if node.current.type != MTTokenType.KEYWORD or node.current.value != 'for' or node.left == None or len(node.left.statements) != 3:
+                continue
+            init = node.left.statements[0]
+            name = init.current.value
+            if init.current.type == MTTokenType.IDENTIFIER and init.left != None and init.right != None and name in values and name not in names:
+                names.append(name)
+        return names
+
+    def analyzeStatements(self, nodes: list[MTNode], values: set[str]):
+        for node in nodes:
+            self.analyzeStatement(node, values)
+
+    def analyzeStatement(self, node: MTNode, values: set[str]):
+        token = node.current
+        if token.type == MTTokenType.IDENTIFIER:
+            if node.right != None:
+                values.add(token.value)
+        elif token.type == MTTokenType.KEYWORD:
+            if token.value == 'if':
+                branch = node
+                while branch != None:
+                    self.analyzeBlock(branch, branch.statements, values)
+                    branch = branch.right
+            elif token.value == 'switch':
+                for statement in node.statements:
+                    if statement.right != None:
+                        self.analyzeBlock(statement, [statement.right], values)
+            elif token.value == 'for':
+                if node.left != None and len(node.left.statements) == 3:
+                    init = node.left.statements[0]
+                    loop_values = set(values)
+                    if init.right != None:
+                        loop_values.add(init.current.value)
+                    self.analyzeBlock(node, node.statements, loop_values)
+                    # the loop variable is deleted once the loop is done
+                    values.discard(init.current.value)
+            elif token.value == 'while' or token.value == 'do':
+                self.analyzeBlock(node, node.statements, values)
+
+    def analyzeBlock(self, owner: MTNode, nodes: list[MTNode], values: set[str]):
+        declared = []
+        for node in nodes:
+            if node.current.type == MTTokenType.IDENTIFIER and node.left != None and node.current.value not in declared:
+                declared.append(node.current.value)
+
+        assigned = []
+        for node in nodes:
+            self.collectAssigned(node, assigned)
+
+        dropped = list(declared)
+        for name in assigned:
+            if name not in values and name not in dropped:
+                dropped.append(name)
+        self.blocks[id(owner)] = MTBlockScope(tuple(declared), tuple(dropped), tuple(self.hidden(nodes, values)))
+
+        self.analyzeStatements(nodes, set(values))
+
+    # every variable given a value anywhere inside node, including nested blocks, in the order they appear
+    def collectAssigned(self, node: MTNode, assigned: list[str]):
+        # walked with a stack, expressions can be deeper than the recursion limit
+        stack = [node]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node == None:
+                continue
+            token = node.current
+            if token.type == MTTokenType.IDENTIFIER and node.right != None and token.value not in assigned:
+                assigned.append(token.value)
+            elif token.type == MTTokenType.OPERATOR and (token.value == '++' or token.value == '--') and node.left != None and node.left.current.value not in assigned:
+                assigned.append(node.left.current.value)
+            stack.extend(reversed(node.statements))
+            stack.append(node.right)
+            stack.append(node.left)
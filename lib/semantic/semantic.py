@@ -2,29 +2,40 @@ from lib.syntax.data import *
 from lib.message import *
 
 class MTSemanticAnalysis:
-    def __init__(self, nodes: list[MTNode] = [], program: str = '', symbolTree: dict = {}, isLoopStatement = False) -> None:
+    def __init__(self, nodes: list[MTNode] = [], program: str = '', symbolTree: dict = {}, isLoopStatement = False, diagnostics: list = None) -> None:
         self.nodes: list[MTNode] = nodes
         self.program: str = program
         self.isLoopStatement: bool = isLoopStatement
         self.position = 0
         self.__symbolTree = {}
         self.__symbolTree.update(symbolTree)
+        # Errors of every statement checked so far. Blocks are checked by analyses sharing the list of the one
+        # checking the program, which raises them all once it is done.
+        self.owner = diagnostics == None
+        self.diagnostics: list = diagnostics if diagnostics != None else []
     
     def analyze(self):
         while self.position < len(self.nodes):
-            if (self.match(self.peek(), MTTokenType.IDENTIFIER)):
-                self.parseIdentifier(self.peek())
-                self.advance()
-            elif self.match(self.peek(), MTTokenType.OPERATOR) or self.match(self.peek(), MTTokenType.CONDITIONAL_OPERATOR) or self.match(self.peek(), MTTokenType.LOGICAL_OPERATOR):
-                self.evaluateExpression(self.peek())
-                self.advance()
-            elif self.match(self.peek(), MTTokenType.KEYWORD):
-                self.parseKeyword(self.peek())
-                self.advance()
+            kind = type(self.peek())
+            if not (kind is MTDeclare or kind is MTAssign or kind is MTBinaryOp or kind is MTTernary or kind is MTIncrement or self.match(self.peek(), MTTokenType.KEYWORD)):
+                break
+            try:
+                if kind is MTDeclare or kind is MTAssign:
+                    self.parseIdentifier(self.peek())
+                elif kind is MTBinaryOp or kind is MTTernary or kind is MTIncrement:
+                    self.evaluateExpression(self.peek())
+                else:
+                    self.parseKeyword(self.peek())
+            except MTDiagnosticError as error:
+                # the statement is wrong, the next ones are still checked
+                self.diagnostics.extend(error.diagnostics)
+            self.advance()
 
         if self.peek() != None:
-            MTCompilerMessage.error(f'Unexpected Node: {self.nodes[self.position].current.value}')
-        
+            self.diagnostics.append(MTDiagnostic('error', f'Unexpected Node: {self.nodes[self.position].current.value}'))
+
+        if self.owner and len(self.diagnostics) > 0:
+            raise MTDiagnosticError(self.diagnostics)
         return self.__symbolTree
     
     def parseIdentifier(self, node: MTNode):
@@ -44,15 +55,16 @@ class MTSemanticAnalysis:
                 MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'A value of type `{exp}` can\'t be assigned to a variable of type `{self.__symbolTree[identifier.value]}`')
     
     def parseKeyword(self, node: MTNode):
-        if self.match(node, MTTokenType.KEYWORD, expected_value='print'):
+        kind = type(node)
+        if kind is MTPrint:
             self.parsePrint(node)
         elif self.match(node, MTTokenType.KEYWORD, expected_value='pass'):
             pass
         elif (self.match(node, MTTokenType.KEYWORD, expected_value='continue') or self.match(node, MTTokenType.KEYWORD, expected_value='break')) and self.isLoopStatement:
             pass
-        elif self.match(node, MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS):
+        elif kind is MTIf or kind is MTSwitch:
             self.parseConditional(node)
-        elif self.match(node, MTTokenType.KEYWORD, MTTokenSubType.LOOPS_KEYWORDS):
+        elif kind is MTFor or kind is MTWhile or kind is MTDoWhile:
             self.parseLoop(node)
         else:
             MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating statement')
@@ -65,89 +77,146 @@ class MTSemanticAnalysis:
     
     # Conditional Statements
     def parseConditional(self, node: MTNode):
-        if self.match(node, MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, expected_value='if'):
+        if type(node) is MTIf and node.current.value == 'if':
             self.parseConditionalIfElse(node)
-        elif self.match(node, MTTokenType.KEYWORD, expected_value='switch'):
+        elif type(node) is MTSwitch:
             self.parseConditionalSwitch(node)
         else:
             MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating statement')
 
     def parseConditionalIfElse(self, node: MTNode):
-        if self.match(node, MTTokenType.KEYWORD, expected_value='if') or self.match(node, MTTokenType.KEYWORD, expected_value='elif'):
-            exp = self.evaluateExpression(node.left)
-            if exp != 'bool':
-                MTCompilerMessage.semanticError(self.program, node.left.current, node.left.current.start_pos, f'`{exp}` is not a type of `bool`')
+        if node.current.value == 'if' or node.current.value == 'elif':
+            self.record(self.parseCondition, node.left)
 
-        MTSemanticAnalysis(node.statements, self.program, self.__symbolTree).analyze()
+        MTSemanticAnalysis(node.statements, self.program, self.__symbolTree, diagnostics=self.diagnostics).analyze()
 
         if node.right != None:
             self.parseConditionalIfElse(node.right)
     
     def parseConditionalSwitch(self, node: MTNode):
-        exp = self.evaluateExpression(node.left)
+        # None when the switched expression is wrong, the cases are still checked
+        exp = self.record(self.evaluateExpression, node.left)
 
         for statement in node.statements:
-            if self.match(statement, MTTokenType.KEYWORD, expected_value='case'):
-                sexp = self.evaluateExpression(statement.left)
-                if sexp != exp:
-                    MTCompilerMessage.semanticError(self.program, statement.left.current, statement.left.current.start_pos, f'`{sexp}` is not a type of `{exp}`')
-                MTSemanticAnalysis([statement.right], self.program, self.__symbolTree).analyze()
-            elif self.match(statement, MTTokenType.KEYWORD, expected_value='default'):
-                MTSemanticAnalysis([statement.right], self.program, self.__symbolTree).analyze()
+            if type(statement) is MTCase and statement.current.value == 'case':
+                self.record(self.parseConditionalCase, statement, exp)
+                MTSemanticAnalysis([statement.right], self.program, self.__symbolTree, diagnostics=self.diagnostics).analyze()
+            elif type(statement) is MTCase:
+                MTSemanticAnalysis([statement.right], self.program, self.__symbolTree, diagnostics=self.diagnostics).analyze()
     
+    def parseConditionalCase(self, node: MTNode, exp: str):
+        if node.left == None:
+            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating expression')
+        sexp = self.evaluateExpression(node.left)
+        if exp != None and sexp != exp:
+            MTCompilerMessage.semanticError(self.program, node.left.current, node.left.current.start_pos, f'`{sexp}` is not a type of `{exp}`')
+
+    def parseCondition(self, node: MTNode):
+        exp = self.evaluateExpression(node)
+        if exp != 'bool':
+            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'`{exp}` is not a type of `bool`')
+
     # Loops Statements
     def parseLoop(self, node: MTNode):
-        if self.match(node, MTTokenType.KEYWORD, expected_value='for'):
+        kind = type(node)
+        if kind is MTFor:
             self.parseLoopFor(node)
-        elif self.match(node, MTTokenType.KEYWORD, expected_value='while'):
+        elif kind is MTWhile:
             self.parseLoopWhile(node)
-        elif self.match(node, MTTokenType.KEYWORD, expected_value='do'):
+        elif kind is MTDoWhile:
             self.parseLoopDoWhile(node)
         else:
             MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating statement')
     
     def parseLoopFor(self, node: MTNode):
+        tree = None
         if node.left != None:
-            self.consume(node.left, MTTokenType.LOOP_LOGIC)
             logic = node.left
+            if type(logic) is not MTLoopLogic:
+                MTCompilerMessage.error(f'TypeError: Unexpected Node : {logic.current.value}')
             if len(logic.statements) == 3:
-                tree = MTSemanticAnalysis(logic.statements, self.program).analyze()
+                tree = MTSemanticAnalysis(logic.statements, self.program, diagnostics=self.diagnostics).analyze()
                 for var in tree:
                     if tree[var] != 'int':
-                        MTCompilerMessage.semanticError(self.program, logic.current, logic.current.start_pos, f'Error while evaluating statement')
+                        self.report(logic.current, f'Error while evaluating statement')
             else:
-                MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating statement')
+                self.report(node.current, f'Error while evaluating statement')
         else:
-            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating statement')
+            self.report(node.current, f'Error while evaluating statement')
         
         newTree = {}
         newTree.update(self.__symbolTree)
         if tree != None:
             newTree.update(tree)
-        tree = MTSemanticAnalysis(node.statements, self.program, newTree, isLoopStatement=True).analyze()
+        tree = MTSemanticAnalysis(node.statements, self.program, newTree, isLoopStatement=True, diagnostics=self.diagnostics).analyze()
 
     def parseLoopWhile(self, node: MTNode, fromDoWhile = False):
         if node.left != None:
-            exp = self.evaluateExpression(node.left)
-            if exp != 'bool':
-                MTCompilerMessage.semanticError(self.program, node.left.current, node.left.current.start_pos, f'`{exp}` is not a type of `bool`')
+            self.record(self.parseCondition, node.left)
         else:
-            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating statement')
+            self.report(node.current, f'Error while evaluating statement')
         
         if not fromDoWhile:
-            tree = MTSemanticAnalysis(node.statements, self.program, self.__symbolTree, isLoopStatement=True).analyze()
+            tree = MTSemanticAnalysis(node.statements, self.program, self.__symbolTree, isLoopStatement=True, diagnostics=self.diagnostics).analyze()
     
     def parseLoopDoWhile(self, node: MTNode):
         if node.left != None:
             self.parseLoopWhile(node.left, True)
         else:
-            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating statement')
+            self.report(node.current, f'Error while evaluating statement')
 
-        tree = MTSemanticAnalysis(node.statements, self.program, self.__symbolTree, isLoopStatement=True).analyze()
+        tree = MTSemanticAnalysis(node.statements, self.program, self.__symbolTree, isLoopStatement=True, diagnostics=self.diagnostics).analyze()
 
     # Expression Evaluation
     def evaluateExpression(self, node: MTNode) -> str:
-        if self.match(node, MTTokenType.VALUE):
+        # An operator waits on a stack for the types of its operands, which are found from left to right onto
+        # another stack, so the depth of the expression never becomes recursion. What is left to do for a node:
+        # 0 find its type, 1 check its operator, 2 check the condition of a ternary, 3 check its branches.
+        types = []
+        stack = [(node, 0)]
+        while len(stack) > 0:
+            node, step = stack.pop()
+            kind = type(node)
+            if step == 0:
+                if kind is MTLiteral or kind is MTName:
+                    types.append(self.evaluateOperand(node))
+                elif kind is MTIncrement:
+                    stack.append((node, 1))
+                    stack.append((node.left, 0))
+                elif kind is MTTernary:
+                    stack.append((node, 2))
+                    stack.append((node.left, 0))
+                elif kind is MTBinaryOp:
+                    stack.append((node, 1))
+                    stack.append((node.right, 0))
+                    stack.append((node.left, 0))
+                else:
+                    MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating expression')
+            elif step == 1:
+                if kind is MTIncrement:
+                    types.append(self.evaluateIncrement(node, types.pop()))
+                else:
+                    rightExp = types.pop()
+                    types.append(self.evaluateOperator(node, types.pop(), rightExp))
+            elif step == 2:
+                leftExp = types.pop()
+                if leftExp != 'bool':
+                    MTCompilerMessage.semanticError(self.program, node.left.current, node.left.current.start_pos, f'`{leftExp}` is not a type of `bool`')
+
+                self.consume(node.right, MTTokenType.CONDITIONAL_OPERATOR, expected_value=':')
+                stack.append((node, 3))
+                stack.append((node.right.right, 0))
+                stack.append((node.right.left, 0))
+            else:
+                rightExp = types.pop()
+                leftExp = types.pop()
+                if leftExp != rightExp:
+                    MTCompilerMessage.semanticError(self.program, node.right.left.current, node.right.left.current.start_pos, f'Error while evaluating expression')
+                types.append(leftExp)
+        return types[0]
+
+    def evaluateOperand(self, node: MTNode) -> str:
+        if type(node) is MTLiteral:
             if node.current.sub_type == MTTokenSubType.NUMBER_VALUE:
                 return 'int'
             elif node.current.sub_type == MTTokenSubType.DOUBLE_VALUE:
@@ -156,23 +225,19 @@ class MTSemanticAnalysis:
                 return 'bool'
             elif node.current.sub_type == MTTokenSubType.STRING_VALUE:
                 return 'str'
-        elif self.match(node, MTTokenType.IDENTIFIER):
-            if node.current.value in self.__symbolTree:
-                return self.__symbolTree[node.current.value]
-            else:
-                MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'variable `{node.current.value}` is not defined')
-        elif self.match(node, MTTokenType.OPERATOR):
-            if node.current.value == '++' or node.current.value == '--':
-                leftExp = self.evaluateExpression(node.left)
-
-                if leftExp != 'int':
-                    MTCompilerMessage.semanticError(self.program, node.left.current, node.left.current.start_pos, f'Error while evaluating expression')
-                
-                return 'int'
-            
-            leftExp = self.evaluateExpression(node.left)
-            rightExp = self.evaluateExpression(node.right)
-            
+        elif node.current.value in self.__symbolTree:
+            return self.__symbolTree[node.current.value]
+        else:
+            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'variable `{node.current.value}` is not defined')
+
+    def evaluateIncrement(self, node: MTNode, leftExp: str) -> str:
+        if leftExp != 'int':
+            MTCompilerMessage.semanticError(self.program, node.left.current, node.left.current.start_pos, f'Error while evaluating expression')
+        
+        return 'int'
+
+    def evaluateOperator(self, node: MTNode, leftExp: str, rightExp: str) -> str:
+        if node.current.type == MTTokenType.OPERATOR:
             if leftExp == 'bool':
                 MTCompilerMessage.semanticError(self.program, node.left.current, node.left.current.start_pos, f'Error while evaluating expression')
             elif rightExp == 'bool':
@@ -189,31 +254,12 @@ class MTSemanticAnalysis:
                 return 'double'
 
             MTCompilerMessage.semanticError(self.program, node.left.current, node.left.current.start_pos, f'Error while evaluating expression')
-        elif self.match(node, MTTokenType.CONDITIONAL_OPERATOR):
-            if node.current.value == '?':
-                leftExp = self.evaluateExpression(node.left)
-                if leftExp != 'bool':
-                    MTCompilerMessage.semanticError(self.program, node.left.current, node.left.current.start_pos, f'`{leftExp}` is not a type of `bool`')
-                
-                self.consume(node.right, MTTokenType.CONDITIONAL_OPERATOR, expected_value=':')
-                currentNode = node.right
-                leftExp = self.evaluateExpression(currentNode.left)
-                rightExp = self.evaluateExpression(currentNode.right)
-                if leftExp != rightExp:
-                    MTCompilerMessage.semanticError(self.program, currentNode.left.current, currentNode.left.current.start_pos, f'Error while evaluating expression')
-                return leftExp
-
-            leftExp = self.evaluateExpression(node.left)
-            rightExp = self.evaluateExpression(node.right)
-
+        elif node.current.type == MTTokenType.CONDITIONAL_OPERATOR:
             if leftExp == rightExp:
                 return 'bool'
 
             MTCompilerMessage.semanticError(self.program, node.left.current, node.left.current.start_pos, f'Error while evaluating expression')
-        elif self.match(node, MTTokenType.LOGICAL_OPERATOR):
-            leftExp = self.evaluateExpression(node.left)
-            rightExp = self.evaluateExpression(node.right)
-            
+        else:
             if leftExp == 'bool' and rightExp == 'bool':
                 return 'bool'
             elif leftExp != 'bool':
@@ -222,10 +268,19 @@ class MTSemanticAnalysis:
                 MTCompilerMessage.semanticError(self.program, node.right.current, node.right.current.start_pos, f'`{rightExp}` is not a type of `bool`')
             
             MTCompilerMessage.semanticError(self.program, node.left.current, node.left.current.start_pos, f'Error while evaluating expression')
-        else:
-            MTCompilerMessage.semanticError(self.program, node.current, node.current.start_pos, f'Error while evaluating expression')
 
     # Core Functions
+    def record(self, check, *arguments):
+        # keeps the errors of one part of a statement, so the parts after it are still checked
+        try:
+            return check(*arguments)
+        except MTDiagnosticError as error:
+            self.diagnostics.extend(error.diagnostics)
+            return None
+
+    def report(self, token: MTToken, error: str):
+        self.diagnostics.append(MTCompilerMessage.diagnostic('semantic', token.file, self.program, token.start_pos, error))
+
     def consume(self, node: MTNode, expected_type: MTTokenType, expected_sub_type: MTTokenSubType = MTTokenSubType.NONE, expected_value: str = None):
         if self.match(node, expected_type, expected_sub_type, expected_value):
             return node
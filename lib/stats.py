@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from lib.syntax.data import MTNode
+
+class MTStatistics:
+    # Wall time, CPU time and peak memory of every stage of read_file, and counts of what the stages produced,
+    # written to bin/stats.json by --stats. Memory is traced with tracemalloc from the first stage on and its peak
+    # is reset when a stage starts, so a stage's peak is the most memory held at once while it ran, including what
+    # the stages before it still hold. tracemalloc slows allocations down, times are comparable between runs with
+    # --stats, not with runs without it. A stage entered again, like writing artifacts, adds up.
+    # When disabled nothing is measured nor written.
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.stages: dict[str, dict] = {}
+        self.counts: dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            after, peak = tracemalloc.get_traced_memory()
+            stage = self.stages.setdefault(name, {'wall_time': 0.0, 'cpu_time': 0.0, 'peak_memory': 0, 'allocated_memory': 0})
+            stage['wall_time'] += wall
+            stage['cpu_time'] += cpu
+            stage['peak_memory'] = max(stage['peak_memory'], peak)
+            # memory the stage left allocated, negative when it freed more than it kept
+            stage['allocated_memory'] += after - before
+
+    def count(self, name: str, value: int):
+        if self.enabled:
+            self.counts[name] = value
+
+    # iterator over tokens counting them as they are read, for streamed tokens
+    def counted(self, tokens):
+        if not self.enabled:
+            return tokens
+        def read():
+            count = 0
+            try:
+                for token in tokens:
+                    count += 1
+                    yield token
+            finally:
+                self.count('tokens', count)
+        return read()
+
+    @staticmethod
+    def nodes(asts: list[MTNode]) -> int:
+        # nodes of the trees, walked with a stack as they can be deeper than the recursion limit
+        count = 0
+        stack = list(asts)
+        while len(stack) > 0:
+            node = stack.pop()
+            if not isinstance(node, MTNode):
+                continue
+            count += 1
+            stack.append(node.left)
+            stack.append(node.right)
+            if node.statements != None:
+                stack.extend(node.statements)
+        return count
+
+    def report(self) -> dict:
+        return {'stages': self.stages, 'counts': self.counts}
+
+    def write(self, path: str):
+        if not self.enabled:
+            return
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w') as file:
+                json.dump(self.report(), file, indent=4)
+        except IOError:
+            print(f"Error writing to file '{path}'.")
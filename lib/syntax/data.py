@@ -1,5 +1,5 @@
 from enum import Enum, auto
-from lib.lexer.token_class import MTToken
+from lib.lexer.token_class import MTToken, MTTokenSubType
 
 class MTStatementOperation(Enum):
     EXPRESSION = auto()
@@ -9,12 +9,166 @@ class MTStatementOperation(Enum):
     VALUE = auto()
     CONDITIONAL = auto()
 
+class MTOperator(Enum):
+    ADD = auto()
+    SUB = auto()
+    MUL = auto()
+    DIV = auto()
+    LT = auto()
+    GT = auto()
+    EQ = auto()
+    LE = auto()
+    GE = auto()
+    AND = auto()
+    OR = auto()
+
 class MTNode:
+    # Generic node, still used as is for the data type of a declaration and for pass, break and continue.
+    # The parser emits the subclasses below for everything else so consumers can dispatch on the class.
+    # What the passes after the parser attach to nodes only has a slot in the classes it is attached to.
+    __slots__ = ('current', 'left', 'right', 'statements')
+
     def __init__(self, current: MTToken) -> None:
         self.current: MTToken = current
         self.left: MTNode = None
         self.right: MTNode = None
-        self.statements: list[MTNode] = []
+        # only nodes owning a block get a list of their own, the others share an empty tuple
+        self.statements: list[MTNode] = ()
     
     def __repr__(self) -> str:
-        return "{" + f'"current": {self.current}, "left":{self.left if self.left != None else "null"}, "right": {self.right if self.right != None else "null"}, "statements": {self.statements}' + "}"
\ No newline at end of file
+        return "{" + f'"current": {self.current}, "left":{self.left if self.left != None else "null"}, "right": {self.right if self.right != None else "null"}, "statements": {list(self.statements)}' + "}"
+
+class MTBlockNode(MTNode):
+    __slots__ = ('frame_size', 'restored', 'invariants')
+
+    def __init__(self, current: MTToken) -> None:
+        super().__init__(current)
+        self.statements = []
+        # number of slots of the block and slots of the outer variables it puts back when it ends, set by MTResolver
+        self.frame_size: int = 0
+        self.restored: tuple[tuple[int, int], ...] = ()
+        # indexes of the loop invariant expressions hoisted by a loop, set by MTLoopInvariantMotion
+        self.invariants: tuple[int, ...] = ()
+
+# Expressions
+class MTExpression(MTNode):
+    __slots__ = ('invariant',)
+
+    def __init__(self, current: MTToken) -> None:
+        super().__init__(current)
+        # MTInvariant of a loop invariant expression, set by MTLoopInvariantMotion
+        self.invariant = None
+
+class MTLiteral(MTExpression):
+    # value parsed once from the token, None when it doesn't parse and the engines have to report it
+    __slots__ = ('value',)
+
+    def __init__(self, current: MTToken) -> None:
+        super().__init__(current)
+        try:
+            if current.sub_type == MTTokenSubType.NUMBER_VALUE:
+                self.value = int(current.value)
+            elif current.sub_type == MTTokenSubType.DOUBLE_VALUE:
+                self.value = float(current.value)
+            elif current.sub_type == MTTokenSubType.STRING_VALUE:
+                self.value = str(current.value)
+            elif current.sub_type == MTTokenSubType.BOOLEAN_VALUE:
+                self.value = current.value == 'true'
+            else:
+                self.value = None
+        except ValueError:
+            self.value = None
+
+class MTName(MTExpression):
+    __slots__ = ('slot',)
+
+    def __init__(self, current: MTToken) -> None:
+        super().__init__(current)
+        # (depth, slot) of the variable read, set by MTResolver
+        self.slot: tuple[int, int] = None
+
+class MTBinaryOp(MTExpression):
+    # arithmetic, comparison and logical operations, `operator` is None for the unsupported ones
+    __slots__ = ('operator',)
+    operators = {
+        '+': MTOperator.ADD,
+        '-': MTOperator.SUB,
+        '*': MTOperator.MUL,
+        '/': MTOperator.DIV,
+        '<': MTOperator.LT,
+        '>': MTOperator.GT,
+        '==': MTOperator.EQ,
+        '<=': MTOperator.LE,
+        '>=': MTOperator.GE,
+        '&&': MTOperator.AND,
+        '||': MTOperator.OR,
+    }
+
+    def __init__(self, current: MTToken) -> None:
+        super().__init__(current)
+        self.operator: MTOperator = self.operators.get(current.value)
+
+class MTTernary(MTExpression):
+    # condition in left, the `:` MTBinaryOp holding both values in right
+    __slots__ = ()
+
+class MTIncrement(MTExpression):
+    # `++` and `--` of the variable in left
+    __slots__ = ('step', 'slot')
+
+    def __init__(self, current: MTToken) -> None:
+        super().__init__(current)
+        self.step: int = 1 if current.value == '++' else -1
+        # (depth, slot) of the variable stored to, set by MTResolver
+        self.slot: tuple[int, int] = None
+
+# Statements
+class MTDeclare(MTNode):
+    # data type in left, value in right
+    __slots__ = ('slot',)
+
+    def __init__(self, current: MTToken) -> None:
+        super().__init__(current)
+        # (depth, slot) of the variable written, set by MTResolver
+        self.slot: tuple[int, int] = None
+
+class MTAssign(MTNode):
+    __slots__ = ('slot',)
+
+    def __init__(self, current: MTToken) -> None:
+        super().__init__(current)
+        # (depth, slot) of the variable written, set by MTResolver
+        self.slot: tuple[int, int] = None
+
+class MTPrint(MTNode):
+    __slots__ = ()
+
+class MTIf(MTBlockNode):
+    # if, elif and else, the next branch in right
+    __slots__ = ()
+
+class MTSwitch(MTBlockNode):
+    __slots__ = ()
+
+class MTCase(MTNode):
+    # case and default, the statement run in right in a block of its own
+    __slots__ = ('frame_size', 'restored')
+
+    def __init__(self, current: MTToken) -> None:
+        super().__init__(current)
+        # number of slots of the block and slots of the outer variables it puts back when it ends, set by MTResolver
+        self.frame_size: int = 0
+        self.restored: tuple[tuple[int, int], ...] = ()
+
+class MTLoopLogic(MTBlockNode):
+    __slots__ = ()
+
+class MTFor(MTBlockNode):
+    __slots__ = ()
+
+class MTWhile(MTBlockNode):
+    __slots__ = ()
+
+class MTDoWhile(MTBlockNode):
+    # the `while` holding the condition in left
+    __slots__ = ()
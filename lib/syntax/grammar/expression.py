@@ -2,96 +2,120 @@ from lib.lexer.token_class import *
 from lib.message import MTCompilerMessage
 from lib.syntax.data import *
 
+# what an operand can still be the left side of: a factor (value, name or parenthesized expression), a term
+# (factors joined by arithmetic operators), a term closed by `++` or `--`, a comparison and a logical expression
+MTFactorRank = 5
+MTTermRank = 4
+MTClosedTermRank = 3
+MTComparisonRank = 2
+MTLogicalRank = 1
+
 class MTExpressionGrammar:
+    # Table driven Pratt parser. Every operator has a level, the rank its left operand needs at least, the floor
+    # of its right operand (the lowest level of the operators the right operand can hold) and the rank of the
+    # node it gives:
+    #   arithmetic operators, all of one level and left associative, take a factor on their right
+    #   `++` and `--` take the term on their left and close it
+    #   comparisons take a term on each side and are not associative, `a < b < c` stops at the second `<`
+    #   `?` takes a comparison on its right, the `:` in it is a comparison of its two terms
+    #   logical operators, left associative, take comparisons on each side
+    # An operator binding its left operand waits on a stack for its right one, and so does every open parenthesis,
+    # so the depth of the expression never becomes recursion. One cursor is moved over the tokens from the start of
+    # the expression to the token after it.
+    rules = {
+        MTTokenType.OPERATOR: {
+            None: (3, MTTermRank, 4, MTTermRank, MTBinaryOp),
+            '++': (3, MTTermRank, None, MTClosedTermRank, MTIncrement),
+            '--': (3, MTTermRank, None, MTClosedTermRank, MTIncrement),
+        },
+        MTTokenType.CONDITIONAL_OPERATOR: {
+            None: (2, MTClosedTermRank, 3, MTComparisonRank, MTBinaryOp),
+            '?': (2, MTClosedTermRank, 2, MTComparisonRank, MTTernary),
+        },
+        MTTokenType.LOGICAL_OPERATOR: {
+            None: (1, MTLogicalRank, 2, MTLogicalRank, MTBinaryOp),
+        },
+    }
+
     def __init__(self, tokens: list[MTToken], program: str, position: int, endChar: str = ';') -> None:
         self.tokens = tokens
         self.position = position
         self.program = program
         self.endChar = endChar
-        self.currentStep = 0
-        self.steps = 0
 
     # Expression Parser
     def generateExpression(self) -> MTNode:
-        node = self.parseLogical()
-        return self.position, node
-
-        if self.peek() != None:
-            MTCompilerMessage.syntaxError(self.program, self.peek(), self.peek().start_pos, 'expression token')
-    
-    def parseLogical(self) -> MTNode:
-        node = self.parseComparison()
-
-        while self.match(MTTokenType.LOGICAL_OPERATOR):
-            current = MTNode(self.consume(MTTokenType.LOGICAL_OPERATOR))
-            current.left = node
-            current.right = self.parseComparison()
-            node = current
-        
-        return node
+        tokens = self.tokens
+        rules = self.rules
+        # [floor, operator waiting for its right operand or None for a parenthesis, rank of the operator's node]
+        stack = []
+        floor = 0
 
-    def parseComparison(self) -> MTNode:
-        node = self.parseTerm()
-
-        if self.match(MTTokenType.CONDITIONAL_OPERATOR):
-            current = MTNode(self.consume(MTTokenType.CONDITIONAL_OPERATOR))
-            current.left = node
-            if current.current.value == '?':
-                current.right = self.parseComparison()
-                node = current
+        while True:
+            # Operand
+            token = self.peek()
+            if token == None:
+                MTCompilerMessage.syntaxError(self.program, self.previous(), self.previous().start_pos, 'expression token')
+            elif token.type == MTTokenType.VALUE:
+                left = MTLiteral(token)
+            elif token.type == MTTokenType.IDENTIFIER:
+                left = MTName(token)
+            elif token.type == MTTokenType.SEPARATOR and token.value == '(':
+                self.position += 1
+                stack.append([floor, None, MTFactorRank])
+                floor = 0
+                continue
             else:
-                current.right = self.parseTerm()
-                node = current
+                MTCompilerMessage.syntaxError(self.program, token, token.start_pos, 'expression token')
+            self.position += 1
+            rank = MTFactorRank
 
-        return node
-    
-    def parseTerm(self) -> MTNode:
-        node = self.parseFactor()
+            # Operators, until one waits for its right operand
+            while True:
+                rule = None
+                if tokens.has(self.position):
+                    token = tokens[self.position]
+                    table = rules.get(token.type)
+                    if table != None:
+                        rule = table.get(token.value, table[None])
 
-        while self.match(MTTokenType.OPERATOR):
-            current = MTNode(self.consume(MTTokenType.OPERATOR))
-            current.left = node
-            if current.current.value == '++' or current.current.value == '--':
-                return current
-            else:
-                right = self.parseFactor()
-                current.right = right
-                node = current
+                if rule != None and rule[0] >= floor and rank >= rule[1]:
+                    self.position += 1
+                    node = rule[4](token)
+                    node.left = left
+                    if rule[2] == None:
+                        left, rank = node, rule[3]
+                        continue
+                    stack.append([floor, node, rule[3]])
+                    floor = rule[2]
+                    break
 
-        return node
-    
-    def parseFactor(self) -> MTNode:
-        if self.match(MTTokenType.VALUE):
-            node = MTNode(self.consume(MTTokenType.VALUE))
-            return node
-        elif self.match(MTTokenType.IDENTIFIER):
-            node = MTNode(self.consume(MTTokenType.IDENTIFIER))
-            return node
-        elif self.match(MTTokenType.SEPARATOR, expected_value='('):
-            self.advance()
-            self.position, node = MTExpressionGrammar(self.tokens, self.program, self.position, ')').generateExpression()
-            self.advance()
-            return node
+                # the operand ends here, it is the right operand of what waits on top of the stack
+                if len(stack) == 0:
+                    return self.position, left
+                floor, node, rank = stack.pop()
+                if node == None:
+                    self.consume(MTTokenType.SEPARATOR, expected_value=')')
+                else:
+                    node.right = left
+                    left = node
 
-        if self.peek() != None:
-            MTCompilerMessage.syntaxError(self.program, self.peek(), self.peek().start_pos, 'expression token')
-    
     # Core Functions
     def match(self, expected_type: MTTokenType, expected_sub_type: MTTokenSubType = MTTokenSubType.NONE, expected_value: str = None) -> bool:
         if self.check(expected_type, expected_sub_type=expected_sub_type, expected_value=expected_value):
             return True
         return False
-    
+
     def consume(self, expected_type: MTTokenType, expected_sub_type: MTTokenSubType = MTTokenSubType.NONE, expected_value: str = None):
         if self.check(expected_type=expected_type, expected_sub_type=expected_sub_type, expected_value=expected_value):
             return self.advance()
-        MTCompilerMessage.syntaxError(self.program, self.peek(), self.position, expected='' if expected_value == None else expected_value)
-    
+        # at the end of the tokens the error is reported at the last one
+        token = self.peek() if self.peek() != None else self.previous()
+        MTCompilerMessage.syntaxError(self.program, token, token.start_pos, expected='' if expected_value == None else expected_value)
+
     def check(self, expected_type: MTTokenType, expected_sub_type: MTTokenSubType = MTTokenSubType.NONE, expected_value: str = None):
-        if self.is_at_end():
-            return False
-        return self.peek().type == expected_type and (expected_sub_type == MTTokenSubType.NONE or self.peek().sub_type == expected_sub_type) and (expected_value == None or self.tokens[self.position].value == expected_value)
-    
+        return self.tokens.check(self.position, expected_type, expected_sub_type, expected_value)
+
     def advance(self):
         if not self.is_at_end():
             self.position += 1
@@ -99,20 +123,11 @@ class MTExpressionGrammar:
 
     def previous(self):
         return self.tokens[self.position - 1]
-    
+
     def peek(self):
         if self.is_at_end():
             return None
         return self.tokens[self.position]
 
     def is_at_end(self) -> bool:
-        return self.position >= len(self.tokens)
-    
-    def expression_len(self) -> int:
-        temp_pos = self.position
-        while temp_pos < len(self.tokens):
-            if self.tokens[temp_pos].value == self.endChar:
-                break
-            else:
-                temp_pos += 1
-        return temp_pos - self.position
\ No newline at end of file
+        return not self.tokens.has(self.position)
@@ -1,18 +1,20 @@
 from lib.syntax.grammar.expression import *
 from lib.lexer.token_class import *
-from lib.message import MTCompilerMessage
+from lib.message import MTCompilerMessage, MTDiagnosticError
 from lib.syntax.grammar.expression import MTExpressionGrammar
 
 class MTStatementGrammar:
-    def __init__(self, tokens: list[MTToken], program: str, position: int, endChar: str = ';') -> None:
+    def __init__(self, tokens: list[MTToken], program: str, position: int, endChar: str = ';', diagnostics: list = None) -> None:
         self.tokens = tokens
         self.position = position
         self.program = program
         self.endChar = endChar
+        # errors of the statements of blocks skipped so far, None stops at the first one
+        self.diagnostics = diagnostics
     
     # entry point for the statement parsing
     def generateStatement(self) -> MTNode:
-        while self.tokens[self.position].value != self.endChar:
+        while not self.is_at_end() and self.tokens[self.position].value != self.endChar:
             
             if self.match(MTTokenType.KEYWORD, MTTokenSubType.DATA_TYPE_KEYWORDS):
                 node = self.parseDataType()
@@ -35,26 +37,31 @@ class MTStatementGrammar:
             else:
                 MTCompilerMessage.syntaxError(self.program, self.peek(), self.peek().start_pos)
 
-        if self.peek() != None:
-            MTCompilerMessage.syntaxError(self.program, self.peek(), self.peek().start_pos)
+        # at the end of the tokens the error is reported at the last one
+        token = self.peek() if self.peek() != None else self.previous()
+        MTCompilerMessage.syntaxError(self.program, token, token.start_pos)
     
     def parseDataType(self) -> MTNode:
         node = MTNode(self.consume(MTTokenType.KEYWORD, MTTokenSubType.DATA_TYPE_KEYWORDS))
-        id = self.parseIdentifier()
+        id = self.parseIdentifier(MTDeclare)
         id.left = node
         node = id
         return node
     
-    def parseIdentifier(self) -> MTNode:
-        node = MTNode(self.consume(MTTokenType.IDENTIFIER))
+    def parseIdentifier(self, statement: type = MTAssign) -> MTNode:
+        token = self.consume(MTTokenType.IDENTIFIER)
 
         if self.match(MTTokenType.OPERATOR, expected_value='='):
+            node = statement(token)
             self.advance()
             node.right = self.parseExpressions()
         elif self.match(MTTokenType.OPERATOR):
+            node = MTName(token)
             self.position, exp = MTExpressionGrammar(self.tokens, self.program, self.position - 1, self.endChar).generateExpression()
             exp.left = node
             node = exp
+        else:
+            node = statement(token)
 
         return node
     
@@ -63,7 +70,7 @@ class MTStatementGrammar:
         return node
     
     def parsePrint(self) -> MTNode:
-        node = MTNode(self.consume(MTTokenType.KEYWORD, expected_value='print'))
+        node = MTPrint(self.consume(MTTokenType.KEYWORD, expected_value='print'))
 
         self.consume(MTTokenType.SEPARATOR, expected_value='(')
         self.position, node.right = MTExpressionGrammar(self.tokens, self.program, self.position, ')').generateExpression()
@@ -71,6 +78,54 @@ class MTStatementGrammar:
 
         return node
     
+    # Blocks
+    def parseBlock(self, node: MTNode):
+        self.consume(MTTokenType.SEPARATOR, expected_value='{')
+        while not self.is_at_end() and not self.match(MTTokenType.SEPARATOR, expected_value='}'):
+            start = self.position
+            try:
+                self.position, statement = MTStatementGrammar(self.tokens, self.program, self.position, diagnostics=self.diagnostics).generateStatement()
+                if self.previous().value != '}':
+                    self.consume(MTTokenType.SEPARATOR, expected_value=';')
+                node.statements.append(statement)
+            except MTDiagnosticError as error:
+                if self.diagnostics == None:
+                    raise
+                # panic mode: the statement is left out and the next one parsed
+                self.diagnostics.extend(error.diagnostics)
+                self.position = self.synchronize(start, error.diagnostics[-1].position, True)
+        self.consume(MTTokenType.SEPARATOR, expected_value='}')
+
+    def synchronize(self, start: int, position: int, inBlock: bool) -> int:
+        # Position of the statement after the one starting at start that failed at the character position: after
+        # the first `;` outside of parentheses and blocks, or after the `}` closing the last block the statement
+        # opened. Inside a block it stops before the `}` closing that block, at the top level that `}` is skipped.
+        position = position if position != None else 0
+        depth = 0
+        parentheses = 0
+        index = start
+        while True:
+            if not self.tokens.has(index):
+                return index
+            token = self.tokens[index]
+            # braces opened before the error are still open
+            if token.type == MTTokenType.SEPARATOR:
+                if token.value == '{':
+                    depth += 1
+                elif token.value == '(':
+                    parentheses += 1
+                elif token.value == ')':
+                    parentheses = max(parentheses - 1, 0)
+                elif token.value == '}':
+                    if depth == 0:
+                        return index if inBlock else index + 1
+                    depth -= 1
+                    if depth == 0 and token.start_pos >= position:
+                        return index + 1
+                elif token.value == ';' and depth == 0 and parentheses == 0 and token.start_pos >= position:
+                    return index + 1
+            index += 1
+
     # For Conditional
     def parseConditionalStatement(self) -> MTNode:
         if self.match(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, 'if'):
@@ -82,24 +137,18 @@ class MTStatementGrammar:
     
     def parseConditionalIfElse(self) -> MTNode:
         if self.match(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, 'if'):
-            node = MTNode(self.consume(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, 'if'))
+            node = MTIf(self.consume(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, 'if'))
         elif self.match(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, 'elif'):
-            node = MTNode(self.consume(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, 'elif'))
+            node = MTIf(self.consume(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, 'elif'))
         else:
-            node = MTNode(self.consume(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, 'else'))
+            node = MTIf(self.consume(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, 'else'))
         
         if node.current.value == 'if' or node.current.value == 'elif':
             self.consume(MTTokenType.SEPARATOR, expected_value='(')
             self.position, node.left = MTExpressionGrammar(self.tokens, self.program, self.position, ')').generateExpression()
             self.consume(MTTokenType.SEPARATOR, expected_value=')')
         
-        self.consume(MTTokenType.SEPARATOR, expected_value='{')
-        while not self.match(MTTokenType.SEPARATOR, expected_value='}'):
-            self.position, statement = MTStatementGrammar(self.tokens, self.program, self.position).generateStatement()
-            if self.previous().value != '}':
-                self.consume(MTTokenType.SEPARATOR, expected_value=';')
-            node.statements.append(statement)
-        self.consume(MTTokenType.SEPARATOR, expected_value='}')
+        self.parseBlock(node)
 
         if self.match(MTTokenType.KEYWORD, expected_value='elif') or self.match(MTTokenType.KEYWORD, expected_value='else'):
             node.right = self.parseConditionalIfElse()
@@ -107,7 +156,7 @@ class MTStatementGrammar:
         return node
     
     def parseConditionalSwitch(self) -> MTNode:
-        node = MTNode(self.consume(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, 'switch'))
+        node = MTSwitch(self.consume(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, 'switch'))
 
         self.consume(MTTokenType.SEPARATOR, expected_value='(')
         self.position, node.left = MTExpressionGrammar(self.tokens, self.program, self.position, ')').generateExpression()
@@ -116,15 +165,18 @@ class MTStatementGrammar:
         self.consume(MTTokenType.SEPARATOR, expected_value='{')
 
         while self.match(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, expected_value='case'):
-            caseStatement = MTNode(self.consume(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, expected_value='case'))
+            caseStatement = MTCase(self.consume(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, expected_value='case'))
 
             if self.match(MTTokenType.VALUE):
-                caseStatement.left = MTNode(self.consume(MTTokenType.VALUE))
+                caseStatement.left = MTLiteral(self.consume(MTTokenType.VALUE))
             elif self.match(MTTokenType.IDENTIFIER):
-                caseStatement.left = MTNode(self.consume(MTTokenType.IDENTIFIER))
+                caseStatement.left = MTName(self.consume(MTTokenType.IDENTIFIER))
+            else:
+                token = self.peek() if self.peek() != None else self.previous()
+                MTCompilerMessage.syntaxError(self.program, token, token.start_pos, 'expression token')
 
             self.consume(MTTokenType.CONDITIONAL_OPERATOR, expected_value=':')
-            self.position, caseStatement.right = MTStatementGrammar(self.tokens, self.program, self.position).generateStatement()
+            self.position, caseStatement.right = MTStatementGrammar(self.tokens, self.program, self.position, diagnostics=self.diagnostics).generateStatement()
             self.consume(MTTokenType.SEPARATOR, expected_value=';')
             
             if self.match(MTTokenType.KEYWORD, expected_value='break'):
@@ -135,9 +187,9 @@ class MTStatementGrammar:
         
         # for default statement
         if self.match(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, expected_value='default'):
-            defaultStatement = MTNode(self.consume(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, expected_value='default'))
+            defaultStatement = MTCase(self.consume(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS, expected_value='default'))
             self.consume(MTTokenType.CONDITIONAL_OPERATOR, expected_value=':')
-            self.position, defaultStatement.right = MTStatementGrammar(self.tokens, self.program, self.position).generateStatement()
+            self.position, defaultStatement.right = MTStatementGrammar(self.tokens, self.program, self.position, diagnostics=self.diagnostics).generateStatement()
             self.consume(MTTokenType.SEPARATOR, expected_value=';')
             node.statements.append(defaultStatement)
         
@@ -157,8 +209,8 @@ class MTStatementGrammar:
             MTCompilerMessage.syntaxError(self.program, self.peek(), self.peek().start_pos)
 
     def parseForLoop(self):
-        node = MTNode(self.consume(MTTokenType.KEYWORD, MTTokenSubType.LOOPS_KEYWORDS, 'for'))
-        logic = MTNode(MTToken(MTTokenType.LOOP_LOGIC, '', 0, 0))
+        node = MTFor(self.consume(MTTokenType.KEYWORD, MTTokenSubType.LOOPS_KEYWORDS, 'for'))
+        logic = MTLoopLogic(MTToken(MTTokenType.LOOP_LOGIC, '', 0, 0))
 
         self.consume(MTTokenType.SEPARATOR, expected_value='(')
         # self.parseDataType()
@@ -175,18 +227,12 @@ class MTStatementGrammar:
         # print(node)
         # exit(1)
         
-        self.consume(MTTokenType.SEPARATOR, expected_value='{')
-        while not self.match(MTTokenType.SEPARATOR, expected_value='}'):
-            self.position, statement = MTStatementGrammar(self.tokens, self.program, self.position).generateStatement()
-            if self.previous().value != '}':
-                self.consume(MTTokenType.SEPARATOR, expected_value=';')
-            node.statements.append(statement)
-        self.consume(MTTokenType.SEPARATOR, expected_value='}')
+        self.parseBlock(node)
 
         return node
     
     def parseWhileLoop(self, fromDoWhile = False) -> MTNode:
-        node = MTNode(self.consume(MTTokenType.KEYWORD, MTTokenSubType.LOOPS_KEYWORDS, expected_value='while'))
+        node = MTWhile(self.consume(MTTokenType.KEYWORD, MTTokenSubType.LOOPS_KEYWORDS, expected_value='while'))
 
         self.consume(MTTokenType.SEPARATOR, expected_value='(')
         self.position, node.left = MTExpressionGrammar(self.tokens, self.program, self.position, ')').generateExpression()
@@ -195,26 +241,14 @@ class MTStatementGrammar:
         if fromDoWhile:
             self.consume(MTTokenType.SEPARATOR, expected_value=';')
         else:
-            self.consume(MTTokenType.SEPARATOR, expected_value='{')
-            while not self.match(MTTokenType.SEPARATOR, expected_value='}'):
-                self.position, statement = MTStatementGrammar(self.tokens, self.program, self.position).generateStatement()
-                if self.previous().value != '}':
-                    self.consume(MTTokenType.SEPARATOR, expected_value=';')
-                node.statements.append(statement)
-            self.consume(MTTokenType.SEPARATOR, expected_value='}')
+            self.parseBlock(node)
 
         return node
     
     def parseDoWhileLoop(self) -> MTNode:
-        node = MTNode(self.consume(MTTokenType.KEYWORD, MTTokenSubType.LOOPS_KEYWORDS, expected_value='do'))
+        node = MTDoWhile(self.consume(MTTokenType.KEYWORD, MTTokenSubType.LOOPS_KEYWORDS, expected_value='do'))
 
-        self.consume(MTTokenType.SEPARATOR, expected_value='{')
-        while not self.match(MTTokenType.SEPARATOR, expected_value='}'):
-            self.position, statement = MTStatementGrammar(self.tokens, self.program, self.position).generateStatement()
-            if self.previous().value != '}':
-                self.consume(MTTokenType.SEPARATOR, expected_value=';')
-            node.statements.append(statement)
-        self.consume(MTTokenType.SEPARATOR, expected_value='}')
+        self.parseBlock(node)
 
         node.left = self.parseWhileLoop(True)
 
@@ -229,7 +263,9 @@ class MTStatementGrammar:
     def consume(self, expected_type: MTTokenType, expected_sub_type: MTTokenSubType = MTTokenSubType.NONE, expected_value: str = None):
         if self.check(expected_type=expected_type, expected_sub_type=expected_sub_type, expected_value=expected_value):
             return self.advance()
-        MTCompilerMessage.syntaxError(self.program, self.peek(), self.peek().start_pos, expected='' if expected_value == None else expected_value)
+        # at the end of the tokens the error is reported at the last one
+        token = self.peek() if self.peek() != None else self.previous()
+        MTCompilerMessage.syntaxError(self.program, token, token.start_pos, expected='' if expected_value == None else expected_value)
     
     def expect(self, expected_type: MTTokenType, expected_sub_type: MTTokenSubType = MTTokenSubType.NONE, expected_value: str = None):
         if self.check(expected_type=expected_type, expected_sub_type=expected_sub_type, expected_value=expected_value):
@@ -237,9 +273,7 @@ class MTStatementGrammar:
         MTCompilerMessage.syntaxError(self.program, self.peek(), self.peek().start_pos, expected='' if expected_value == None else expected_value)
     
     def check(self, expected_type: MTTokenType, expected_sub_type: MTTokenSubType = MTTokenSubType.NONE, expected_value: str = None):
-        if self.is_at_end():
-            return False
-        return self.peek().type == expected_type and (expected_sub_type == MTTokenSubType.NONE or self.peek().sub_type == expected_sub_type) and (expected_value == None or self.tokens[self.position].value == expected_value)
+        return self.tokens.check(self.position, expected_type, expected_sub_type, expected_value)
     
     def advance(self):
         if not self.is_at_end():
@@ -255,4 +289,4 @@ class MTStatementGrammar:
         return self.tokens[self.position]
 
     def is_at_end(self) -> bool:
-        return self.position >= len(self.tokens)
\ No newline at end of file
+        return not self.tokens.has(self.position)
\ No newline at end of file
@@ -1,52 +1,76 @@
+from typing import Iterable, Iterator
+
 from lib.lexer.token_class import *
 from lib.syntax.grammar.statement import *
-from lib.message import MTCompilerMessage
+from lib.syntax.token_stream import MTTokenStream
+from lib.lexer.token_buffer import MTTokenBuffer
+from lib.message import MTCompilerMessage, MTDiagnosticError
 
 class MTSyntaxAnalyzer:
-    def __init__(self, tokens: list[MTToken], program: str) -> None:
-        self.tokens = tokens
+    def __init__(self, tokens: Iterable[MTToken], program: str) -> None:
+        # tokens can be a list, an MTTokenBuffer or any iterator, e.g. MTLexerAnalyzer.tokenizeStream()
+        self.tokens = tokens if isinstance(tokens, (MTTokenStream, MTTokenBuffer)) else MTTokenStream(tokens)
         self.position = 0
         self.program = program
         self.statements: list[MTNode] = []
+        # errors of the statements left out, raised together once every statement is parsed
+        self.diagnostics: list = []
     
     def analyze(self) -> list[MTNode]:
-        while self.position < len(self.tokens):
-
-            if self.match(MTTokenType.KEYWORD, MTTokenSubType.DATA_TYPE_KEYWORDS):
-                self.statements.append(self.parseDataType())
-            elif self.match(MTTokenType.KEYWORD, expected_value='print'):
-                self.statements.append(self.parsePrint())
-            elif self.match(MTTokenType.IDENTIFIER):
-                self.statements.append(self.parseIdentifier())
-            elif self.match(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS):
-                self.statements.append(self.parseConditional())
-            elif self.match(MTTokenType.KEYWORD, MTTokenSubType.LOOPS_KEYWORDS):
-                self.statements.append(self.parseLoop())
-            else:
-                MTCompilerMessage.syntaxError(self.program, self.peek(), self.peek().start_pos)
-        
+        self.statements.extend(self.analyzeStream())
         return self.statements
     
+    # yields every top level statement as soon as it is parsed
+    def analyzeStream(self) -> Iterator[MTNode]:
+        while not self.is_at_end():
+            start = self.position
+            try:
+                if self.match(MTTokenType.KEYWORD, MTTokenSubType.DATA_TYPE_KEYWORDS):
+                    node = self.parseDataType()
+                elif self.match(MTTokenType.KEYWORD, expected_value='print'):
+                    node = self.parsePrint()
+                elif self.match(MTTokenType.IDENTIFIER):
+                    node = self.parseIdentifier()
+                elif self.match(MTTokenType.KEYWORD, MTTokenSubType.CONDITIONAL_KEYWORDS):
+                    node = self.parseConditional()
+                elif self.match(MTTokenType.KEYWORD, MTTokenSubType.LOOPS_KEYWORDS):
+                    node = self.parseLoop()
+                else:
+                    MTCompilerMessage.syntaxError(self.program, self.peek(), self.peek().start_pos)
+            except MTDiagnosticError as error:
+                # panic mode: the statement is left out and the next one parsed
+                self.diagnostics.extend(error.diagnostics)
+                self.position = MTStatementGrammar(self.tokens, self.program, start).synchronize(start, error.diagnostics[-1].position, False)
+                node = None
+            
+            # only the last consumed token can still be looked at
+            self.tokens.release(self.position - 1)
+            if node != None:
+                yield node
+
+        if len(self.diagnostics) > 0:
+            raise MTDiagnosticError(self.diagnostics)
+    
     def parseDataType(self) -> MTNode:
-        self.position, node = MTStatementGrammar(self.tokens, self.program, self.position).generateStatement()
+        self.position, node = MTStatementGrammar(self.tokens, self.program, self.position, diagnostics=self.diagnostics).generateStatement()
         self.consume(MTTokenType.SEPARATOR, expected_value=';')
         return node
     
     def parseIdentifier(self) -> MTNode:
-        self.position, node = MTStatementGrammar(self.tokens, self.program, self.position).generateStatement()
+        self.position, node = MTStatementGrammar(self.tokens, self.program, self.position, diagnostics=self.diagnostics).generateStatement()
         self.consume(MTTokenType.SEPARATOR, expected_value=';')
         return node
     
     def parseConditional(self) -> MTNode:
-        self.position, node = MTStatementGrammar(self.tokens, self.program, self.position).generateStatement()
+        self.position, node = MTStatementGrammar(self.tokens, self.program, self.position, diagnostics=self.diagnostics).generateStatement()
         return node
     
     def parseLoop(self) -> MTNode:
-        self.position, node = MTStatementGrammar(self.tokens, self.program, self.position).generateStatement()
+        self.position, node = MTStatementGrammar(self.tokens, self.program, self.position, diagnostics=self.diagnostics).generateStatement()
         return node
     
     def parsePrint(self) -> MTNode:
-        self.position, node = MTStatementGrammar(self.tokens, self.program, self.position).generateStatement()
+        self.position, node = MTStatementGrammar(self.tokens, self.program, self.position, diagnostics=self.diagnostics).generateStatement()
         self.consume(MTTokenType.SEPARATOR, expected_value=';')
         return node
     
@@ -66,9 +90,7 @@ class MTSyntaxAnalyzer:
             MTCompilerMessage.syntaxError(self.program, self.previous(), self.previous().start_pos, expected='' if expected_value == None else expected_value)
     
     def check(self, expected_type: MTTokenType, expected_sub_type: MTTokenSubType = MTTokenSubType.NONE, expected_value: str = None):
-        if self.is_at_end():
-            return False
-        return self.peek().type == expected_type and (expected_sub_type == MTTokenSubType.NONE or self.peek().sub_type == expected_sub_type) and (expected_value == None or self.tokens[self.position].value == expected_value)
+        return self.tokens.check(self.position, expected_type, expected_sub_type, expected_value)
     
     def advance(self):
         if not self.is_at_end():
@@ -84,4 +106,4 @@ class MTSyntaxAnalyzer:
         return self.tokens[self.position]
 
     def is_at_end(self) -> bool:
-        return self.position >= len(self.tokens)
\ No newline at end of file
+        return not self.tokens.has(self.position)
\ No newline at end of file
@@ -0,0 +1,59 @@
+from typing import Iterable
+
+from lib.lexer.token_class import *
+
+class MTTokenStream:
+    # Tokens addressed by their absolute position, read lazily from the lexer.
+    # Only the window between the last released position and the furthest lookahead is kept in memory.
+    def __init__(self, tokens: Iterable[MTToken]) -> None:
+        if isinstance(tokens, list):
+            # already materialized, nothing to read or release
+            self.__window: list[MTToken] = tokens
+            self.__source = None
+        else:
+            self.__window: list[MTToken] = []
+            self.__source = iter(tokens)
+        # absolute position of the first token in the window
+        self.__offset = 0
+
+    def __getitem__(self, position: int) -> MTToken:
+        index = position - self.__offset
+        if index < 0:
+            raise IndexError(f'Token {position} was already released')
+        if index >= len(self.__window) and not self.__read(index):
+            raise IndexError('Token position out of range')
+        return self.__window[index]
+
+    def has(self, position: int) -> bool:
+        index = position - self.__offset
+        return 0 <= index < len(self.__window) or (index >= 0 and self.__read(index))
+
+    def check(self, position: int, expected_type: MTTokenType, expected_sub_type: MTTokenSubType = MTTokenSubType.NONE, expected_value: str = None) -> bool:
+        index = position - self.__offset
+        if index < 0 or (index >= len(self.__window) and not self.__read(index)):
+            return False
+        token = self.__window[index]
+        return token.type == expected_type and (expected_sub_type == MTTokenSubType.NONE or token.sub_type == expected_sub_type) and (expected_value == None or token.value == expected_value)
+
+    def release(self, position: int):
+        # forget every token before position, they can't be looked at anymore
+        if self.__source == None:
+            return
+        count = position - self.__offset
+        if count > 0:
+            del self.__window[:count]
+            self.__offset = position
+
+    def window_size(self) -> int:
+        return len(self.__window)
+
+    def __read(self, index: int) -> bool:
+        # reads from the lexer until the window reaches index
+        if self.__source == None:
+            return False
+        for token in self.__source:
+            self.__window.append(token)
+            if index < len(self.__window):
+                return True
+        self.__source = None
+        return False
@@ -0,0 +1,84 @@
+from enum import IntEnum, auto
+
+class MTOpcode(IntEnum):
+    # stack
+    CONST = auto()
+    LOAD = auto()
+    STORE = auto()
+    POP = auto()
+    DUP = auto()
+    PARSE = auto()
+
+    # variables
+    DECLARE = auto()
+    INCREMENT = auto()
+    DECREMENT = auto()
+    INCREMENT_VARIABLE = auto()
+    DECREMENT_VARIABLE = auto()
+    BIND_LOOP = auto()
+    UNBIND_LOOP = auto()
+    RESTORE_LOOP = auto()
+    ENTER_BLOCK = auto()
+    RESTORE_BLOCK = auto()
+    EXIT_BLOCK = auto()
+
+    # arithmetic, comparison and logical operators
+    ADD = auto()
+    SUB = auto()
+    MUL = auto()
+    DIV = auto()
+    LT = auto()
+    GT = auto()
+    EQ = auto()
+    LE = auto()
+    GE = auto()
+    AND = auto()
+    OR = auto()
+    SELECT = auto()
+
+    # control flow
+    JUMP = auto()
+    JUMP_IF_FALSE = auto()
+    JUMP_UNLESS_TRUE = auto()
+    JUMP_IF_TRUE = auto()
+    CHECK_BOOL = auto()
+
+    # other
+    PRINT = auto()
+    ERROR = auto()
+
+class MTBytecode:
+    def __init__(self) -> None:
+        # (opcode, argument) pairs
+        self.instructions: list[tuple[MTOpcode, object]] = []
+
+    def emit(self, opcode: MTOpcode, argument: object = None) -> int:
+        self.instructions.append((opcode, argument))
+        return len(self.instructions) - 1
+
+    def patch(self, position: int, target: int):
+        # points the jump at position to target
+        self.instructions[position] = (self.instructions[position][0], target)
+
+    def position(self) -> int:
+        return len(self.instructions)
+
+    def __len__(self) -> int:
+        return len(self.instructions)
+
+    def __repr__(self) -> str:
+        lines = []
+        for position, (opcode, argument) in enumerate(self.instructions):
+            lines.append(f'{position:>6} {opcode.name:<17} {self.describe(argument)}')
+        return '\n'.join(lines)
+
+    @staticmethod
+    def describe(argument: object) -> str:
+        if argument == None:
+            return ''
+        if isinstance(argument, tuple):
+            # tokens are only carried for error messages, their value is enough to read the listing
+            return ' '.join(MTBytecode.describe(item) for item in argument)
+        if hasattr(argument, 'start_pos'):
+            return repr(argument.value)
+        return repr(argument)
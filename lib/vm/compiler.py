@@ -0,0 +1,323 @@
+from lib.syntax.data import *
+from lib.lexer.token_class import *
+from lib.semantic.scope import MTScopeAnalysis
+from lib.vm.bytecode import *
+
+class MTBytecodeCompiler:
+    # Translates the checked AST into MTBytecode for MTVirtualMachine.
+    # Every error MTInterpreter reports while running is compiled into an ERROR instruction at the same place,
+    # so the program still runs up to the point where the tree walker would have stopped.
+    binaryOperators = {
+        '+': MTOpcode.ADD,
+        '-': MTOpcode.SUB,
+        '*': MTOpcode.MUL,
+        '/': MTOpcode.DIV,
+    }
+    conditionalOperators = {
+        '<': MTOpcode.LT,
+        '>': MTOpcode.GT,
+        '==': MTOpcode.EQ,
+        '<=': MTOpcode.LE,
+        '>=': MTOpcode.GE,
+    }
+    logicalOperators = {
+        '&&': MTOpcode.AND,
+        '||': MTOpcode.OR,
+    }
+
+    def __init__(self, nodes: list[MTNode], program: str, symbols: set[str] = set(), values: set[str] = set()) -> None:
+        self.nodes = nodes
+        self.program = program
+        self.code = MTBytecode()
+        self.scopes = MTScopeAnalysis(nodes, values)
+        # declared variables are known statically, just like the ones having a value
+        self.symbols: set[str] = set(symbols)
+        # number of blocks around the statement being compiled
+        self.depth = 0
+        # set while compiling a for loop initializer, which MTInterpreter runs in an empty environment
+        self.isolated = False
+        # for every open block, how many for loops inside it shadowed a binding that has to come back when it ends
+        self.loops: list[int] = []
+
+    def compile(self) -> MTBytecode:
+        self.scopes.analyze()
+        for node in self.nodes:
+            self.compileStatement(node)
+        return self.code
+
+    # Statements
+    def compileStatement(self, node: MTNode):
+        token = node.current
+        if token.type == MTTokenType.IDENTIFIER:
+            self.compileIdentifier(node)
+        elif token.type == MTTokenType.KEYWORD:
+            self.compileKeyword(node)
+        elif token.type == MTTokenType.OPERATOR and (token.value == '++' or token.value == '--') and node.left != None and node.left.current.type == MTTokenType.IDENTIFIER:
+            # the old value is not needed, so the variable is updated in place
+            self.code.emit(MTOpcode.INCREMENT_VARIABLE if token.value == '++' else MTOpcode.DECREMENT_VARIABLE, node.left.current.value)
+        elif token.type == MTTokenType.OPERATOR or token.type == MTTokenType.CONDITIONAL_OPERATOR or token.type == MTTokenType.LOGICAL_OPERATOR:
+            self.compileExpression(node)
+            self.code.emit(MTOpcode.POP)
+        else:
+            self.error(token, f'Unexpected Node: {token.value}')
+
+    def compileBlock(self, owner: MTNode, nodes: list[MTNode]):
+        scope = self.scopes.block(owner)
+        if len(scope.restored) > 0:
+            self.code.emit(MTOpcode.ENTER_BLOCK, scope.restored)
+        symbols = self.symbols
+        self.symbols = set(symbols)
+        self.depth += 1
+        self.loops.append(0)
+        for node in nodes:
+            self.compileStatement(node)
+        loops = self.loops.pop()
+        self.depth -= 1
+        self.symbols = symbols
+
+        if loops > 0:
+            self.code.emit(MTOpcode.RESTORE_LOOP, loops)
+        if len(scope.restored) > 0:
+            self.code.emit(MTOpcode.RESTORE_BLOCK, scope.restored)
+        if not scope.is_empty():
+            self.code.emit(MTOpcode.EXIT_BLOCK, (scope.symbols, scope.values))
+
+    def compileKeyword(self, node: MTNode):
+        value = node.current.value
+        if value == 'print':
+            self.compileExpression(node.right)
+            self.code.emit(MTOpcode.PRINT)
+        elif value == 'pass':
+            pass
+        elif node.current.sub_type == MTTokenSubType.CONDITIONAL_KEYWORDS:
+            if value == 'if':
+                self.compileIfElse(node)
+            elif value == 'switch':
+                self.compileSwitch(node)
+            else:
+                self.error(node.current, f'Unexpected Node: {value}')
+        elif node.current.sub_type == MTTokenSubType.LOOPS_KEYWORDS:
+            if value == 'for':
+                self.compileForLoop(node)
+            elif value == 'while':
+                self.compileWhileLoop(node)
+            elif value == 'do':
+                self.compileDoWhileLoop(node)
+            else:
+                self.error(node.current, f'Unexpected Node: {value}')
+        else:
+            self.error(node.current, f'Unexpected Node: {value}')
+
+    def compileIdentifier(self, node: MTNode):
+        name = node.current.value
+        if node.left != None and name not in self.symbols:
+            self.symbols.add(name)
+            self.code.emit(MTOpcode.DECLARE, (name, node.left.current.value))
+        elif node.left != None or name not in self.symbols:
+            self.error(node.current, f'Undefined variable: `{name}`')
+            return
+
+        if node.right != None:
+            self.compileExpression(node.right)
+            self.code.emit(MTOpcode.STORE, name)
+
+    # Conditional
+    def compileIfElse(self, node: MTNode):
+        ends = []
+        branch = node
+        while branch != None:
+            value = branch.current.value
+            if (value == 'if' or value == 'elif') and branch.left != None:
+                self.compileExpression(branch.left)
+                if not self.isBoolean(branch.left):
+                    self.code.emit(MTOpcode.CHECK_BOOL, (branch.current, 'Expression should be type of `bool`'))
+                skip = self.code.emit(MTOpcode.JUMP_IF_FALSE)
+                self.compileBlock(branch, branch.statements)
+                ends.append(self.code.emit(MTOpcode.JUMP))
+                self.code.patch(skip, self.code.position())
+            elif value == 'else':
+                self.compileBlock(branch, branch.statements)
+                break
+            else:
+                self.error(branch.current, 'Error while evaluating expression')
+                break
+            branch = branch.right
+
+        for end in ends:
+            self.code.patch(end, self.code.position())
+
+    def compileSwitch(self, node: MTNode):
+        # the switch value stays on the stack while the cases are compared with it
+        self.compileExpression(node.left)
+        ends = []
+        for statement in node.statements:
+            if statement.current.value == 'case':
+                self.code.emit(MTOpcode.DUP)
+                self.compileExpression(statement.left)
+                self.code.emit(MTOpcode.EQ)
+                skip = self.code.emit(MTOpcode.JUMP_IF_FALSE)
+                self.code.emit(MTOpcode.POP)
+                self.compileBlock(statement, [statement.right])
+                ends.append(self.code.emit(MTOpcode.JUMP))
+                self.code.patch(skip, self.code.position())
+            elif statement.current.value == 'default':
+                self.code.emit(MTOpcode.POP)
+                self.compileBlock(statement, [statement.right])
+                ends.append(self.code.emit(MTOpcode.JUMP))
+                break
+            else:
+                self.error(node.current, 'Invalid case')
+                break
+        else:
+            self.code.emit(MTOpcode.POP)
+
+        for end in ends:
+            self.code.patch(end, self.code.position())
+
+    # Loops
+    def compileForLoop(self, node: MTNode):
+        if node.left == None or len(node.left.statements) != 3 or node.left.statements[0].current.type != MTTokenType.IDENTIFIER or node.left.statements[0].left == None:
+            self.error(node.current, 'Error while evaluating statement')
+            return
+
+        init, condition, increment = node.left.statements
+        # the loop variable is created on its own, like MTInterpreter does with a fresh interpreter
+        name = init.current.value
+        nested = self.depth > 0
+        if nested:
+            self.loops[-1] += 1
+        if init.right != None:
+            self.isolated = True
+            self.compileExpression(init.right)
+            self.isolated = False
+        self.code.emit(MTOpcode.BIND_LOOP, (name, init.left.current.value, init.right != None, nested))
+        self.symbols.add(name)
+
+        start = self.code.position()
+        self.compileExpression(condition)
+        leave = self.code.emit(MTOpcode.JUMP_UNLESS_TRUE)
+        self.compileBlock(node, node.statements)
+        if increment.current.type == MTTokenType.OPERATOR and (increment.current.value == '++' or increment.current.value == '--'):
+            self.compileStatement(increment)
+        else:
+            # evaluated as an expression, like MTInterpreter does, so `i = i + 1` only reads i
+            self.compileExpression(increment)
+            self.code.emit(MTOpcode.POP)
+        self.code.emit(MTOpcode.JUMP, start)
+        self.code.patch(leave, self.code.position())
+
+        # the loop variable is deleted, an outer one it hid has no value until the enclosing block ends and puts it back
+        self.code.emit(MTOpcode.UNBIND_LOOP, (name, init.right != None, nested))
+        self.symbols.discard(name)
+
+    def compileWhileLoop(self, node: MTNode):
+        if node.left == None:
+            self.error(node.current, 'Error while evaluating statement')
+            return
+
+        start = self.code.position()
+        self.compileExpression(node.left)
+        leave = self.code.emit(MTOpcode.JUMP_UNLESS_TRUE)
+        self.compileBlock(node, node.statements)
+        self.code.emit(MTOpcode.JUMP, start)
+        self.code.patch(leave, self.code.position())
+
+    def compileDoWhileLoop(self, node: MTNode):
+        start = self.code.position()
+        self.compileBlock(node, node.statements)
+        self.compileExpression(node.left.left)
+        self.code.emit(MTOpcode.JUMP_IF_TRUE, start)
+
+    # Expression
+    def compileExpression(self, node: MTNode):
+        # Nodes left to compile, and the instructions of operators waiting for their operands to be compiled, on
+        # an explicit stack so deep expressions don't recurse. Operands are compiled from left to right.
+        stack = [node]
+        while len(stack) > 0:
+            node = stack.pop()
+            if type(node) is tuple:
+                self.code.emit(*node)
+                continue
+            if node == None:
+                self.code.emit(MTOpcode.ERROR, (None, 'Error while evaluating expression'))
+                continue
+
+            token = node.current
+            if token.type == MTTokenType.IDENTIFIER:
+                if self.isolated:
+                    self.code.emit(MTOpcode.CONST, None)
+                else:
+                    self.code.emit(MTOpcode.LOAD, token.value)
+            elif token.type == MTTokenType.VALUE:
+                self.compileValue(token)
+            elif token.type == MTTokenType.OPERATOR:
+                if token.value == '++' or token.value == '--':
+                    stack.append((MTOpcode.INCREMENT if token.value == '++' else MTOpcode.DECREMENT, node.left.current.value))
+                    stack.append(node.left)
+                    continue
+
+                if token.value in self.binaryOperators:
+                    stack.append((self.binaryOperators[token.value], None))
+                else:
+                    stack.append((MTOpcode.ERROR, (token, 'Arithmentic operation not supported')))
+                stack.append(node.right)
+                stack.append(node.left)
+            elif token.type == MTTokenType.CONDITIONAL_OPERATOR:
+                if token.value == '?' and node.left != None:
+                    if node.right == None:
+                        stack.append((MTOpcode.ERROR, (token, 'Error while evaluating expression')))
+                    else:
+                        # both sides are evaluated before one is picked
+                        stack.append((MTOpcode.SELECT, None))
+                        stack.append(node.right.right)
+                        stack.append(node.right.left)
+                    if not self.isBoolean(node.left):
+                        stack.append((MTOpcode.CHECK_BOOL, (token, 'Error while evaluating expression')))
+                    stack.append(node.left)
+                    continue
+
+                if token.value in self.conditionalOperators:
+                    stack.append((self.conditionalOperators[token.value], None))
+                else:
+                    stack.append((MTOpcode.ERROR, (token, 'Conditional operation not supported')))
+                stack.append(node.right)
+                stack.append(node.left)
+            elif token.type == MTTokenType.LOGICAL_OPERATOR:
+                if token.value in self.logicalOperators:
+                    stack.append((self.logicalOperators[token.value], None))
+                else:
+                    stack.append((MTOpcode.ERROR, (token, 'Conditional operation not supported')))
+                stack.append(node.right)
+                stack.append(node.left)
+            else:
+                self.error(token, 'Error while evaluating expression')
+
+    # comparisons either give a bool or fail while evaluating, so their result needs no check
+    def isBoolean(self, node: MTNode) -> bool:
+        token = node.current
+        if token.type == MTTokenType.CONDITIONAL_OPERATOR:
+            return token.value in self.conditionalOperators
+        return token.type == MTTokenType.VALUE and token.sub_type == MTTokenSubType.BOOLEAN_VALUE
+
+    def compileValue(self, token: MTToken):
+        if token.sub_type == MTTokenSubType.NUMBER_VALUE:
+            convert = int
+        elif token.sub_type == MTTokenSubType.STRING_VALUE:
+            convert = str
+        elif token.sub_type == MTTokenSubType.BOOLEAN_VALUE:
+            self.code.emit(MTOpcode.CONST, token.value == 'true')
+            return
+        elif token.sub_type == MTTokenSubType.DOUBLE_VALUE:
+            convert = float
+        else:
+            self.error(token, 'Value type is not supported')
+            return
+
+        try:
+            self.code.emit(MTOpcode.CONST, convert(token.value))
+        except ValueError:
+            # keep the failure at run time, where the tree walker would raise it
+            self.code.emit(MTOpcode.PARSE, (convert, token.value))
+
+    def error(self, token: MTToken, message: str):
+        self.code.emit(MTOpcode.ERROR, (token, message))
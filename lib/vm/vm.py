@@ -0,0 +1,183 @@
+from lib.vm.bytecode import *
+from lib.message import *
+from lib.interpreter.output import MTBufferedOutput
+
+class MTVirtualMachine:
+    # Stack machine running MTBytecode on one flat symbol tree and value tree.
+    def __init__(self, code: MTBytecode, program: str, symbolTree: dict = {}, valueTree: dict = {}, output = None) -> None:
+        self.code = code
+        self.program = program
+        # what print writes to, anything with write(text) and flush() like MTInterpreter's
+        self.output = output if output != None else MTBufferedOutput()
+        self.__symbolTree = {}
+        self.__valueTree = {}
+        self.__symbolTree.update(symbolTree)
+        self.__valueTree.update(valueTree)
+
+    def interpret(self):
+        try:
+            self.run()
+        finally:
+            self.output.flush()
+        return {
+            'symbol_tree': self.__symbolTree,
+            'value_tree': self.__valueTree,
+        }
+
+    def run(self):
+        instructions = self.code.instructions
+        symbols = self.__symbolTree
+        values = self.__valueTree
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        # bindings hidden by loop variables of for loops inside blocks, restored when the block ends
+        hidden = []
+        # values on entry of the variables blocks put back when they end
+        kept = []
+
+        CONST, LOAD, STORE, POP, DUP, PARSE = MTOpcode.CONST, MTOpcode.LOAD, MTOpcode.STORE, MTOpcode.POP, MTOpcode.DUP, MTOpcode.PARSE
+        DECLARE, INCREMENT, DECREMENT = MTOpcode.DECLARE, MTOpcode.INCREMENT, MTOpcode.DECREMENT
+        INCREMENT_VARIABLE, DECREMENT_VARIABLE = MTOpcode.INCREMENT_VARIABLE, MTOpcode.DECREMENT_VARIABLE
+        BIND_LOOP, UNBIND_LOOP, RESTORE_LOOP, EXIT_BLOCK = MTOpcode.BIND_LOOP, MTOpcode.UNBIND_LOOP, MTOpcode.RESTORE_LOOP, MTOpcode.EXIT_BLOCK
+        ENTER_BLOCK, RESTORE_BLOCK = MTOpcode.ENTER_BLOCK, MTOpcode.RESTORE_BLOCK
+        ADD, SUB, MUL, DIV = MTOpcode.ADD, MTOpcode.SUB, MTOpcode.MUL, MTOpcode.DIV
+        LT, GT, EQ, LE, GE, AND, OR, SELECT = MTOpcode.LT, MTOpcode.GT, MTOpcode.EQ, MTOpcode.LE, MTOpcode.GE, MTOpcode.AND, MTOpcode.OR, MTOpcode.SELECT
+        JUMP, JUMP_IF_FALSE, JUMP_UNLESS_TRUE, JUMP_IF_TRUE, CHECK_BOOL = MTOpcode.JUMP, MTOpcode.JUMP_IF_FALSE, MTOpcode.JUMP_UNLESS_TRUE, MTOpcode.JUMP_IF_TRUE, MTOpcode.CHECK_BOOL
+        PRINT, ERROR = MTOpcode.PRINT, MTOpcode.ERROR
+
+        position = 0
+        end = len(instructions)
+        while position < end:
+            opcode, argument = instructions[position]
+            position += 1
+
+            # most frequent instructions first
+            if opcode is LOAD:
+                push(values.get(argument))
+            elif opcode is CONST:
+                push(argument)
+            elif opcode is STORE:
+                values[argument] = pop()
+            elif opcode is JUMP_UNLESS_TRUE:
+                value = pop()
+                if not (type(value) is bool and value):
+                    position = argument
+            elif opcode is JUMP:
+                position = argument
+            elif opcode is ADD:
+                right = pop()
+                stack[-1] = stack[-1] + right
+            elif opcode is SUB:
+                right = pop()
+                stack[-1] = stack[-1] - right
+            elif opcode is MUL:
+                right = pop()
+                stack[-1] = stack[-1] * right
+            elif opcode is DIV:
+                right = pop()
+                stack[-1] = stack[-1] / right
+            elif opcode is LT:
+                right = pop()
+                stack[-1] = stack[-1] < right
+            elif opcode is GT:
+                right = pop()
+                stack[-1] = stack[-1] > right
+            elif opcode is EQ:
+                right = pop()
+                stack[-1] = stack[-1] == right
+            elif opcode is LE:
+                right = pop()
+                stack[-1] = stack[-1] <= right
+            elif opcode is GE:
+                right = pop()
+                stack[-1] = stack[-1] >= right
+            elif opcode is INCREMENT_VARIABLE:
+                values[argument] = values.get(argument) + 1
+            elif opcode is DECREMENT_VARIABLE:
+                values[argument] = values.get(argument) - 1
+            elif opcode is INCREMENT:
+                values[argument] = stack[-1] + 1
+            elif opcode is DECREMENT:
+                values[argument] = stack[-1] - 1
+            elif opcode is POP:
+                pop()
+            elif opcode is EXIT_BLOCK:
+                for name in argument[0]:
+                    symbols.pop(name, None)
+                for name in argument[1]:
+                    values.pop(name, None)
+            elif opcode is JUMP_IF_FALSE:
+                if not pop():
+                    position = argument
+            elif opcode is JUMP_IF_TRUE:
+                value = pop()
+                if type(value) is bool and value:
+                    position = argument
+            elif opcode is CHECK_BOOL:
+                if type(stack[-1]) is not bool:
+                    MTCompilerMessage.semanticError(self.program, argument[0], argument[0].start_pos, argument[1])
+            elif opcode is AND:
+                right = pop()
+                stack[-1] = stack[-1] and right
+            elif opcode is OR:
+                right = pop()
+                stack[-1] = stack[-1] or right
+            elif opcode is SELECT:
+                right = pop()
+                left = pop()
+                stack[-1] = left if stack[-1] else right
+            elif opcode is PRINT:
+                self.print(pop())
+            elif opcode is DECLARE:
+                symbols[argument[0]] = argument[1]
+            elif opcode is DUP:
+                push(stack[-1])
+            elif opcode is BIND_LOOP:
+                name, data_type, has_value, nested = argument
+                if nested:
+                    hidden.append((name, name in symbols, symbols.get(name), name in values, values.get(name)))
+                symbols[name] = data_type
+                if has_value:
+                    values[name] = pop()
+            elif opcode is UNBIND_LOOP:
+                name, has_value, nested = argument
+                # an outer binding hidden by the loop variable keeps its place in the trees, it has no value until
+                # RESTORE_LOOP puts it back when the enclosing block ends
+                outer = hidden[-1] if nested else None
+                if outer == None or not outer[1]:
+                    symbols.pop(name, None)
+                if has_value:
+                    if outer != None and outer[3]:
+                        values[name] = None
+                    else:
+                        values.pop(name, None)
+            elif opcode is RESTORE_LOOP:
+                for _ in range(argument):
+                    name, had_symbol, symbol, had_value, value = hidden.pop()
+                    if had_symbol:
+                        symbols[name] = symbol
+                    else:
+                        symbols.pop(name, None)
+                    if had_value:
+                        values[name] = value
+                    else:
+                        values.pop(name, None)
+            elif opcode is ENTER_BLOCK:
+                kept.append([values.get(name) for name in argument])
+            elif opcode is RESTORE_BLOCK:
+                for name, value in zip(argument, kept.pop()):
+                    values[name] = value
+            elif opcode is PARSE:
+                push(argument[0](argument[1]))
+            elif opcode is ERROR:
+                token, message = argument
+                MTCompilerMessage.semanticError(self.program, token, token.start_pos, message)
+
+    def print(self, exp):
+        if exp != None:
+            if type(exp) is bool:
+                exp = 'true' if exp else 'false'
+        else:
+            exp = 'null'
+        self.output.write(f'{exp}\n')
@@ -1,81 +1,327 @@
 import sys
 import os
 import json
+import glob
+import time
+import argparse
+import traceback
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from lib.lexer.lexer import MTLexerAnalyzer
 from lib.syntax.syntax import MTSyntaxAnalyzer
 from lib.semantic.semantic import MTSemanticAnalysis
+from lib.semantic.resolver import MTResolver
+from lib.optimizer.optimizer import MTOptimizer
+from lib.optimizer.licm import MTLoopInvariantMotion
 from lib.interpreter.interpreter import MTInterpreter
-from lib.message import MTCompilerMessage
+from lib.interpreter.closure import MTClosureInterpreter
+from lib.interpreter.counting import MTCountingInterpreter
+from lib.interpreter.profiler import MTLineProfiler
+from lib.interpreter.output import MTBufferedOutput
+from lib.codegen.python import MTPythonGenerator
+from lib.vm.compiler import MTBytecodeCompiler
+from lib.vm.vm import MTVirtualMachine
+from lib.message import MTCompilerMessage, MTDiagnosticError
+from lib.cache import MTCompilationCache
+from lib.artifact import MTArtifactWriter
+from lib.stats import MTStatistics
+from lib.daemon import MTDaemon
+from lib.program import lexers, engines
 
-def read_file(file_path):
+def read_file(file_path, lexer_engine = 'default', stream = False, compact_tokens = False, engine = 'tree', save_python = False, optimization = 0, use_cache = False, cache_size = 64, emit = (), compact_json = False, output = './bin', lex_jobs = 0, stats = False, profile_lines = False, output_buffer = 64 * 1024):
+    # timings, memory and counts of every stage, written to bin/stats.json with --stats even when the script fails
+    statistics = MTStatistics(stats)
     try:
-        clear__build_files('./bin/tokens.json')
-        clear__build_files('./bin/tokens.json_error')
-        clear__build_files('./bin/asts.json')
-        clear__build_files('./bin/asts.json_error')
-        clear__build_files('./bin/interpreter.json')
-        clear__build_files('./bin/interpreter.json_error')
-        clear__build_files('./bin/semantic.json')
-        clear__build_files('./bin/semantic.json_error')
+        # only the artifacts asked for are written, and only those are removed first
+        artifacts = MTArtifactWriter(output, emit, None if compact_json else 4)
+        artifacts.clear()
+        if save_python:
+            clear__build_files(os.path.join(output, 'program.py'))
 
         with open(file_path, 'r') as file:
-            content = file.read()
+            with statistics.stage('read'):
+                content = file.read()
+            statistics.count('characters', len(content))
 
-            # Generating Tokens from the script
-            lexer = MTLexerAnalyzer(content, file_path)
-            tokens = lexer.tokenize()
-            generate_build_files('./bin/tokens.json', str(tokens))
+            # Reusing the checked AST of an unchanged script
+            with statistics.stage('cache'):
+                cache = MTCompilationCache('./bin/cache', int(cache_size * 1024 * 1024)) if use_cache else None
+                key = cache.key(content, file_path, lexer_engine, stream, compact_tokens) if cache != None else None
+                entry = cache.load(key) if cache != None else None
 
-            # Parsing Tokens for Syntax Analysis and AST Tree
-            syntax = MTSyntaxAnalyzer(tokens, content)
-            asts = syntax.analyze()
-            generate_build_files('./bin/asts.json', str(asts))
+            if entry != None:
+                tokens, asts, data = entry
+                if tokens != None:
+                    statistics.count('tokens', len(tokens))
+                    with statistics.stage('artifacts'):
+                        artifacts.write('tokens', tokens)
+                with statistics.stage('artifacts'):
+                    artifacts.write('ast', asts)
+            else:
+                # Generating Tokens from the script
+                lexer = lexers[lexer_engine](content, file_path)
+                if stream:
+                    # tokens are handed to the parser while they are read and never kept as a whole, lexing is
+                    # part of the analyze stage
+                    tokens = statistics.counted(lexer.tokenizeStream())
+                else:
+                    with statistics.stage('tokenize'):
+                        if compact_tokens:
+                            tokens = lexer.tokenizeParallel(lex_jobs, True) if lex_jobs > 1 else lexer.tokenizeBuffer()
+                        else:
+                            tokens = lexer.tokenizeParallel(lex_jobs) if lex_jobs > 1 else lexer.tokenize()
+                    statistics.count('tokens', len(tokens))
+                    with statistics.stage('artifacts'):
+                        artifacts.write('tokens', tokens)
 
-            # Parsing Nodes for Semantic Analysis and Check Proper Meaning
-            semantic = MTSemanticAnalysis(asts, content, {})
-            data = semantic.analyze()
-            generate_build_files('./bin/semantic.json', str(json.dumps(data)))
+                # Parsing Tokens for Syntax Analysis and AST Tree
+                with statistics.stage('analyze'):
+                    syntax = MTSyntaxAnalyzer(tokens, content)
+                    asts = syntax.analyze()
+                with statistics.stage('artifacts'):
+                    artifacts.write('ast', asts)
+
+                # Parsing Nodes for Semantic Analysis and Check Proper Meaning
+                with statistics.stage('semantic'):
+                    semantic = MTSemanticAnalysis(asts, content, {})
+                    data = semantic.analyze()
+
+                # streamed tokens are gone by now
+                if cache != None:
+                    with statistics.stage('cache'):
+                        cache.store(key, (None if stream else tokens, asts, data))
+
+            if statistics.enabled:
+                statistics.count('statements', len(asts))
+                statistics.count('nodes', MTStatistics.nodes(asts))
+                statistics.count('symbols', len(data))
+
+            # Folding Constants and Removing Dead Branches
+            if optimization >= 1:
+                with statistics.stage('optimize'):
+                    asts = MTOptimizer(asts, content).optimize()
+
+            # Hoisting Loop Invariant Expressions
+            if optimization >= 2:
+                with statistics.stage('licm'):
+                    licm = MTLoopInvariantMotion(asts, content)
+                    asts = licm.optimize()
+                statistics.count('hoisted_expressions', len(licm.report))
+                with statistics.stage('artifacts'):
+                    artifacts.write('licm', licm.report)
+
+            # Resolving Variables to the (depth, slot) they are stored at
+            with statistics.stage('resolve'):
+                resolver = MTResolver(asts)
+                slots = resolver.resolve()
+            statistics.count('slots', sum(len(block['slots']) for block in slots))
+            with statistics.stage('artifacts'):
+                artifacts.write('semantic', {'symbol_tree': data, 'slots': slots})
 
             # Interpret Nodes
-            interpreter = MTInterpreter(asts, content)
-            data = interpreter.interpret()
-            generate_build_files('./bin/interpreter.json', str(json.dumps(data)))
+            with statistics.stage('compile'):
+                # what the script prints, for every engine
+                sink = MTBufferedOutput(flush_size=output_buffer)
+                if engine == 'vm':
+                    code = MTBytecodeCompiler(asts, content).compile()
+                    interpreter = MTVirtualMachine(code, content, output=sink)
+                elif engine == 'closure':
+                    interpreter = MTClosureInterpreter(asts, content, output=sink)
+                elif engine == 'python':
+                    interpreter = MTPythonGenerator(asts, content, file_path, output=sink)
+                    if save_python:
+                        generate_source_file(os.path.join(output, 'program.py'), interpreter.generate())
+                elif profile_lines:
+                    # times every statement, written to bin/profile.txt and bin/profile_source.txt
+                    interpreter = MTLineProfiler(asts, content, resolver=resolver, output=sink)
+                elif statistics.enabled:
+                    # only the tree walking interpreter counts what it evaluates
+                    interpreter = MTCountingInterpreter(asts, content, resolver=resolver, output=sink)
+                else:
+                    interpreter = MTInterpreter(asts, content, resolver=resolver, output=sink)
+            try:
+                with statistics.stage('interpret'):
+                    data = interpreter.interpret()
+            finally:
+                if isinstance(interpreter, MTCountingInterpreter):
+                    statistics.count('statements_executed', interpreter.statementCount)
+                    statistics.count('expressions_evaluated', interpreter.expressionCount)
+                    statistics.count('loop_iterations', interpreter.iterationCount)
+                if isinstance(interpreter, MTLineProfiler):
+                    interpreter.write(output)
+            with statistics.stage('artifacts'):
+                artifacts.write('interpreter', data)
 
             file.close()
 
             # Prints for success message on compiler complete
             # MTCompilerMessage.success("Compiler Completed Successfully.")
+    except MTDiagnosticError as error:
+        # every error found, in red, then exit(1)
+        MTCompilerMessage.fail(error.diagnostics)
+    except RecursionError:
+        MTCompilerMessage.fail([MTCompilerMessage.nestingError(file_path, engine)])
     except FileNotFoundError:
         print(f"File '{file_path}' not found.")
     except IOError:
         print(f"Error reading from file '{file_path}'.")
+    finally:
+        statistics.write(os.path.join(output, 'stats.json'))
 
-def generate_build_files(file_path, content: str):
+def generate_source_file(file_path, content: str):
     try:
         with open(file_path, 'w') as file:
-            json.dump(json.loads(content), file, indent=4, sort_keys=False)
-    except FileNotFoundError:
-        print(f"File '{file_path}' not found.")
-    except IOError:
-        print(f"Error reading from file '{file_path}'.")
-    except:
-        with open(f'{file_path}_error', 'w') as file:
             file.write(content)
-            file.close()
+    except IOError:
+        print(f"Error writing to file '{file_path}'.")
+
+# Batch Mode
+def batch_files(paths: list[str]) -> list[str]:
+    # scripts given directly, found under directories or matching glob patterns, each one once
+    files = {}
+    for path in paths:
+        if os.path.isdir(path):
+            matches = glob.glob(os.path.join(path, '**', '*.mt'), recursive=True)
+        elif os.path.exists(path):
+            matches = [path]
+        else:
+            matches = glob.glob(path, recursive=True)
+            if len(matches) == 0:
+                # reported as failing like any script that can't be read
+                matches = [path]
+        for match in sorted(matches):
+            files.setdefault(os.path.normpath(match), None)
+    return list(files)
+
+def batch_output(file_path: str, root: str, output: str) -> str:
+    # bin/batch/<path of the script from the directory holding all of them, without extension>
+    return os.path.join(output, os.path.splitext(os.path.relpath(os.path.abspath(file_path), root))[0])
+
+def batch_file(file_path: str, output: str, options: dict) -> dict:
+    # runs one script in a worker, what it prints goes to stdout.txt of its output directory
+    os.makedirs(output, exist_ok=True)
+    status = 0
+    start = time.perf_counter()
+    with open(os.path.join(output, 'stdout.txt'), 'w') as stdout:
+        try:
+            with redirect_stdout(stdout):
+                if not os.path.isfile(file_path):
+                    print(f"File '{file_path}' not found.")
+                    status = 1
+                else:
+                    read_file(file_path, output=output, **options)
+        except SystemExit as error:
+            status = error.code if isinstance(error.code, int) else 1
+        except Exception:
+            with open(os.path.join(output, 'stderr.txt'), 'w') as stderr:
+                stderr.write(traceback.format_exc())
+            status = 1
+    elapsed = time.perf_counter() - start
+
+    message = ''
+    if status != 0:
+        with open(os.path.join(output, 'stdout.txt'), 'r') as stdout:
+            printed = stdout.read()
+        messages = MTCompilerMessage.printed.findall(printed)
+        if len(messages) > 0:
+            message = messages[-1].split('\n')[0]
+        elif os.path.exists(os.path.join(output, 'stderr.txt')):
+            with open(os.path.join(output, 'stderr.txt'), 'r') as stderr:
+                message = stderr.read().strip().split('\n')[-1]
+        else:
+            message = printed.strip().split('\n')[-1]
+    return {'file': file_path, 'output': output, 'passed': status == 0, 'time': elapsed, 'message': message}
+
+def run_batch(paths: list[str], jobs: int = None, output = './bin/batch', options: dict = {}) -> bool:
+    files = batch_files(paths)
+    if len(files) == 0:
+        print('No scripts found.')
+        return False
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(file_path)) for file_path in files])
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(jobs) as pool:
+        futures = {pool.submit(batch_file, file_path, batch_output(file_path, root, output), options): file_path for file_path in files}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as error:
+                # the worker itself died, the other scripts still run or are reported the same way
+                result = {'file': futures[future], 'output': batch_output(futures[future], root, output), 'passed': False, 'time': 0.0, 'message': f'Worker failed: {error!r}'}
+            results.append(result)
+    elapsed = time.perf_counter() - start
+
+    order = {file_path: index for index, file_path in enumerate(files)}
+    results.sort(key=lambda result: order[result['file']])
+    for result in results:
+        line = f"{'PASS' if result['passed'] else 'FAIL'}  {result['time']:8.3f}s  {result['file']}"
+        print(line if result['passed'] else f"{line}: {result['message']}")
+    passed = sum(1 for result in results if result['passed'])
+    print(f'\n{passed} passed, {len(results) - passed} failed, {len(results)} scripts in {elapsed:.3f}s')
+
+    os.makedirs(output, exist_ok=True)
+    with open(os.path.join(output, 'summary.json'), 'w') as file:
+        json.dump({'passed': passed, 'failed': len(results) - passed, 'time': elapsed, 'results': results}, file, indent=4)
+    return passed == len(results)
+
+def emit_stages(value: str) -> tuple[str, ...]:
+    stages = tuple(stage.strip() for stage in value.split(',') if stage.strip() != '')
+    if 'all' in stages:
+        return tuple(MTArtifactWriter.files)
+    for stage in stages:
+        if stage not in MTArtifactWriter.files:
+            raise argparse.ArgumentTypeError(f"unknown artifact '{stage}', choose from {', '.join(MTArtifactWriter.files)} or all")
+    return stages
 
 def clear__build_files(file_path):
     if (os.path.exists(file_path)):
         os.remove(file_path)
 
 if __name__ == "__main__":
-    # Check if a file path is provided as an argument
-    if len(sys.argv) != 2:
-        print(f"Usage: {os.path.basename(__file__)} <file_path>")
-        sys.exit(1)
-    
-    # Get the file path from the command-line argument
-    file_path = sys.argv[1]
+    parser = argparse.ArgumentParser(prog=os.path.basename(__file__))
+    parser.add_argument('file_path', nargs='?', help='M4trix script to compile and run')
+    parser.add_argument('--lexer', choices=lexers.keys(), default='default', help='lexer engine used to tokenize the script')
+    parser.add_argument('--stream', action='store_true', help='stream tokens from the lexer to the parser without keeping them all in memory (no tokens.json)')
+    parser.add_argument('--compact-tokens', action='store_true', help='keep tokens in a compact column wise buffer instead of one object per token')
+    parser.add_argument('--lex-jobs', type=int, default=0, help='lex scripts of more than 256KB per process on that many processes (not with --stream)')
+    parser.add_argument('--engine', choices=engines, default='tree', help='execute the AST with the tree walking interpreter, compile it to bytecode for the virtual machine, to nested closures or to python source')
+    parser.add_argument('-O', dest='optimization', action='store_const', const=1, default=0, help='optimize the AST before running it: -O folds constants and removes dead branches')
+    parser.add_argument('-O2', dest='optimization', action='store_const', const=2, help='also hoist loop invariant expressions, listed in bin/licm.json with --emit licm')
+    parser.add_argument('--save-python', action='store_true', help='with --engine python, also write the generated source to bin/program.py')
+    parser.add_argument('--emit', type=emit_stages, default=(), help=f'comma separated build artifacts to write to bin/, from {", ".join(MTArtifactWriter.files)} or all (default: none)')
+    parser.add_argument('--stats', '--profile', dest='stats', action='store_true', help='write the wall time, CPU time and peak memory of every stage and counts of tokens, nodes, symbols and, with the tree engine, evaluated nodes and loop iterations to bin/stats.json')
+    parser.add_argument('--profile-lines', action='store_true', help='with the tree engine, write the executions and time of every line of the script to bin/profile.txt, most time first, and bin/profile_source.txt')
+    parser.add_argument('--output-buffer', type=int, default=64 * 1024, help='characters printed by the script kept before they are written out, 0 writes every line (default: 65536)')
+    parser.add_argument('--compact-json', action='store_true', help='write the build artifacts on one line, without indentation')
+    parser.add_argument('--cache', action='store_true', help='keep the checked AST of the script in bin/cache and reuse it while the script and the compiler are unchanged (default: off)')
+    parser.add_argument('--no-cache', action='store_true', help='always lex, parse and check the script, without reading or writing bin/cache, even with --cache')
+    parser.add_argument('--clear-cache', action='store_true', help='remove every entry of bin/cache, then run the script if one is given')
+    parser.add_argument('--batch', nargs='+', metavar='PATH', help='compile and run every script given, found under the directories or matching the glob patterns, on a pool of processes')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes of --batch (default: one per CPU)')
+    parser.add_argument('--output', default='./bin/batch', help='with --batch, directory holding one output directory per script and summary.json (default: ./bin/batch)')
+    parser.add_argument('--serve', action='store_true', help='run as a daemon compiling and running the scripts client.py sends over a Unix socket')
+    parser.add_argument('--socket', default='./bin/daemon.sock', help='Unix socket the daemon listens on (default: ./bin/daemon.sock)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes of the daemon (default: one per CPU)')
+    parser.add_argument('--program-cache', type=int, default=64, help='compiled programs every worker of the daemon keeps in memory (default: 64)')
+    parser.add_argument('--cache-size', type=float, default=64, help='with --cache, size in MB above which the least recently used entries of bin/cache are removed (default: 64)')
+    args = parser.parse_args()
+
+    if args.clear_cache:
+        MTCompilationCache('./bin/cache').clear()
+    elif args.file_path == None and not args.serve and args.batch == None:
+        parser.error('the following arguments are required: file_path')
+    if args.profile_lines and args.engine != 'tree':
+        parser.error('--profile-lines only profiles the tree engine')
     
     # Call the function to read and display the file contents
-    read_file(file_path)
\ No newline at end of file
+    if args.serve:
+        MTDaemon(args.socket, args.workers, args.program_cache).serve()
+    else:
+        # the options of read_file, for one script or every script of a batch
+        options = {'lexer_engine': args.lexer, 'stream': args.stream, 'compact_tokens': args.compact_tokens, 'engine': args.engine, 'save_python': args.save_python, 'optimization': args.optimization, 'use_cache': args.cache and not args.no_cache, 'cache_size': args.cache_size, 'emit': args.emit, 'compact_json': args.compact_json, 'lex_jobs': args.lex_jobs, 'stats': args.stats, 'profile_lines': args.profile_lines, 'output_buffer': args.output_buffer}
+        if args.batch != None:
+            if not run_batch(([args.file_path] if args.file_path != None else []) + args.batch, args.jobs, args.output, options):
+                sys.exit(1)
+        elif args.file_path != None:
+            read_file(args.file_path, **options)
\ No newline at end of file
@@ -0,0 +1,37 @@
+import unittest
+
+from lib import program
+from lib.daemon import MTDaemonWorker
+from lib.interpreter.output import MTCaptureOutput
+from lib.message import MTCompilerMessage, MTDiagnosticError
+
+sources = [
+    'int a = 7; if (true) { a = 3; for (int a = 0; a < 1; a++) { } } print(a); str s = "x"; print(s + "y");',
+    'int n = 0; while (n < 3) { n++; print(n * 2); } bool b = n == 3; print(b);',
+    'int a = 1; switch (a) { case 1: print(1); default: print(2); }',
+    'int a = 1;\nint b = ;\nprint(c);',
+]
+
+class MTDaemonWorkerTest(unittest.TestCase):
+    # a request prints and returns what lib.program compiles and runs for the same options
+    def test_requests(self):
+        for source in sources:
+            for engine in program.engines:
+                for optimization in (0, 1, 2):
+                    with self.subTest(source=source, engine=engine, optimization=optimization):
+                        output = MTCaptureOutput()
+                        try:
+                            trees = program.compile(source, 'test.mt', optimization=optimization, cache=False, engine=engine).run(output)
+                            expected = (output.getvalue(), trees, 0)
+                        except MTDiagnosticError as error:
+                            expected = (MTCompilerMessage.format(error.diagnostics), None, 1)
+
+                        request = {'path': 'test.mt', 'source': source, 'options': {'engine': engine, 'optimization': optimization}}
+                        for _ in range(2):
+                            # the second request runs the program compiled by the first one
+                            response = MTDaemonWorker.handle(request)
+                            self.assertEqual((response['stdout'], response['result'], response['exit_code']), expected)
+                            self.assertEqual(response['stderr'], '')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+import random
+import unittest
+
+from lib import program
+from lib.interpreter.output import MTCaptureOutput
+from lib.message import MTDiagnosticError
+
+class MTProgramSampler:
+    # Random programs with nested blocks, for loops hiding outer variables, switches and loops bounded by counters
+    # nothing else changes, so every engine can run them to the end or to the same runtime error.
+    names = ('a', 'b', 'c', 'i', 'j')
+
+    def __init__(self, seed: int) -> None:
+        self.random = random.Random(seed)
+        self.counters = 0
+
+    def program(self) -> str:
+        lines = []
+        scope = set()
+        for name in self.random.sample(self.names, self.random.randint(1, 4)):
+            lines.append(f'int {name} = {self.random.randint(0, 9)};' if self.random.random() < 0.8 else f'int {name};')
+            scope.add(name)
+        lines.append('str s = "x";')
+        lines.append('bool t = true;')
+        self.block(lines, scope, 0, False, self.random.randint(3, 8))
+        for name in sorted(scope):
+            lines.append(f'print({name});')
+        lines.append('print(s);')
+        return '\n'.join(lines) + '\n'
+
+    def block(self, lines: list[str], scope: set[str], depth: int, inLoop: bool, count: int):
+        for _ in range(count):
+            self.statement(lines, scope, depth, inLoop)
+
+    def statement(self, lines: list[str], scope: set[str], depth: int, inLoop: bool):
+        r = self.random
+        indent = '    ' * depth
+        names = sorted(scope)
+        kind = r.random()
+        if kind < 0.25 and len(names) > 0:
+            name = r.choice(names)
+            # inside loops variables only grow, so a loop variable never stops its loop from ending
+            if inLoop:
+                lines.append(indent + (f'{name}++;' if r.random() < 0.5 else f'{name} = {name} + {r.randint(1, 3)};'))
+            else:
+                lines.append(indent + f'{name} = {self.expression(scope)};')
+        elif kind < 0.35:
+            name = r.choice(self.names)
+            if name not in scope:
+                lines.append(indent + f'int {name} = {self.expression(scope)};')
+                scope.add(name)
+            else:
+                lines.append(indent + f'print({self.expression(scope)});')
+        elif kind < 0.5 or (depth >= 3 and kind >= 0.55):
+            lines.append(indent + f'print({self.expression(scope)});')
+        elif kind < 0.55:
+            lines.append(indent + f's = s + "{r.choice("xyz")}";')
+        elif kind < 0.68:
+            lines.append(indent + f'if ({self.condition(scope)}) {{')
+            self.block(lines, set(scope), depth + 1, inLoop, r.randint(1, 4))
+            while r.random() < 0.4:
+                lines.append(indent + f'}} elif ({self.condition(scope)}) {{')
+                self.block(lines, set(scope), depth + 1, inLoop, r.randint(1, 3))
+            if r.random() < 0.5:
+                lines.append(indent + '} else {')
+                self.block(lines, set(scope), depth + 1, inLoop, r.randint(1, 3))
+            lines.append(indent + '}')
+        elif kind < 0.82:
+            # the loop variable often hides an outer variable, and is gone once the loop is done
+            name = r.choice(names) if len(names) > 0 and r.random() < 0.7 else r.choice(self.names)
+            if name in scope and r.random() < 0.5:
+                # what the block wrote to a variable the loop hides is lost when the block ends
+                lines.append(indent + (f'{name}++;' if inLoop else f'{name} = {self.expression(scope)};'))
+            lines.append(indent + f'for (int {name} = {r.randint(0, 2)}; {name} < {r.randint(0, 4)}; {name}++) {{')
+            self.block(lines, scope | {name}, depth + 1, True, r.randint(1, 4))
+            lines.append(indent + '}')
+            scope.discard(name)
+        elif kind < 0.9:
+            counter = f'w{self.counters}'
+            self.counters += 1
+            lines.append(indent + f'int {counter} = 0;')
+            if r.random() < 0.5:
+                lines.append(indent + f'while ({counter} < {r.randint(0, 3)}) {{')
+                lines.append(indent + f'    {counter}++;')
+                self.block(lines, set(scope), depth + 1, True, r.randint(1, 3))
+                lines.append(indent + '}')
+            else:
+                lines.append(indent + 'do {')
+                lines.append(indent + f'    {counter}++;')
+                self.block(lines, set(scope), depth + 1, True, r.randint(1, 3))
+                # inside a block the `;` ending the do-while is followed by the one ending the statement
+                lines.append(indent + f'}} while ({counter} < {r.randint(0, 3)});' + (' ;' if depth > 0 else ''))
+            scope.add(counter)
+        else:
+            lines.append(indent + f'switch ({r.choice(names) if len(names) > 0 else r.randint(0, 2)}) {{')
+            for value in r.sample(range(4), r.randint(1, 3)):
+                lines.append(indent + f'    case {value}: {self.case(scope, inLoop)};')
+            if r.random() < 0.5:
+                lines.append(indent + f'    default: {self.case(scope, inLoop)};')
+            lines.append(indent + '}')
+
+    def case(self, scope: set[str], inLoop: bool) -> str:
+        r = self.random
+        names = sorted(scope)
+        kind = r.random()
+        if kind < 0.4 and len(names) > 0:
+            name = r.choice(names)
+            return f'{name}++' if inLoop else f'{name} = {self.expression(scope)}'
+        elif kind < 0.6:
+            name = r.choice(self.names)
+            return f'for (int {name} = 0; {name} < {r.randint(0, 3)}; {name}++) {{ print({name}); }}'
+        return f'print({self.expression(scope)})'
+
+    def expression(self, scope: set[str], depth: int = 0) -> str:
+        r = self.random
+        names = sorted(scope)
+        if depth > 2 or r.random() < 0.3:
+            return r.choice(names) if len(names) > 0 and r.random() < 0.6 else str(r.randint(0, 9))
+        kind = r.random()
+        if kind < 0.6:
+            return f'{self.expression(scope, depth + 1)} {r.choice("+-*")} {self.expression(scope, depth + 1)}'
+        elif kind < 0.8:
+            return f'({self.expression(scope, depth + 1)})'
+        # the condition of a ternary is a term, a comparison has to be in parentheses
+        return f'(({self.condition(scope, depth + 1)}) ? {self.expression(scope, depth + 1)} : {self.expression(scope, depth + 1)})'
+
+    def condition(self, scope: set[str], depth: int = 0) -> str:
+        r = self.random
+        kind = r.random()
+        if kind < 0.15:
+            return r.choice(('true', 'false', 't'))
+        text = f'{self.expression(scope, depth + 1)} {r.choice(("<", ">", "==", "<=", ">="))} {self.expression(scope, depth + 1)}'
+        if kind < 0.3:
+            text += f' {r.choice(("&&", "||"))} {self.expression(scope, depth + 1)} < {r.randint(0, 9)}'
+        return text
+
+def outcome(source: str, engine: str, optimization: int):
+    # what a program prints, the trees it ends with and the error stopping it
+    output = MTCaptureOutput()
+    try:
+        trees = program.compile(source, 'test.mt', optimization=optimization, cache=False, engine=engine).run(output)
+    except MTDiagnosticError as error:
+        return output.lines(), None, str(error)
+    except (TypeError, ZeroDivisionError) as error:
+        return output.lines(), None, type(error).__name__
+    return output.lines(), trees, None
+
+def nested(depth: int) -> str:
+    # `a` in depth parentheses, under additions, products, subtractions and ternaries in turn
+    text = 'a'
+    for level in range(depth):
+        text = ('1 + ({})', '({}) * 1', '((t) ? ({}) : 0)', '({}) - 0')[level % 4].format(text)
+    return text
+
+class MTEngineTest(unittest.TestCase):
+    # every engine prints what MTInterpreter prints, at every optimization level
+    def test_random_programs(self):
+        for seed in range(200):
+            source = MTProgramSampler(seed).program()
+            expected = outcome(source, 'tree', 0)
+            for engine in program.engines:
+                for optimization in (0, 1, 2):
+                    with self.subTest(seed=seed, engine=engine, optimization=optimization):
+                        self.assertEqual(outcome(source, engine, optimization), expected, source)
+
+    # names python would normalize to the same identifier, or not take as one, stay apart on every engine
+    def test_unicode_names(self):
+        sources = [
+            ('int \ufb01x = 1; int fix = 5; print(\ufb01x); print(fix);', ['1', '5']),
+            ('int a\u00b2 = 1; print(a\u00b2 + 1);', ['2']),
+        ]
+        for source, expected in sources:
+            for engine in program.engines:
+                with self.subTest(source=source, engine=engine):
+                    lines, trees, error = outcome(source, engine, 0)
+                    self.assertEqual((lines, error), (expected, None))
+                    self.assertEqual(trees, outcome(source, 'tree', 0)[1])
+
+    # expressions deeper than the recursion limit, in blocks and loops, compile and run on every engine
+    def test_deep_expressions(self):
+        terms = ' + '.join(['a'] + ['1'] * 99999)
+        source = f'''int a = 1;
+bool t = true;
+for (int i = 0; i < 2; i++) {{
+    if (true) {{
+        a = {terms};
+    }}
+}}
+print(a);
+print({nested(10000)});
+for (int i = 0; i < 1; i++) {{
+    print({nested(10000)});
+}}
+'''
+        for engine in program.engines:
+            for optimization in (0, 1, 2):
+                with self.subTest(engine=engine, optimization=optimization):
+                    self.assertEqual(outcome(source, engine, optimization)[0], ['199999', '202499', '202499'])
+
+if __name__ == '__main__':
+    unittest.main()
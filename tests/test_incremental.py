@@ -0,0 +1,51 @@
+import random
+import unittest
+
+from lib.incremental import MTIncrementalProgram
+from lib.message import MTDiagnosticError
+
+source = '''int a = 1;
+int b = a + 2;
+if (b > 1) {
+    print(b);
+}
+while (a < 3) { a = a + 1; }
+print(a);
+str s = "x";
+print(s + "y");
+'''
+
+# what edits insert, quotes included so an edit can open a string running over the statements after it
+pieces = ['"', "'", 'int', 'str', ' ', '\n', ';', 'a', 'b', '1', '"q"', '(', ')', '{', '}', 'print(a);', 'int c = 2;\n', 'a = 5;', '+', '==', 'true']
+
+def state(program: MTIncrementalProgram) -> tuple:
+    return program.program, repr(program.tokens), repr(program.statements), program.symbolTree
+
+class MTIncrementalProgramTest(unittest.TestCase):
+    def test_quote_before_statement(self):
+        program = MTIncrementalProgram('str v2 = "bc";\nbool v3 = 1 < 4;', 'test.mt')
+        before = state(program)
+        with self.assertRaises(MTDiagnosticError):
+            program.edit(program.program.index('bool'), 0, '"')
+        self.assertEqual(state(program), before)
+
+    def test_random_edits(self):
+        # every edit leaves the program as a fresh parse of its text would be, or as it was when it raises
+        rng = random.Random(1)
+        for trial in range(300):
+            program = MTIncrementalProgram(source, 'test.mt')
+            for _ in range(6):
+                before = state(program)
+                offset = rng.randint(0, len(program.program))
+                removed = rng.randint(0, min(4, len(program.program) - offset))
+                inserted = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 2)))
+                with self.subTest(trial=trial, program=program.program, offset=offset, removed=removed, inserted=inserted):
+                    try:
+                        program.edit(offset, removed, inserted)
+                    except MTDiagnosticError:
+                        self.assertEqual(state(program), before)
+                        continue
+                    self.assertEqual(state(program), state(MTIncrementalProgram(program.program, 'test.mt')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from lib import program
+from lib.interpreter.output import MTCaptureOutput
+
+# programs where a for loop hides an outer variable, and what the tree walker prints for them
+shadowing = [
+    # the block's write to `a` is lost with the loop variable hiding it
+    ('int a = 7; if (true) { a = 3; for (int a = 0; a < 1; a++) { } } print(a);', ['7']),
+    ('int a = 7; if (true) { a = 3; if (true) { a = 5; } for (int a = 0; a < 1; a++) { } } print(a);', ['7']),
+    ('int a = 7; if (true) { a = 3; for (int a = 0; a < 1; a++) { a = 9; } } print(a);', ['7']),
+    ('int a = 7; int i = 0; while (i < 2) { i++; print(a); a = a + 1; for (int a = 0; a < 1; a++) { } } print(a);', ['7', '7', '7']),
+    ('int a = 7; switch (1) { case 1: for (int a = 0; a < 2; a++) { print(a); }; } print(a);', ['0', '1', '7']),
+    # without an initial value the loop variable doesn't take the value of `a` away
+    ('int a = 7; if (true) { a = 3; for (int a; a < 1; a++) { } } print(a);', ['3']),
+    # the loop variable is gone after the loop, the outer variable is back once the block ends
+    ('int a = 7; if (true) { for (int a = 0; a < 1; a++) { } print(a); } print(a);', ['null', '7']),
+    ('int a = 7; a = 3; for (int a = 0; a < 1; a++) { } print(a);', ['null']),
+    # a block without such a loop writes to the outer variable
+    ('int a = 7; if (true) { a = 3; for (int b = 0; b < 1; b++) { } } print(a);', ['3']),
+    ('int a; if (true) { a = 3; } print(a);', ['null']),
+]
+
+def run(source: str, optimization: int = 0, engine: str = 'tree') -> list[str]:
+    output = MTCaptureOutput()
+    program.compile(source, 'test.mt', optimization=optimization, cache=False, engine=engine).run(output)
+    return output.lines()
+
+class MTInterpreterTest(unittest.TestCase):
+    def test_shadowing_for_loops(self):
+        for source, expected in shadowing:
+            for optimization in (0, 1, 2):
+                with self.subTest(source=source, optimization=optimization):
+                    self.assertEqual(run(source, optimization), expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import glob
+import os
+import random
+import unittest
+
+from lib.lexer.lexer import MTLexerAnalyzer
+from lib.lexer.regex_lexer import MTRegexLexerAnalyzer
+from lib.message import MTDiagnosticError
+
+examples = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example')
+
+samples = [
+    '''int a = 5;
+double d = 2.5;
+str s = 'hi';
+bool b = true;
+print(a + 3 * 2);
+for (int i = 0; i < 3; i++) {
+    print(i);
+    if (i == 1) {
+        print('one');
+    } else {
+        print(s + ' there');
+    }
+}
+int n = 0;
+while (n < 4) {
+    n = n + 1;
+}
+switch (a) {
+    case 5: print('five');
+    default: print('other');
+}
+do {
+    n = n - 1;
+} while (n > 0);
+print(b ? 1 : 2);
+print(d * -2.0);
+''',
+    '# comment\n// comment\nint x = 1; # trailing\nprint(x); // trailing\n',
+    'str s = "say \\"hi\\"";\nstr t = \'it\\\'s\';\nprint(s + t);\n',
+    'bool ok = 1 <= 2 && 3 >= 2 || !false;\nint i = 0; i++; i--; i += 1;\n',
+    'double d = 1.; double e = .5; int f = 1..2; print(a.b);\n',
+    # non-ASCII text
+    'str é = "ünïcödé ✓ 中文";\nint ß = 1;\nprint(é); # ✓ 中文\n',
+    'int 変数 = 1;\nprint(変数);\n',
+    # unterminated strings and comments
+    'str s = "never closed;\nprint(s);\n',
+    "str s = 'never closed",
+    'int a = 1; #',
+    'int a = 1; //',
+    'int a = 1; /',
+    '/',
+    '#',
+    # bad characters
+    'int a = 1 @ 2;\n',
+    'int $a = 1;\n',
+    'print(a) ~ `b`;\n',
+    'int a = 1;\n\n    ^\n',
+    '',
+    '   \n\t\n',
+]
+
+# pieces the random sources are made of, including the ones the lexers disagree on most easily
+fragments = [
+    'int', 'double', 'str', 'bool', 'true', 'false', 'if', 'else', 'for', 'while', 'do', 'switch', 'case',
+    'default', 'print', 'pass', 'a', 'b1', 'x2y', 'é', 'ß', '中', '✓', '0', '12', '3.5', '-7', '1.', '..', '.',
+    '+', '-', '*', '/', '=', '==', '<', '>', '<=', '>=', '&&', '||', '!', '?', ':', '++', '--', '+=',
+    '(', ')', '{', '}', ',', ';', ';;', '"', "'", '\\', '"text"', "'text'", '"a\\"b"', '#', '//', ' # c', ' // c',
+    '@', '$', '~', '`', '^', '[', ']', ' ', ' ', ' ', ' ', '\t', '\n', '\n', '\r\n',
+]
+
+def outcome(lexer, source: str, stream: bool = False):
+    # the tokens, or the diagnostics, a lexer gives for a source
+    analyzer = lexer(source, 'test.mt')
+    try:
+        tokens = list(analyzer.tokenizeStream()) if stream else analyzer.tokenize()
+    except MTDiagnosticError as error:
+        return ('error', repr(error.diagnostics), str(error))
+    return ('tokens', repr(tokens))
+
+class MTRegexLexerTest(unittest.TestCase):
+    def assertSameTokens(self, source: str):
+        for stream in (False, True):
+            expected = outcome(MTLexerAnalyzer, source, stream)
+            actual = outcome(MTRegexLexerAnalyzer, source, stream)
+            self.assertEqual(actual, expected, f'source {source!r}, stream {stream}')
+
+    def test_samples(self):
+        for source in samples:
+            with self.subTest(source=source):
+                self.assertSameTokens(source)
+
+    def test_examples(self):
+        for path in sorted(glob.glob(os.path.join(examples, '**', '*.mt'), recursive=True)):
+            with open(path, 'r') as file:
+                source = file.read()
+            with self.subTest(path=path):
+                self.assertSameTokens(source)
+
+    def test_random_sources(self):
+        generator = random.Random(2024)
+        for _ in range(2000):
+            source = ''.join(generator.choice(fragments) for _ in range(generator.randint(1, 40)))
+            with self.subTest(source=source):
+                self.assertSameTokens(source)
+
+    def test_errors(self):
+        for source in ('int a = 1 @ 2;\n', 'x\n\n $', 'é ✓ ~'):
+            with self.subTest(source=source):
+                kind = outcome(MTRegexLexerAnalyzer, source)[0]
+                self.assertEqual(kind, 'error')
+                self.assertSameTokens(source)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+
+from lib import program
+from lib.message import MTDiagnosticError
+
+class MTSyntaxAnalyzerTest(unittest.TestCase):
+    def diagnostics(self, source: str) -> list[tuple[str, int, int]]:
+        # (kind, line, column) of the errors compiling source
+        with self.assertRaises(MTDiagnosticError) as raised:
+            program.compile(source, 'test.mt', cache=False)
+        return [(diagnostic.kind, diagnostic.line, diagnostic.column) for diagnostic in raised.exception.diagnostics]
+
+    # a statement cut short by the end of the program is reported at its last token, after the errors before it
+    def test_end_of_input(self):
+        self.assertEqual(self.diagnostics('int a = 1;\nint b = ;\nswitch (a) { case 1:'), [('syntax', 2, 9), ('syntax', 3, 20)])
+        self.assertEqual(self.diagnostics('int a = 1;\nswitch (a) { case 1:'), [('syntax', 2, 20)])
+        self.assertEqual(self.diagnostics('int a = 1;\nswitch (a) { case 1: print(a); default:'), [('syntax', 2, 39)])
+
+    def test_case_without_value(self):
+        self.assertEqual(self.diagnostics('int a = 1;\nswitch (a) { case : print(1); }'), [('syntax', 2, 19)])
+
+if __name__ == '__main__':
+    unittest.main()